@@ -1,44 +1,72 @@
+import atexit
+import hashlib
+import json
 import os
+import shutil
 from functools import wraps
-from werkzeug.utils import secure_filename
 import tempfile
+from datetime import datetime, timezone
 
-# Optional torch import for GPU support
-try:
-    import torch
-except ImportError:
-    class TorchStub:
-        class cuda:
-            @staticmethod
-            def is_available():
-                return False
-            @staticmethod
-            def memory_allocated():
-                return 0
-    torch = TorchStub()
-
-from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory
+from flask import Flask, g, request, jsonify, Response, stream_with_context, send_from_directory, send_file
 from flask_cors import CORS
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CONTENT_TYPE_LATEST
 
 # Local imports
-from app.utils.security import require_api_key, AuthError
-from app.utils.sse import sse_from_text_stream
+from app.utils.security import require_api_key, check_api_key, AuthError
+from app.utils.sse import StreamRegistry
 from app.utils.cache import Cache
-from app.utils.extract import extract_pdf, extract_docx, extract_txt, maybe_truncate
-from app.utils.rate_limiter import RateLimiter
-from app.utils.metrics import Metrics
+from app.utils.extract import extraction_key, iter_budget, iter_text, parse_page_range
+from app.utils.extract_cache import ExtractionCache
+from app.utils.rate_limiter import create_rate_limiter
+from app.utils.metrics import Metrics, begin_request, current_timings, record_stage, stage
+from app.utils.admission import AdmissionController, AdmissionError, TIMEOUT_HEADER, parse_timeout_ms
+from app.utils.fair_scheduler import FairQueue, estimate_tokens, parse_weights, record_usage, tenant_id
+from app.utils.jobs import JobStore, BatchRunner
+from app.utils.revisions import IncrementalAnalyzer, RevisionStore
+from app.utils.results import ResultStore
+from app.utils.assets import AssetManifest, IMMUTABLE_CACHE_CONTROL, precompress_bytes
+from app.utils.uploads import UploadRequest, upload_digest, upload_source
+from app.utils.profiler import PROFILE_HEADER, ProfileStore, SamplingProfiler, server_timing, should_sample
+from app.utils.optional import loaded
 from app.models.model_manager import ModelManager, ModelError
-from app.models.risk_detector import full_clause_analysis
+from app.models.risk_detector import (
+    analyze_clause, clause_analysis, full_clause_analysis, get_embedder, merge_risks, rules_version,
+    stream_clause_analysis,
+)
+from app.models.alignment import cached_embed, compare_documents
+from app.models.complexity import selective_simplify, selective_threshold, usage_texts
+from app.models.translation import segmented_translation, translate_document
+
+ALLOWED_UPLOAD_EXTENSIONS = (".pdf", ".docx", ".txt")
+
 
 def create_app():
     """Creates and configures the Flask app."""
     app = Flask(__name__, static_folder='templates', static_url_path='')
+    app.request_class = UploadRequest
 
     # --- Configuration ---
     is_fast_test = os.getenv("FAST_TEST") == "1"
     app.config["IS_FAST_TEST"] = is_fast_test
     app.config["MODEL_NAME"] = os.getenv("MODEL_NAME", "default-model")
+    # Job/result DBs and caches. The default is shared by every instance on the
+    # host (pending batch jobs resume after a restart); FAST_TEST instances get
+    # their own directory so tests never see each other's state.
+    data_dir = os.getenv("DATA_DIR")
+    if not data_dir and is_fast_test:
+        data_dir = tempfile.mkdtemp(prefix="athenis-")
+        atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+    app.config["DATA_DIR"] = data_dir or os.path.join(tempfile.gettempdir(), "athenis")
+
+    # Request bodies past this size are rejected while they stream in, on every
+    # route (JSON 413 below); the ASGI server checks it before spooling too
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+    app.config["MAX_EXTRACT_BYTES"] = int(os.getenv("MAX_EXTRACT_BYTES", str(5 * 1024 * 1024)))
+    # Processes per large PDF (pages split across a pool); 0 = serial
+    app.config["PDF_WORKERS"] = int(os.getenv("PDF_WORKERS", 0))
+
+    # X-Sendfile lets a fronting proxy stream files instead of the worker
+    app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE") == "1"
 
     # --- CORS ---
     cors_origins = os.getenv("CORS_ORIGINS")
@@ -47,9 +75,95 @@ def create_app():
 
     # --- Services ---
     app.model_manager = ModelManager()
-    app.rate_limiter = RateLimiter(rate_per_minute=int(os.getenv("RATE_LIMIT_PER_MIN", 60)))
-    app.cache = Cache(redis_url=os.getenv("REDIS_URL"))
+    app.rate_limiter = create_rate_limiter(
+        int(os.getenv("RATE_LIMIT_PER_MIN", 60)),
+        backend=os.getenv("RATE_LIMIT_BACKEND", "memory"),
+        redis_url=os.getenv("RATE_LIMIT_REDIS_URL") or os.getenv("REDIS_URL"),
+        burst=int(os.getenv("RATE_LIMIT_BURST")) if os.getenv("RATE_LIMIT_BURST") else None,
+        retry_after=float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", 5)),
+    )
     app.metrics = Metrics()
+    app.cache = Cache(
+        redis_url=os.getenv("REDIS_URL"),
+        l1_max_bytes=int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024)),
+        l1_ttl=float(os.getenv("CACHE_L1_TTL", 60)),
+        compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024)),
+        retry_after=float(os.getenv("CACHE_REDIS_RETRY_SECONDS", 5)),
+        metrics=app.metrics,
+    )
+    app.extraction_cache = None
+    if os.getenv("EXTRACT_CACHE", "1") == "1":
+        app.extraction_cache = ExtractionCache(
+            os.getenv("EXTRACT_CACHE_DIR", os.path.join(app.config["DATA_DIR"], "extract-cache")),
+            max_bytes=int(os.getenv("EXTRACT_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+            redis_url=os.getenv("EXTRACT_CACHE_REDIS_URL"),
+            metrics=app.metrics,
+        )
+    uses_local_model = not (app.model_manager.fast_test or app.model_manager.external_llm_url)
+    app.admission = AdmissionController(
+        max_concurrency=int(os.getenv("INFERENCE_CONCURRENCY", app.model_manager.replicas if uses_local_model else 8)),
+        max_queue=int(os.getenv("INFERENCE_QUEUE_SIZE", 32)),
+        default_timeout=int(os.getenv("INFERENCE_DEFAULT_TIMEOUT_MS", 60000)) / 1000.0,
+        retry_after=int(os.getenv("INFERENCE_RETRY_AFTER", 1)),
+        metrics=app.metrics,
+        queue=FairQueue(
+            quantum=int(os.getenv("FAIR_QUEUE_QUANTUM", 512)),
+            weights=parse_weights(os.getenv("TENANT_WEIGHTS")),
+        ),
+    )
+    app.job_store = JobStore(
+        os.getenv("BATCH_DB_PATH", os.path.join(app.config["DATA_DIR"], "batch.sqlite3")),
+        lease_seconds=float(os.getenv("BATCH_LEASE_SECONDS", 300)),
+    )
+    app.batch_runner = BatchRunner(
+        app.job_store,
+        app.model_manager,
+        workers=int(os.getenv("BATCH_WORKERS", 2)),
+        batch_size=app.model_manager.batch_size,
+        admission=app.admission,
+    )
+    if app.job_store.has_pending():
+        # Resume jobs left unfinished by a previous worker.
+        app.batch_runner.start()
+    # Versioned documents: per-clause results reused across revisions
+    app.revisions = IncrementalAnalyzer(
+        RevisionStore(os.getenv("REVISIONS_DB_PATH", os.path.join(app.config["DATA_DIR"], "revisions.sqlite3"))),
+        detect=analyze_clause,
+        risk_version=rules_version(),
+        model_version=app.model_manager.version("simplify"),
+    )
+    # SSE streams: coalesced frames, heartbeats, and a replay buffer for Last-Event-ID resume
+    app.streams = StreamRegistry(
+        replay_bytes=int(os.getenv("STREAM_REPLAY_BYTES", 256 * 1024)),
+        retain=float(os.getenv("STREAM_RETAIN_SECONDS", 120)),
+        grace=float(os.getenv("STREAM_RESUME_GRACE_SECONDS", 10)),
+        coalesce_bytes=int(os.getenv("STREAM_COALESCE_BYTES", 512)),
+        coalesce_delay=float(os.getenv("STREAM_COALESCE_MS", 50)) / 1000.0,
+        heartbeat=float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15)),
+    )
+    # Analysed documents, clauses and risks, searchable; resubmissions are lookups
+    app.results = ResultStore(os.getenv("RESULTS_DB_PATH", os.path.join(app.config["DATA_DIR"], "results.sqlite3")))
+
+    # --- Profiling: explicit per request, or a sampled share of all requests ---
+    app.profiles = ProfileStore(int(os.getenv("PROFILE_BUFFER_SIZE", 50)))
+    profile_sample_percent = float(os.getenv("PROFILE_SAMPLE_PERCENT", 0))
+
+    # --- Static assets: fingerprinted + precompressed once per deploy ---
+    app.assets = None
+    app.index_page = None
+    if os.getenv("STATIC_FINGERPRINT", "1") == "1":
+        templates_dir = os.path.join(app.root_path, "templates")
+        try:
+            app.assets = AssetManifest(templates_dir, os.path.join(app.config["DATA_DIR"], "assets")).build()
+            with open(os.path.join(templates_dir, "index.html"), encoding="utf-8") as fh:
+                page = app.assets.rewrite_html(fh.read()).encode("utf-8")
+            app.index_page = {
+                "etag": hashlib.sha256(page).hexdigest()[:32],
+                "variants": {None: page, **precompress_bytes(page)},
+            }
+        except OSError as e:
+            app.logger.warning(f"Static asset pipeline disabled: {e}")
+            app.assets = None
 
     # --- Helpers ---
     def ok(data, status_code=200):
@@ -58,25 +172,130 @@ def create_app():
     def error_response(code, message, status_code):
         return jsonify({"ok": False, "error": {"code": code, "message": message}}), status_code
 
+    def client_key():
+        return request.headers.get("X-API-Key", request.remote_addr)
+
+    def admission_ticket(text, task="simplify"):
+        """Ticket charged with the request's estimated token cost to its client key."""
+        return app.admission.ticket(timeout=request_timeout(), key=tenant_id(client_key()),
+                                    cost=estimate_tokens(text, task))
+
+    def charge_usage(ticket, text, output):
+        record_usage(app.metrics, ticket.key, text, output)
+
+    def extract_upload(f, ext, pages=None, layout=None, analyze=False):
+        """
+        (text, risks) of an uploaded file. Text is served from the extraction
+        cache when the same bytes were extracted with the same options before;
+        otherwise it is extracted straight from the upload buffer, with the byte
+        cap stopping extraction early and, with analyze, the clause scan running
+        while later pages are still parsed.
+        """
+        max_bytes = app.config["MAX_EXTRACT_BYTES"]
+        key = extraction_key(upload_digest(f.stream), ext, pages=pages, layout=layout, max_bytes=max_bytes)
+        text = app.extraction_cache.get(key) if app.extraction_cache else None
+        if text is not None:
+            return text, full_clause_analysis(text) if analyze else None
+
+        risks = None
+        with upload_source(f.stream) as source:
+            chunks = iter_budget(iter_text(source, ext.lower(), pages=pages, layout=layout,
+                                           workers=app.config["PDF_WORKERS"]), max_bytes)
+            if analyze:
+                parts = []
+
+                def keep(stream):
+                    for chunk in stream:
+                        parts.append(chunk)
+                        yield chunk
+
+                risks = stream_clause_analysis(keep(chunks))
+                text = "".join(parts)
+            else:
+                with stage("extraction"):
+                    text = "".join(chunks)
+        if app.extraction_cache:
+            app.extraction_cache.set(key, text)
+        return text, risks
+
     # --- Decorators ---
     def apply_rate_limit(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            key = request.headers.get("X-API-Key", request.remote_addr)
+            key = client_key()
             if not app.rate_limiter.allow(key):
                 return error_response("E429_RATE_LIMIT_EXCEEDED", "Rate limit exceeded", 429)
             return f(*args, **kwargs)
         return decorated_function
 
+    def request_timeout():
+        """Per-request deadline in seconds from X-Request-Timeout-Ms, if given."""
+        return parse_timeout_ms(request.headers.get(TIMEOUT_HEADER))
+
+    def profile_requested():
+        """X-Profile: 1 (or ?profile=1) from a caller holding the API key."""
+        if request.headers.get(PROFILE_HEADER) != "1" and request.args.get("profile") != "1":
+            return False
+        try:
+            check_api_key(request.headers.get("X-API-Key"))
+        except AuthError:
+            return False
+        return True
+
+    # --- Request instrumentation ---
+    @app.before_request
+    def start_request_timings():
+        begin_request()
+        if profile_requested() or should_sample(profile_sample_percent):
+            g.profiler = SamplingProfiler().start()
+
+    @app.after_request
+    def observe_request(response):
+        timings = current_timings()
+        # Route templates keep the endpoint label bounded (no ids in the label).
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        method, status = request.method, response.status_code
+        if timings is not None:
+            response.headers["Server-Timing"] = server_timing(timings)
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            response.headers["X-Profile-Id"] = profiler.id
+
+        def finish():
+            app.metrics.observe_request(endpoint, method, status, timings)
+            if profiler is not None:
+                profiler.stop()
+                stages_ms = {name: round(s * 1000, 1) for name, s in timings.durations.items()} if timings else {}
+                app.profiles.add(profiler, endpoint=endpoint, method=method, status=status, stages_ms=stages_ms)
+
+        if response.is_streamed:
+            # Streams are timed until the last chunk went out.
+            response.call_on_close(finish)
+        else:
+            finish()
+        return response
+
     # --- Error Handlers ---
     @app.errorhandler(AuthError)
     def handle_auth_error(err):
         return error_response(err.error_code, err.message, err.status_code)
 
+    @app.errorhandler(AdmissionError)
+    def handle_admission_error(err):
+        resp, status = error_response(err.error_code, err.message, err.status_code)
+        if err.retry_after:
+            resp.headers["Retry-After"] = str(err.retry_after)
+        return resp, status
+
     @app.errorhandler(404)
     def not_found(err):
         return error_response("E404_NOT_FOUND", "The requested resource was not found.", 404)
     
+    @app.errorhandler(413)
+    def payload_too_large(err):
+        limit = app.config["MAX_CONTENT_LENGTH"]
+        return error_response("E413_PAYLOAD_TOO_LARGE", f"Request body exceeds {limit} bytes.", 413)
+
     @app.errorhandler(405)
     def method_not_allowed(err):
         return error_response("E405_METHOD_NOT_ALLOWED", "The method is not allowed for the requested URL.", 405)
@@ -87,9 +306,37 @@ def create_app():
         return error_response("E500_INTERNAL_SERVER_ERROR", "An unexpected internal error occurred.", 500)
 
     # --- Routes ---
+    def accepted_encodings():
+        return {enc.split(";")[0].strip() for enc in request.headers.get("Accept-Encoding", "").lower().split(",")}
+
     @app.route("/")
     def index():
-        return send_from_directory("templates", "index.html")
+        if app.index_page is None:
+            return send_from_directory("templates", "index.html")
+        variants = app.index_page["variants"]
+        accepted = accepted_encodings()
+        encoding = next((enc for enc in ("br", "gzip") if enc in accepted and enc in variants), None)
+        resp = Response(variants[encoding], mimetype="text/html")
+        resp.set_etag(app.index_page["etag"] + (f"-{encoding}" if encoding else ""))
+        # Always revalidate the page itself; the assets it references are immutable.
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.vary.add("Accept-Encoding")
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        return resp.make_conditional(request)
+
+    @app.route("/assets/<path:filename>")
+    def assets(filename):
+        found = app.assets.resolve(filename, request.headers.get("Accept-Encoding", "")) if app.assets else None
+        if found is None:
+            return error_response("E404_NOT_FOUND", "The requested resource was not found.", 404)
+        path, mimetype, encoding, etag = found
+        resp = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=31536000)
+        resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        resp.vary.add("Accept-Encoding")
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        return resp
 
     @app.route("/main.js")
     def main_js():
@@ -101,37 +348,95 @@ def create_app():
 
     @app.route("/api/v1/health")
     def health_check():
-        device = "cuda" if torch.cuda.is_available() else "cpu"
         return ok({
             "status": "ready",
             "model": app.model_manager.model_name,
-            "device": device
+            "device": app.model_manager.device
         })
 
     @app.route("/metrics")
     @require_api_key
     def metrics():
-        if torch.cuda.is_available():
+        torch = loaded("torch")  # only a local model imports it; nothing else uses the GPU
+        if torch is not None and torch.cuda.is_available():
             app.metrics.gpu_memory_used.set(torch.cuda.memory_allocated())
-        app.metrics.requests_total.inc()
-        return Response(generate_latest(app.metrics.registry), mimetype=CONTENT_TYPE_LATEST)
+        return Response(app.metrics.render(), mimetype=CONTENT_TYPE_LATEST)
 
-    def process_request(task, text, stream=False, target_lang=None):
+    @app.route("/debug/profiles")
+    @require_api_key
+    def list_profiles():
+        return ok({"profiles": app.profiles.list()})
+
+    @app.route("/debug/profiles/<profile_id>")
+    @require_api_key
+    def get_profile(profile_id):
+        profile = app.profiles.get(profile_id)
+        if profile is None:
+            return error_response("E404_NOT_FOUND", "Unknown profile.", 404)
+        if request.args.get("format") == "json":
+            return ok({"profile": profile})
+        # Collapsed stacks: feed to flamegraph.pl or drop into speedscope.
+        return Response(profile["collapsed"], mimetype="text/plain")
+
+    def sse_response(stream, after=0):
+        resp = Response(app.streams.subscribe(stream, after), mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"  # keep nginx from buffering the frames
+        resp.headers["X-Stream-Id"] = stream.id
+        return resp
+
+    def process_request(task, text, stream=False, target_lang=None, threshold=None, segmented=False):
         if not text:
             return error_response("E400_BAD_REQUEST", "Missing 'text' field.", 400)
-        
+        if stream:
+            # A reconnect carrying Last-Event-ID picks up the running generation.
+            resumed = app.streams.resumable(request.headers.get("Last-Event-ID"), owner=tenant_id(client_key()))
+            if resumed is not None:
+                return sse_response(*resumed)
+
+        ticket = admission_ticket(text, task)
+        app.admission.acquire(ticket)
         try:
             if stream:
-                def generate():
-                    try:
-                        for chunk in app.model_manager.stream_process(text, task, language=target_lang):
-                            yield f"event: chunk\ndata: {chunk}\n\n"
-                        yield "event: done\ndata: {}\n\n"
-                    except Exception as e:
-                        yield f"event: error\ndata: {str(e)}\n\n"
-                return Response(stream_with_context(generate()), mimetype="text/event-stream")
+                timings = current_timings()
+
+                def first_token():
+                    if timings is not None:
+                        record_stage("ttft", timings.elapsed())
+
+                def on_end(output, error, cancelled):
+                    # Generation outlives the connection (for resume); the slot is held until it ends.
+                    if cancelled:
+                        ticket.cancel()
+                    app.admission.release(ticket)
+                    if error is None and not cancelled:
+                        charge_usage(ticket, text, output)
+
+                try:
+                    sse = app.streams.create(owner=tenant_id(client_key()))
+                    app.streams.pump(sse, app.model_manager.stream_process(text, task, language=target_lang),
+                                     on_first=first_token, on_end=on_end)
+                except Exception:
+                    app.admission.release(ticket)  # the pump never took the ticket over (release is idempotent)
+                    raise
+                return sse_response(sse)
             else:
-                result = app.model_manager.process(text, task, language=target_lang)
+                def run_batch(texts):
+                    return app.model_manager.process_batch(texts, task, language=target_lang or "en")
+                try:
+                    if threshold is not None:
+                        # Selective simplify: only clauses scoring >= threshold go to the model.
+                        result = selective_simplify(text, run_batch, threshold=threshold, metrics=app.metrics)
+                    elif segmented:
+                        result = translate_document(text, target_lang or "en", run_batch)
+                    else:
+                        result = app.model_manager.process(text, task, language=target_lang)
+                finally:
+                    app.admission.release(ticket)
+                if threshold is not None:
+                    charge_usage(ticket, *usage_texts(result))
+                else:
+                    charge_usage(ticket, text, result.get("plain_language") if isinstance(result, dict) else result)
                 # Check if result contains error
                 if isinstance(result, dict) and result.get("error"):
                     return error_response("E500_MODEL_ERROR", result.get("message", "Model processing failed"), 500)
@@ -162,30 +467,25 @@ def create_app():
             return error_response("E400_EMPTY_NAME", "Empty filename", 400)
 
         # Validate file type
-        allowed_extensions = {'.pdf', '.docx', '.txt'}
         file_ext = os.path.splitext(f.filename)[1].lower()
-        if file_ext not in allowed_extensions:
-            return error_response("E400_UNSUPPORTED_FILE", f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}", 400)
-
-        filename = secure_filename(f.filename)
-        with tempfile.TemporaryDirectory() as tdir:
-            path = os.path.join(tdir, filename)
-            f.save(path)
-            ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in ALLOWED_UPLOAD_EXTENSIONS:
+            return error_response("E400_UNSUPPORTED_FILE", f"Unsupported file type: {file_ext}. Allowed: {', '.join(ALLOWED_UPLOAD_EXTENSIONS)}", 400)
 
-            try:
-                if ext == ".pdf":
-                    text = extract_pdf(path)
-                elif ext == ".docx":
-                    text = extract_docx(path)
-                else:
-                    text = extract_txt(path)
-            except Exception as e:
-                return error_response("E422_EXTRACT_FAIL", f"Extraction failed: {e}", 422)
+        pages = request.form.get("pages")
+        layout = request.form.get("layout")
+        try:
+            parse_page_range(pages)
+        except ValueError as e:
+            return error_response("E400_BAD_REQUEST", str(e), 400)
+        if layout not in (None, "full", "fast", "none"):
+            return error_response("E400_BAD_REQUEST", f"Unsupported layout: {layout}", 400)
 
-        # Keep output reasonable
-        text = maybe_truncate(text, int(os.getenv("MAX_EXTRACT_BYTES", str(5 * 1024 * 1024))))
-        return ok({"text": text})
+        analyze = request.form.get("analyze") == "1"
+        try:
+            text, risks = extract_upload(f, file_ext, pages=pages, layout=layout, analyze=analyze)
+        except Exception as e:
+            return error_response("E422_EXTRACT_FAIL", f"Extraction failed: {e}", 422)
+        return ok({"text": text, "risk": risks} if analyze else {"text": text})
 
     @app.route("/api/simplify", methods=["POST"])
     @require_api_key
@@ -194,7 +494,11 @@ def create_app():
         data = request.get_json()
         if not data:
             return error_response("E400_BAD_REQUEST", "Request must be JSON", 400)
-        return process_request("simplify", data.get("text"))
+        try:
+            threshold = selective_threshold(data, "simplify")
+        except (TypeError, ValueError):
+            return error_response("E400_BAD_REQUEST", "complexity_threshold must be a number.", 400)
+        return process_request("simplify", data.get("text"), threshold=threshold)
 
     @app.route("/api/summarize", methods=["POST"])
     @require_api_key
@@ -212,7 +516,8 @@ def create_app():
         data = request.get_json()
         if not data:
             return error_response("E400_BAD_REQUEST", "Request must be JSON", 400)
-        return process_request("translate", data.get("text"), target_lang=data.get("target_lang", "en"))
+        return process_request("translate", data.get("text"), target_lang=data.get("target_lang", "en"),
+                               segmented=segmented_translation(data, "translate"))
 
     @app.route("/api/full-analysis", methods=["POST"])
     @require_api_key
@@ -222,26 +527,253 @@ def create_app():
         if not data:
             return error_response("E400_BAD_REQUEST", "Request must be JSON", 400)
         text = data.get("text")
-        if not text:
+        if not isinstance(text, str) or not text:
             return error_response("E400_BAD_REQUEST", "Missing 'text' field.", 400)
+        owner = tenant_id(client_key())
+        name = data.get("name") if isinstance(data.get("name"), str) else None
+        analysis = f"full-analysis:{app.model_manager.external_llm_url or app.model_manager.model_name}"
+        stored = app.results.find(text, analysis)
+        if stored is not None and stored["result"] is not None:
+            app.results.touch(owner, stored["id"], name)
+            return ok({"result": stored["result"], "document_id": stored["id"]})
         try:
-            simplified = app.model_manager.process(text, "simplify")
-            summary = app.model_manager.process(text, "summarize")
-            risks = full_clause_analysis(text)
-            return ok({"result": {"simplified": simplified, "summary": summary, "risk": risks}})
+            ticket = admission_ticket(text, "simplify")
+            ticket.cost += estimate_tokens(text, "summarize")
+            app.admission.acquire(ticket)
+            try:
+                simplified = app.model_manager.process(text, "simplify")
+                summary = app.model_manager.process(text, "summarize")
+            finally:
+                app.admission.release(ticket)
+            charge_usage(ticket, text, f"{simplified.get('plain_language', '')}{summary.get('plain_language', '')}")
         except ModelError as e:
             return error_response("E500_MODEL_ERROR", str(e), 500)
+        clauses, per_clause = (stored["clauses"], stored["risks"]) if stored else clause_analysis(text)
+        result = {"simplified": simplified, "summary": summary, "risk": merge_risks(per_clause)}
+        failed = simplified.get("error") or summary.get("error")
+        doc_id = app.results.save(owner, text, clauses, per_clause, analysis=analysis,
+                                  result=None if failed else result, name=name)
+        return ok({"result": result, "document_id": doc_id})
+
+    @app.route("/api/v1/batch", methods=["POST"])
+    @require_api_key
+    @apply_rate_limit
+    def batch_submit():
+        max_docs = int(os.getenv("BATCH_MAX_DOCUMENTS", 10000))
+        if request.files:
+            data = request.form
+            documents = []
+            for f in request.files.getlist("files"):
+                ext = os.path.splitext(f.filename or "")[1].lower()
+                if ext not in ALLOWED_UPLOAD_EXTENSIONS:
+                    return error_response("E400_UNSUPPORTED_FILE", f"Unsupported file type for {f.filename}: {ext}. "
+                                          f"Allowed: {', '.join(ALLOWED_UPLOAD_EXTENSIONS)}", 400)
+                try:
+                    text, _ = extract_upload(f, ext)
+                except Exception as e:
+                    return error_response("E422_EXTRACT_FAIL", f"Extraction failed for {f.filename}: {e}", 422)
+                documents.append({"id": f.filename, "text": text})
+        else:
+            data = request.get_json(silent=True)
+            if not data:
+                return error_response("E400_BAD_REQUEST", "Request must be JSON or multipart", 400)
+            documents = [d if isinstance(d, dict) else {"text": d} for d in data.get("documents") or []]
+
+        task = data.get("task", "simplify")
+        if task not in ("simplify", "summarize", "translate"):
+            return error_response("E400_BAD_REQUEST", f"Unsupported task: {task}", 400)
+        if not documents or any(not isinstance(d.get("text"), str) or not d["text"] for d in documents):
+            return error_response("E400_BAD_REQUEST", "Every document needs a non-empty 'text'.", 400)
+        if len(documents) > max_docs:
+            return error_response("E413_TOO_MANY_DOCUMENTS", f"At most {max_docs} documents per batch.", 413)
+
+        job_id = app.job_store.create_job(task, documents, language=data.get("target_lang", "en"),
+                                          owner=tenant_id(client_key()))
+        app.batch_runner.notify()
+        return ok({"job_id": job_id, "status": "queued", "total": len(documents)}, 202)
+
+    def owned_job(job_id):
+        job = app.job_store.get_job(job_id)
+        if job is None or job["owner"] != tenant_id(client_key()):
+            return None
+        return job
+
+    def public_job(job):
+        return {k: job[k] for k in ("id", "task", "language", "status", "total", "done", "failed",
+                                    "created_at", "updated_at")}
+
+    @app.route("/api/v1/batch/<job_id>", methods=["GET"])
+    @require_api_key
+    def batch_status(job_id):
+        job = owned_job(job_id)
+        if job is None:
+            return error_response("E404_NOT_FOUND", "Unknown batch job.", 404)
+        return ok({"job": public_job(job)})
+
+    @app.route("/api/v1/batch/<job_id>/results", methods=["GET"])
+    @require_api_key
+    def batch_results(job_id):
+        job = owned_job(job_id)
+        if job is None:
+            return error_response("E404_NOT_FOUND", "Unknown batch job.", 404)
+
+        wants_ndjson = request.args.get("format") == "ndjson" or \
+            "application/x-ndjson" in request.headers.get("Accept", "")
+        if wants_ndjson:
+            follow = request.args.get("follow") in ("1", "true")
+
+            def generate():
+                for item in app.job_store.iter_finished(job_id, follow=follow):
+                    yield json.dumps(item, ensure_ascii=False) + "\n"
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        try:
+            page = max(1, int(request.args.get("page", 1)))
+            page_size = min(1000, max(1, int(request.args.get("page_size", 100))))
+        except ValueError:
+            return error_response("E400_BAD_REQUEST", "page and page_size must be integers.", 400)
+        items = app.job_store.results(job_id, offset=(page - 1) * page_size, limit=page_size)
+        return ok({"job": public_job(job), "page": page, "page_size": page_size, "items": items})
+
+    @app.route("/api/v1/documents/<doc_id>/versions", methods=["POST"])
+    @require_api_key
+    @apply_rate_limit
+    def document_version(doc_id):
+        data = request.get_json(silent=True)
+        if not data:
+            return error_response("E400_BAD_REQUEST", "Request must be JSON", 400)
+        text = data.get("text")
+        if not isinstance(text, str) or not text:
+            return error_response("E400_BAD_REQUEST", "Missing 'text' field.", 400)
+        if len(doc_id) > 200:
+            return error_response("E400_BAD_REQUEST", "Document id is too long.", 400)
+        language = data.get("target_lang", "en")
+
+        def simplify_clauses(texts):
+            # Only clauses without a stored simplification get here.
+            joined = "\n".join(texts)
+            ticket = admission_ticket(joined, "simplify")
+            app.admission.acquire(ticket)
+            try:
+                outputs = app.model_manager.process_batch(texts, "simplify", language)
+            finally:
+                app.admission.release(ticket)
+            charge_usage(ticket, joined, "".join(o.get("plain_language", "") for o in outputs))
+            return outputs
+
+        simplify = simplify_clauses if data.get("simplify", True) else None
+        document = app.revisions.submit(tenant_id(client_key()), doc_id, text, simplify=simplify, language=language)
+        return ok({"document": document}, 201)
+
+    @app.route("/api/v1/documents/<doc_id>", methods=["GET"])
+    @require_api_key
+    def document_latest(doc_id):
+        document = app.revisions.get(tenant_id(client_key()), doc_id, language=request.args.get("target_lang", "en"))
+        if document is None:
+            return error_response("E404_NOT_FOUND", "Unknown document.", 404)
+        return ok({"document": document})
+
+    def parse_time(value):
+        """Epoch seconds or an ISO 8601 date/time (UTC unless an offset is given)."""
+        if value is None or value == "":
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+    @app.route("/api/v1/results", methods=["GET"])
+    @require_api_key
+    @apply_rate_limit
+    def search_results():
+        args = request.args
+        try:
+            page = max(1, int(args.get("page", 1)))
+            page_size = min(500, max(1, int(args.get("page_size", 50))))
+            since, until = parse_time(args.get("since")), parse_time(args.get("until"))
+        except ValueError:
+            return error_response("E400_BAD_REQUEST", "page/page_size must be integers, since/until dates.", 400)
+        try:
+            found = app.results.search(tenant_id(client_key()), query=args.get("q") or None,
+                                       risk_type=args.get("type") or None, severity=args.get("severity") or None,
+                                       since=since, until=until, offset=(page - 1) * page_size, limit=page_size)
+        except ValueError as e:
+            return error_response("E400_BAD_REQUEST", str(e), 400)
+        return ok({"page": page, "page_size": page_size, **found})
+
+    @app.route("/api/v1/results/<document_id>", methods=["GET"])
+    @require_api_key
+    def stored_result(document_id):
+        document = app.results.get(tenant_id(client_key()), document_id)
+        if document is None:
+            return error_response("E404_NOT_FOUND", "Unknown document.", 404)
+        return ok({"document": document})
+
+    @app.route("/api/v1/streams/<stream_id>", methods=["GET"])
+    @require_api_key
+    def resume_stream(stream_id):
+        """Replay + follow a stream, e.g. an EventSource reconnecting with Last-Event-ID."""
+        stream = app.streams.get(stream_id)
+        if stream is None or stream.owner != tenant_id(client_key()):
+            return error_response("E404_NOT_FOUND", "Unknown or expired stream.", 404)
+        last = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        after = 0
+        if last:
+            resumed = app.streams.resumable(last, owner=stream.owner)
+            if resumed is None or resumed[0] is not stream:
+                return error_response("E410_STREAM_GONE", "Events after this id are no longer buffered.", 410)
+            after = resumed[1]
+        elif not stream.can_resume(0):
+            return error_response("E410_STREAM_GONE", "The start of this stream is no longer buffered.", 410)
+        return sse_response(stream, after)
+
+    @app.route("/api/v1/compare", methods=["POST"])
+    @require_api_key
+    @apply_rate_limit
+    def compare():
+        data = request.get_json(silent=True)
+        if not data:
+            return error_response("E400_BAD_REQUEST", "Request must be JSON", 400)
+        template, contract = data.get("template"), data.get("contract")
+        if not isinstance(template, str) or not template or not isinstance(contract, str) or not contract:
+            return error_response("E400_BAD_REQUEST", "Both 'template' and 'contract' text are required.", 400)
+        max_chars = int(os.getenv("COMPARE_MAX_CHARS", 2 * 1024 * 1024))
+        if len(template) + len(contract) > max_chars:
+            return error_response("E413_PAYLOAD_TOO_LARGE", f"Documents exceed {max_chars} characters.", 413)
+        embedder = get_embedder()
+        if embedder is None:
+            return error_response("E503_EMBEDDER_UNAVAILABLE", "No embedding model is available.", 503)
+        try:
+            thresholds = {k: float(data[k]) for k in ("match_threshold", "min_similarity", "unchanged_threshold")
+                          if k in data}
+        except (TypeError, ValueError):
+            return error_response("E400_BAD_REQUEST", "Thresholds must be numbers.", 400)
+        with stage("compare"):
+            report = compare_documents(template, contract, cached_embed(embedder, app.cache),
+                                       detect=analyze_clause, **thresholds)
+        return ok({"comparison": report})
 
     @app.route("/api/v1/inference", methods=["POST"])
     @require_api_key
     @apply_rate_limit
     def inference():
         data = request.get_json()
+        task = data.get("task", "simplify")
+        try:
+            threshold = selective_threshold(data, task)
+        except (TypeError, ValueError):
+            return error_response("E400_BAD_REQUEST", "complexity_threshold must be a number.", 400)
         return process_request(
-            task=data.get("task", "simplify"),
+            task=task,
             text=data.get("text"),
             stream=data.get("stream", False),
-            target_lang=data.get("target_lang")
+            target_lang=data.get("target_lang"),
+            threshold=threshold,
+            segmented=segmented_translation(data, task),
         )
 
     return app
@@ -0,0 +1,9 @@
+import os
+
+from app.asgi_app import create_asgi_app
+
+application = create_asgi_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(application, host="0.0.0.0", port=int(os.getenv("PORT", "8080")))
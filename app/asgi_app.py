@@ -0,0 +1,441 @@
+"""ASGI serving mode.
+
+Inference routes (`/api/simplify`, `/api/summarize`, `/api/translate`,
+`/api/v1/inference`) run natively on the event loop: admission waits,
+external LLM calls (via httpx when installed) and SSE streaming hold no
+thread, and only blocking model work is offloaded to an executor. Every
+other route is served by the regular Flask app through a thread-pool
+WSGI bridge, so routes and response shapes match `app/wsgi.py` exactly.
+"""
+import asyncio
+import contextvars
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.app import create_app
+from app.models.complexity import selective_simplify, selective_threshold, usage_texts
+from app.models.translation import segmented_translation, translate_document
+from app.models.model_manager import ModelError
+from app.utils.admission import AdmissionError, TIMEOUT_HEADER, parse_timeout_ms
+from app.utils.fair_scheduler import estimate_tokens, record_usage, tenant_id
+from app.utils.metrics import begin_request, current_timings, record_stage, stage
+from app.utils.profiler import server_timing
+from app.utils.security import AuthError, check_api_key
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+TEXT_ROUTES = {
+    "/api/simplify": "simplify",
+    "/api/summarize": "summarize",
+    "/api/translate": "translate",
+}
+INFERENCE_ROUTE = "/api/v1/inference"
+_DONE = object()
+
+
+def _json_body(payload) -> bytes:
+    return json.dumps(payload).encode("utf-8")
+
+
+class AsgiApp:
+    def __init__(self, flask_app=None, executor_threads=None):
+        self.flask_app = flask_app or create_app()
+        self.model_manager = self.flask_app.model_manager
+        self.admission = self.flask_app.admission
+        self.streams = self.flask_app.streams
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_threads or int(os.getenv("ASGI_EXECUTOR_THREADS", 32)),
+            thread_name_prefix="asgi-blocking",
+        )
+        self._client = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            path = scope["path"]
+            if scope["method"] == "POST" and (path in TEXT_ROUTES or path == INFERENCE_ROUTE):
+                await self._observed(self._inference, scope, receive, send)
+            else:
+                await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._client is not None:
+                    await self._client.aclose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- Native inference routes ---
+    async def _observed(self, handler, scope, receive, send):
+        """Same request metrics the Flask middleware records for WSGI routes."""
+        timings = begin_request()
+        status = {"code": 500}
+
+        async def send_observed(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", server_timing(timings).encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await handler(scope, receive, send_observed)
+        finally:
+            self.flask_app.metrics.observe_request(scope["path"], scope["method"], status["code"], timings)
+
+    def _run_blocking(self, fn, *args):
+        # Carry the request's stage timings into the executor thread.
+        ctx = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(self.executor, ctx.run, fn, *args)
+
+    async def _inference(self, scope, receive, send):
+        headers = _headers(scope)
+        limit = self.flask_app.config.get("MAX_CONTENT_LENGTH")
+        body = None if _declared_length(headers) > (limit or math.inf) else await _read_body(receive, limit)
+        if body is None:
+            return await self._too_large(send, limit)
+        key = headers.get("x-api-key") or (scope.get("client") or ("", 0))[0]
+        try:
+            check_api_key(headers.get("x-api-key"))
+        except AuthError as e:
+            return await self._error(send, e.error_code, e.message, e.status_code)
+        if not self.flask_app.rate_limiter.allow(key):
+            return await self._error(send, "E429_RATE_LIMIT_EXCEEDED", "Rate limit exceeded", 429)
+
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or not data:
+            return await self._error(send, "E400_BAD_REQUEST", "Request must be JSON", 400)
+
+        path = scope["path"]
+        if path == INFERENCE_ROUTE:
+            task = data.get("task", "simplify")
+            target_lang = data.get("target_lang")
+            stream = data.get("stream", False)
+        else:
+            task = TEXT_ROUTES[path]
+            target_lang = data.get("target_lang", "en") if task == "translate" else None
+            stream = False
+        text = data.get("text")
+        if not text:
+            return await self._error(send, "E400_BAD_REQUEST", "Missing 'text' field.", 400)
+        try:
+            threshold = None if stream else selective_threshold(data, task)
+        except (TypeError, ValueError):
+            return await self._error(send, "E400_BAD_REQUEST", "complexity_threshold must be a number.", 400)
+        if stream:
+            resumed = self.streams.resumable(headers.get("last-event-id"), owner=tenant_id(key))
+            if resumed is not None:
+                return await self._send_stream(receive, send, *resumed)
+
+        ticket = self.admission.ticket(timeout=parse_timeout_ms(headers.get(TIMEOUT_HEADER.lower())),
+                                       key=tenant_id(key), cost=estimate_tokens(text, task))
+        try:
+            await self.admission.acquire_async(ticket)
+        except AdmissionError as e:
+            extra = [(b"retry-after", str(e.retry_after).encode())] if e.retry_after else []
+            return await self._error(send, e.error_code, e.message, e.status_code, extra)
+
+        if stream:
+            return await self._stream(receive, send, ticket, text, task, target_lang)
+        try:
+            if threshold is not None:
+                result = await self._run_blocking(self._selective, text, target_lang, threshold)
+            elif segmented_translation(data, task):
+                result = await self._run_blocking(self._translate, text, target_lang)
+            else:
+                result = await self._process(text, task, target_lang)
+        except ModelError as e:
+            return await self._error(send, "E500_MODEL_ERROR", str(e), 500)
+        except Exception as e:
+            return await self._error(send, "E500_INTERNAL_SERVER_ERROR", f"Unexpected error: {str(e)}", 500)
+        finally:
+            self.admission.release(ticket)
+        if threshold is not None:
+            record_usage(self.flask_app.metrics, ticket.key, *usage_texts(result))
+        else:
+            record_usage(self.flask_app.metrics, ticket.key, text, result.get("plain_language"))
+        if result.get("error"):
+            return await self._error(send, "E500_MODEL_ERROR", result.get("message", "Model processing failed"), 500)
+        await self._respond(send, 200, {"ok": True, "result": result})
+
+    async def _process(self, text, task, language):
+        mm = self.model_manager
+        if mm.fast_test or not mm.external_llm_url or httpx is None:
+            return await self._run_blocking(mm.process, text, task, language)
+        # Same stages as ModelManager.process, so both serving modes report alike.
+        with stage("prompt_build"):
+            prompt = mm.prompt_manager.build(task, text, language)
+            headers, payload = mm.build_external_request(prompt)
+        try:
+            if self._client is None:
+                self._client = httpx.AsyncClient(timeout=60)
+            with stage("model"):
+                response = await self._client.post(mm.external_llm_url, headers=headers, json=payload)
+                response.raise_for_status()
+                result = mm.parse_external_response(response.json())
+            return {"plain_language": result.strip()}
+        except Exception as e:
+            return {"error": True, "message": str(e)}
+
+    def _selective(self, text, language, threshold):
+        mm = self.model_manager
+        return selective_simplify(text, lambda texts: mm.process_batch(texts, "simplify", language=language or "en"),
+                                  threshold=threshold, metrics=self.flask_app.metrics)
+
+    def _translate(self, text, language):
+        mm = self.model_manager
+        return translate_document(text, language or "en",
+                                  lambda texts: mm.process_batch(texts, "translate", language=language or "en"))
+
+    async def _chunks(self, text, task, language):
+        mm = self.model_manager
+        if mm.external_llm_url and not mm.fast_test and httpx is not None:
+            result = await self._process(text, task, language)
+            if result.get("error"):
+                yield f"Error: {result['message']}"
+                return
+            for word in result["plain_language"].split():
+                yield word + " "
+            return
+        it = mm.stream_process(text, task, language=language)
+        try:
+            while True:
+                chunk = await self._run_blocking(next, it, _DONE)
+                if chunk is _DONE:
+                    return
+                yield chunk
+        finally:
+            await self._run_blocking(it.close)
+
+    async def _stream(self, receive, send, ticket, text, task, language):
+        timings = current_timings()
+
+        def first_token():
+            if timings is not None:
+                record_stage("ttft", timings.elapsed())
+
+        def on_end(output, error, cancelled):
+            if cancelled:
+                ticket.cancel()
+            self.admission.release(ticket)
+            if error is None and not cancelled:
+                record_usage(self.flask_app.metrics, ticket.key, text, output)
+
+        try:
+            stream = self.streams.create(owner=ticket.key)
+            self.streams.pump_async(stream, self._chunks(text, task, language), on_first=first_token, on_end=on_end)
+        except Exception:
+            self.admission.release(ticket)  # the pump never took the ticket over (release is idempotent)
+            raise
+        await self._send_stream(receive, send, stream)
+
+    async def _send_stream(self, receive, send, stream, after=0):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no"), (b"x-stream-id", stream.id.encode("latin-1"))],
+        })
+        disconnected = asyncio.Event()
+        watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+        frames = self.streams.subscribe_async(stream, after)
+        try:
+            async for frame in frames:
+                if disconnected.is_set():
+                    break
+                await _send_chunk(send, frame)
+            if not disconnected.is_set():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            # Generation keeps running for a reconnect; the stream is abandoned
+            # (and the ticket cancelled) once nobody has read it for the grace period.
+            await frames.aclose()
+            watcher.cancel()
+
+    async def _respond(self, send, status, payload, extra_headers=()):
+        body = _json_body(payload)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()), *extra_headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _error(self, send, code, message, status, extra_headers=()):
+        await self._respond(send, status, {"ok": False, "error": {"code": code, "message": message}},
+                            extra_headers)
+
+    async def _too_large(self, send, limit):
+        # Same envelope as the Flask 413 handler.
+        await self._error(send, "E413_PAYLOAD_TOO_LARGE", f"Request body exceeds {limit} bytes.", 413)
+
+    # --- WSGI bridge for every other route ---
+    async def _wsgi(self, scope, receive, send):
+        # MAX_CONTENT_LENGTH is enforced here too, so an oversized body is
+        # refused before it is spooled rather than after.
+        limit = self.flask_app.config.get("MAX_CONTENT_LENGTH")
+        if _declared_length(_headers(scope)) > (limit or math.inf):
+            return await self._too_large(send, limit)
+        body = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+        size, more = 0, True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if limit is not None and size > limit:
+                body.close()
+                return await self._too_large(send, limit)
+            body.write(chunk)
+            more = message.get("more_body", False)
+        body.seek(0)
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        started = {}
+        gone = threading.Event()
+
+        def start_response(status, response_headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1"))
+                                  for k, v in response_headers]
+            return lambda data: None
+
+        def run():
+            # One thread per request keeps Flask's context locals consistent
+            # for responses that stream via stream_with_context.
+            try:
+                result = self.flask_app(_environ(scope, body), start_response)
+                try:
+                    for chunk in result:
+                        if gone.is_set():
+                            break  # client went away: stop producing; close() ends e.g. an SSE subscription
+                        if chunk:
+                            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            finally:
+                body.close()
+                loop.call_soon_threadsafe(chunks.put_nowait, _DONE)
+
+        async def watch():
+            await _watch_disconnect(receive, asyncio.Event())
+            gone.set()
+            chunks.put_nowait(_DONE)
+
+        future = loop.run_in_executor(self.executor, run)
+        watcher = asyncio.ensure_future(watch())
+        try:
+            chunk = await chunks.get()
+            if not gone.is_set():
+                await send({"type": "http.response.start", "status": started.get("status", 500),
+                            "headers": started.get("headers", [])})
+            while chunk is not _DONE and not gone.is_set():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await chunks.get()
+            if not gone.is_set():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            gone.set()  # also when send() failed
+            watcher.cancel()
+        await future
+
+
+def _headers(scope):
+    headers = {}
+    for k, v in scope.get("headers", []):
+        name = k.decode("latin-1").lower()
+        value = v.decode("latin-1")
+        headers[name] = f"{headers[name]},{value}" if name in headers else value
+    return headers
+
+
+def _declared_length(headers) -> int:
+    try:
+        return int(headers.get("content-length", 0))
+    except ValueError:
+        return 0
+
+
+async def _read_body(receive, limit=None) -> Optional[bytes]:
+    """The request body, or None once it grows past `limit` bytes."""
+    parts, size = [], 0
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        parts.append(message.get("body", b""))
+        size += len(parts[-1])
+        if limit is not None and size > limit:
+            return None
+        more = message.get("more_body", False)
+    return b"".join(parts)
+
+
+async def _watch_disconnect(receive, event):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            event.set()
+            return
+
+
+async def _send_chunk(send, frame: str):
+    await send({"type": "http.response.body", "body": frame.encode("utf-8"), "more_body": True})
+
+
+def _environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in _headers(scope).items():
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name == "content-length":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+    return environ
+
+
+def create_asgi_app(flask_app=None):
+    return AsgiApp(flask_app)
@@ -0,0 +1,30 @@
+"""Gunicorn settings: `gunicorn -c app/gunicorn_conf.py app.wsgi:application`.
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to that
+directory and /metrics merges them, so a scrape sees the whole server
+rather than whichever worker answered it.
+"""
+import os
+import shutil
+
+# Imported up front: child_exit runs in the master's SIGCHLD handler, where a
+# first import can be interrupted by the next worker exit and re-entered.
+from prometheus_client import multiprocess
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+
+
+def on_starting(server):
+    # Samples left over from a previous master would be merged into this one.
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
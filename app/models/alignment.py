@@ -0,0 +1,170 @@
+# app/models/alignment.py
+"""
+Contract-vs-template comparison. Both documents are split into clauses and
+embedded in one batch; a single matrix product gives every clause-to-clause
+cosine similarity. Clauses are aligned in two passes:
+
+1. anchors: mutual best matches above `match_threshold`, kept only where they
+   preserve document order (longest increasing subsequence); a confident
+   match that breaks the order is reported as "moved";
+2. gaps: between consecutive anchors, remaining clauses are paired the same
+   way with the looser `min_similarity`, which catches reworded clauses.
+
+Matched pairs below `unchanged_threshold` are "changed" and, like clauses the
+contract added, are run through risk detection. Unmatched template clauses
+are "missing".
+"""
+import hashlib
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.extract import split_into_clauses
+
+
+def cached_embed(embedder, cache, ttl: int = 7 * 24 * 3600) -> Callable[[List[str]], np.ndarray]:
+    """
+    embedder.embed() with vectors kept in `cache` (get_many/set_many, one
+    round trip each), so a template compared over and over is embedded once.
+    Hash-fallback vectors (no model loaded) are not cached.
+    """
+    cacheable = getattr(embedder, "model", None) is not None or getattr(embedder, "encoder", None) is not None
+    prefix = f"emb:{getattr(embedder, 'model_name', '')}:{getattr(embedder, 'backend', '')}:"
+
+    def embed(texts: List[str]) -> np.ndarray:
+        if not cacheable or not texts:
+            return np.asarray(embedder.embed(texts), dtype=np.float32)
+        keys = [prefix + hashlib.sha256(t.encode("utf-8")).hexdigest() for t in texts]
+        found = cache.get_many(keys)
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            vectors = np.asarray(embedder.embed([texts[i] for i in missing]), dtype=np.float32)
+            fresh = {keys[i]: v.tobytes() for i, v in zip(missing, vectors)}
+            cache.set_many(fresh, ttl=ttl)
+            found.update(fresh)
+        return np.stack([np.frombuffer(found[k], dtype=np.float32) for k in keys])
+
+    return embed
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def _mutual_best(sim: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """(rows, cols) of pairs that are each other's best match, with similarity >= threshold."""
+    rows = np.arange(sim.shape[0])
+    row_best = sim.argmax(axis=1)
+    col_best = sim.argmax(axis=0)
+    keep = (col_best[row_best] == rows) & (sim[rows, row_best] >= threshold)
+    return rows[keep], row_best[keep]
+
+
+def _increasing(cols: np.ndarray) -> np.ndarray:
+    """Positions of a longest strictly increasing subsequence of `cols`."""
+    tails, tail_pos, prev = [], [], [-1] * len(cols)
+    for i, c in enumerate(cols.tolist()):
+        k = bisect_left(tails, c)
+        if k == len(tails):
+            tails.append(c)
+            tail_pos.append(i)
+        else:
+            tails[k] = c
+            tail_pos[k] = i
+        prev[i] = tail_pos[k - 1] if k else -1
+    out = []
+    i = tail_pos[-1] if tail_pos else -1
+    while i >= 0:
+        out.append(i)
+        i = prev[i]
+    return np.array(out[::-1], dtype=np.int64)
+
+
+def align(sim: np.ndarray, match_threshold: float = 0.8, min_similarity: float = 0.55) -> Dict:
+    """
+    Ordered alignment of template rows to contract columns of `sim`.
+    Returns {"pairs": [(t, c)], "moved": [(t, c)]}, pairs in document order.
+    """
+    n, m = sim.shape
+    if n == 0 or m == 0:
+        return {"pairs": [], "moved": []}
+    rows, cols = _mutual_best(sim, match_threshold)
+    ordered = _increasing(cols)
+    anchors = list(zip(rows[ordered].tolist(), cols[ordered].tolist()))
+    in_order = np.zeros(len(rows), dtype=bool)
+    in_order[ordered] = True
+    moved = list(zip(rows[~in_order].tolist(), cols[~in_order].tolist()))
+    moved_rows = {t for t, _ in moved}
+    moved_cols = {c for _, c in moved}
+
+    pairs = []
+    bounds = [(-1, -1)] + anchors + [(n, m)]
+    for (t0, c0), (t1, c1) in zip(bounds, bounds[1:]):
+        if t1 - t0 > 1 and c1 - c0 > 1:
+            t_free = np.array([t for t in range(t0 + 1, t1) if t not in moved_rows], dtype=np.int64)
+            c_free = np.array([c for c in range(c0 + 1, c1) if c not in moved_cols], dtype=np.int64)
+            if len(t_free) and len(c_free):
+                block = sim[np.ix_(t_free, c_free)]
+                r, c = _mutual_best(block, min_similarity)
+                keep = _increasing(c)
+                pairs.extend(zip(t_free[r[keep]].tolist(), c_free[c[keep]].tolist()))
+        if t1 < n:
+            pairs.append((t1, c1))
+    return {"pairs": pairs, "moved": moved}
+
+
+def compare_documents(template: str, contract: str, embed: Callable[[List[str]], np.ndarray],
+                      detect: Optional[Callable[[str], List[Dict]]] = None, match_threshold: float = 0.8,
+                      min_similarity: float = 0.55, unchanged_threshold: float = 0.97) -> Dict:
+    """Clause-level comparison report of `contract` against `template`."""
+    t_clauses = split_into_clauses(template)
+    c_clauses = split_into_clauses(contract)
+    unique = list(dict.fromkeys(t_clauses + c_clauses))
+    index = {text: i for i, text in enumerate(unique)}
+    vectors = normalize_rows(embed(unique)) if unique else np.zeros((0, 1), dtype=np.float32)
+    t_vecs = vectors[[index[t] for t in t_clauses]] if t_clauses else vectors[:0]
+    c_vecs = vectors[[index[c] for c in c_clauses]] if c_clauses else vectors[:0]
+    sim = t_vecs @ c_vecs.T
+
+    result = align(sim, match_threshold=match_threshold, min_similarity=min_similarity)
+    matches = []
+    for status_hint, pairs in (("", result["pairs"]), ("moved", result["moved"])):
+        for t, c in pairs:
+            score = float(sim[t, c])
+            same = t_clauses[t] == c_clauses[c] or score >= unchanged_threshold
+            item = {
+                "status": status_hint or ("unchanged" if same else "changed"),
+                "template_index": t, "contract_index": c, "similarity": round(score, 4),
+                "template": t_clauses[t], "contract": c_clauses[c],
+            }
+            if not same and detect is not None:
+                item["risks"] = detect(c_clauses[c])
+            matches.append(item)
+    matches.sort(key=lambda item: item["contract_index"])
+
+    matched_t = {item["template_index"] for item in matches}
+    matched_c = {item["contract_index"] for item in matches}
+    missing = [{"template_index": i, "template": text} for i, text in enumerate(t_clauses) if i not in matched_t]
+    added = []
+    for i, text in enumerate(c_clauses):
+        if i not in matched_c:
+            item = {"contract_index": i, "contract": text}
+            if detect is not None:
+                item["risks"] = detect(text)
+            added.append(item)
+
+    statuses = [item["status"] for item in matches]
+    return {
+        "summary": {
+            "template_clauses": len(t_clauses),
+            "contract_clauses": len(c_clauses),
+            **{s: statuses.count(s) for s in ("unchanged", "changed", "moved")},
+            "missing": len(missing),
+            "added": len(added),
+        },
+        "matches": matches,
+        "missing": missing,
+        "added": added,
+    }
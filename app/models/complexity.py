@@ -0,0 +1,183 @@
+"""Clause complexity scoring and selective simplification.
+
+Scores are computed for a whole document at once: every word of every
+clause goes into one flat array (with the index of its clause), per-word
+syllable counts and lexicon hits are looked up once per distinct word, and
+per-clause sums are np.bincount over the clause index. A clause's score in
+[0, 1] combines
+
+- Flesch-Kincaid grade level (words per sentence, syllables per word),
+- legalese density (lexicon words and phrases per word),
+- length in words,
+- share of words with three or more syllables.
+
+In selective mode, clauses scoring under the threshold are returned as they
+are and only the rest are sent to the model, in one batch.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+LEGALESE_WORDS = frozenset("""
+    aforementioned aforesaid assigns covenant covenants deemed forthwith foregoing henceforth hereafter
+    hereby herein hereinafter hereof hereto heretofore hereunder hereunto howsoever indemnification
+    indemnified indemnify indemnifying indemnitee indemnitor insofar lien mutatis mutandis notwithstanding
+    pursuant shall successors thereafter thereby therefor therefrom therein thereof thereon thereto
+    theretofore thereunder whatsoever whereas whereby wherein whereof whomsoever witnesseth
+""".split())
+
+LEGALESE_PHRASES = re.compile(
+    r"\b(?:inter alia|force majeure|hold harmless|in witness whereof|any and all|arising out of|"
+    r"in connection with|without prejudice|to the extent that|provided that|subject to|save as|"
+    r"for the avoidance of doubt|time is of the essence|jointly and severally|null and void)\b"
+)
+
+_WORD = re.compile(r"[A-Za-z]+(?:['-][A-Za-z]+)*")
+_VOWEL_GROUPS = re.compile(r"[aeiouy]+")
+_SENTENCE_BREAK = re.compile(r"((?<=[.;!?])\s+)")
+
+# Score weights (sum to 1) and the ranges each feature is scaled over.
+WEIGHTS = {"grade": 0.35, "legalese": 0.35, "length": 0.2, "polysyllables": 0.1}
+GRADE_RANGE = (6.0, 18.0)
+LENGTH_RANGE = (12.0, 45.0)
+LEGALESE_FULL = 1 / 6.0  # one lexicon hit per six words scores 1
+DEFAULT_THRESHOLD = 0.35
+
+
+@lru_cache(maxsize=65536)
+def syllables(word: str) -> int:
+    word = word.lower()
+    count = len(_VOWEL_GROUPS.findall(word))
+    if count > 1 and word.endswith("e") and not word.endswith(("le", "ee")):
+        count -= 1  # silent final e
+    return max(1, count)
+
+
+@lru_cache(maxsize=65536)
+def _is_legalese(word: str) -> bool:
+    return word.lower() in LEGALESE_WORDS
+
+
+def split_clauses(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Sentence-level clauses with their punctuation, and the whitespace around
+    them kept verbatim: separators[0] + clauses[0] + separators[1] + ... +
+    clauses[-1] + separators[-1] == text, so line breaks survive reassembly.
+    """
+    body = text.strip()
+    if not body:
+        return [], [text]
+    pieces = _SENTENCE_BREAK.split(body)
+    lead = text[:len(text) - len(text.lstrip())]
+    trail = text[len(text.rstrip()):]
+    return pieces[0::2], [lead] + pieces[1::2] + [trail]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentence-level clauses with their punctuation, so pass-through text is unchanged."""
+    return split_clauses(text)[0]
+
+
+def _scale(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def complexity_features(clauses: List[str]) -> Dict[str, np.ndarray]:
+    n = len(clauses)
+    words = [_WORD.findall(c) for c in clauses]
+    owner = np.repeat(np.arange(n), [len(w) for w in words])
+    flat = [w for ws in words for w in ws]
+    syl = np.fromiter((syllables(w) for w in flat), dtype=np.float64, count=len(flat))
+    legal = np.fromiter((_is_legalese(w) for w in flat), dtype=np.float64, count=len(flat))
+
+    word_count = np.bincount(owner, minlength=n).astype(np.float64)
+    safe = np.maximum(word_count, 1.0)
+    syllable_count = np.bincount(owner, weights=syl, minlength=n)
+    polysyllables = np.bincount(owner, weights=(syl >= 3), minlength=n)
+    phrases = np.fromiter((len(LEGALESE_PHRASES.findall(c.lower())) for c in clauses), dtype=np.float64, count=n)
+    legalese = np.bincount(owner, weights=legal, minlength=n) + phrases
+    return {
+        "words": word_count,
+        "grade": 0.39 * word_count + 11.8 * syllable_count / safe - 15.59,
+        # Floored denominator: one "shall" does not make a six-word sentence dense.
+        "legalese_density": legalese / np.maximum(word_count, LENGTH_RANGE[0]),
+        "polysyllable_share": polysyllables / safe,
+    }
+
+
+def complexity_scores(clauses: List[str]) -> np.ndarray:
+    """Complexity in [0, 1] for each clause (0 for clauses without words)."""
+    if not clauses:
+        return np.zeros(0)
+    f = complexity_features(clauses)
+    score = (
+        WEIGHTS["grade"] * _scale(f["grade"], *GRADE_RANGE)
+        + WEIGHTS["legalese"] * np.clip(f["legalese_density"] / LEGALESE_FULL, 0.0, 1.0)
+        + WEIGHTS["length"] * _scale(f["words"], *LENGTH_RANGE)
+        + WEIGHTS["polysyllables"] * np.clip(f["polysyllable_share"] * 3, 0.0, 1.0)
+    )
+    return np.where(f["words"] > 0, score, 0.0)
+
+
+def selective_threshold(data: Dict, task: str) -> Optional[float]:
+    """
+    The complexity threshold when a request asks for selective simplify
+    ("selective": true, or SIMPLIFY_SELECTIVE=1 by default), else None.
+    Raises ValueError for a threshold that is not a number.
+    """
+    if task != "simplify" or not data.get("selective", os.getenv("SIMPLIFY_SELECTIVE", "0") == "1"):
+        return None
+    return float(data.get("complexity_threshold",
+                          os.getenv("SIMPLIFY_COMPLEXITY_THRESHOLD", DEFAULT_THRESHOLD)))
+
+
+def selective_simplify(text: str, simplify_batch: Callable[[List[str]], List[Dict]],
+                       threshold: float = DEFAULT_THRESHOLD, metrics=None) -> Dict:
+    """
+    Simplify only the clauses of `text` scoring at or above `threshold`, in
+    one `simplify_batch` call (model_manager.process_batch-style results).
+    The original whitespace between clauses (line and paragraph breaks) is
+    kept. A clause whose rewrite failed keeps its text and reports the
+    error; if every rewrite failed the result carries "error" like process().
+    """
+    clauses, separators = split_clauses(text)
+    scores = complexity_scores(clauses)
+    hard = [i for i, s in enumerate(scores) if s >= threshold]
+    outputs = dict(zip(hard, simplify_batch([clauses[i] for i in hard]))) if hard else {}
+
+    items, failed = [], 0
+    for i, (clause, score) in enumerate(zip(clauses, scores.tolist())):
+        item = {"index": i, "text": clause, "score": round(score, 3), "rewritten": False, "output": clause}
+        out = outputs.get(i)
+        if out is not None and out.get("error"):
+            item["error"] = out.get("message", "Model processing failed")
+            failed += 1
+        elif out is not None:
+            item["output"] = out.get("plain_language", "").strip() or clause
+            item["rewritten"] = True
+        items.append(item)
+
+    rewritten = [item["index"] for item in items if item["rewritten"]]
+    if metrics is not None:
+        metrics.simplify_clauses_total.labels(route="rewritten").inc(len(rewritten))
+        metrics.simplify_clauses_total.labels(route="passthrough").inc(len(clauses) - len(hard))
+    result = {
+        "plain_language": separators[0] + "".join(item["output"] + sep for item, sep in zip(items, separators[1:])),
+        "clauses": items,
+        "rewritten": rewritten,
+        "stats": {"clauses": len(clauses), "rewritten": len(rewritten), "passed_through": len(clauses) - len(hard),
+                  "failed": failed, "threshold": threshold},
+    }
+    if hard and failed == len(hard):
+        result.update(error=True, message=items[hard[0]]["error"])
+    return result
+
+
+def usage_texts(result: Dict) -> Tuple[str, str]:
+    """(text sent to the model, text it generated) for token accounting."""
+    sent = [item for item in result["clauses"] if item["rewritten"] or "error" in item]
+    return (" ".join(item["text"] for item in sent),
+            " ".join(item["output"] for item in sent if item["rewritten"]))
@@ -1,28 +1,178 @@
 import os
+import queue
+import threading
 import numpy as np
 import hashlib
-from typing import List
+from typing import Callable, List
 
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    SentenceTransformer = None
+from app.utils.optional import optional_import
+
+# Backends are imported when an Embedder is built: sentence-transformers (torch),
+# or for EMBEDDING_BACKEND=onnx an int8-quantized export of the same model run
+# by onnxruntime, tokenized with the Rust `tokenizers` package.
+
+ONNX_MODEL_FILE = "model_quantized.onnx"
+
+
+def length_sorted_batches(lengths: List[int], batch_size: int) -> List[List[int]]:
+    """Indices grouped into batches of similar length, so little of each batch is padding."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mean over real tokens, L2-normalized: the Pooling + Normalize steps of all-MiniLM-L6-v2."""
+    mask = attention_mask[..., None].astype(token_embeddings.dtype)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+class OnnxEncoder:
+    """Sentence embeddings from an exported, int8-quantized graph (see export_onnx)."""
+
+    def __init__(self, path: str, threads: int = 0, batch_size: int = 32, max_length: int = 256):
+        ort = optional_import("onnxruntime")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(os.path.join(path, ONNX_MODEL_FILE), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = optional_import("tokenizers").Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.batch_size = batch_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        for batch in length_sorted_batches([len(e.ids) for e in encodings], self.batch_size):
+            width = max(len(encodings[i].ids) for i in batch)
+            ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                n = len(encodings[i].ids)
+                ids[row, :n] = encodings[i].ids
+                mask[row, :n] = 1
+            feed = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feed["token_type_ids"] = np.zeros_like(ids)
+            vectors = mean_pool(self.session.run(None, feed)[0], mask)
+            if out.shape[1] == 0:
+                out = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[batch] = vectors
+        return out
+
+
+class MicroBatcher:
+    """
+    Dynamic batching: encode() calls from concurrent threads that arrive within
+    `max_wait` seconds of each other run as one batch on a single worker thread.
+    """
+
+    def __init__(self, fn: Callable[[List[str]], np.ndarray], max_batch: int = 64, max_wait: float = 0.005):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        done = threading.Event()
+        slot = {"texts": texts, "done": done}
+        self._queue.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["result"]
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0]["texts"])
+            try:
+                while size < self.max_batch:
+                    slot = self._queue.get(timeout=self.max_wait)
+                    pending.append(slot)
+                    size += len(slot["texts"])
+            except queue.Empty:
+                pass
+            try:
+                vectors = self.fn([t for slot in pending for t in slot["texts"]])
+                start = 0
+                for slot in pending:
+                    slot["result"] = vectors[start:start + len(slot["texts"])]
+                    start += len(slot["texts"])
+            except Exception as e:
+                for slot in pending:
+                    slot["error"] = e
+            for slot in pending:
+                slot["done"].set()
+
+
+def export_onnx(model_name: str, path: str, opset: int = 17):
+    """
+    Export `model_name` to ONNX and quantize its weights to int8 (dynamic
+    quantization: activations stay float). Needs torch + transformers +
+    onnxruntime at export time only; serving needs onnxruntime + tokenizers.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(path, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(path)  # writes tokenizer.json for the fast tokenizer
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+    float_path = os.path.join(path, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[n] for n in names), float_path, input_names=names,
+                          output_names=["last_hidden_state"],
+                          dynamic_axes={**dynamic, "last_hidden_state": {0: "batch", 1: "sequence"}},
+                          opset_version=opset)
+    quantize_dynamic(float_path, os.path.join(path, ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(float_path)
+    return path
 
 
 class Embedder:
     def __init__(self):
         self.model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        self.backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
         self.model = None
-        if SentenceTransformer:
+        self.encoder = None
+        if self.backend == "onnx" and optional_import("onnxruntime") and optional_import("tokenizers"):
+            try:
+                self.encoder = OnnxEncoder(
+                    os.getenv("EMBEDDING_ONNX_PATH", "models/all-MiniLM-L6-v2-int8"),
+                    threads=int(os.getenv("EMBEDDING_THREADS", 0)),
+                    batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", 32)),
+                )
+            except Exception:
+                self.encoder = None
+        if self.encoder is not None:
+            wait_ms = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 0))
+            self._encode = self.encoder.encode
+            if wait_ms > 0:
+                self._encode = MicroBatcher(self.encoder.encode, max_batch=int(os.getenv("EMBEDDING_BATCH_SIZE", 32)),
+                                            max_wait=wait_ms / 1000.0).encode
+        elif optional_import("sentence_transformers"):
             try:
-                self.model = SentenceTransformer(self.model_name)
+                self.model = optional_import("sentence_transformers").SentenceTransformer(self.model_name)
             except Exception:
                 self.model = None
 
     def embed(self, texts: List[str]) -> np.ndarray:
+        if self.encoder is not None:
+            return self._encode(texts)
         if self.model:
             return self.model.encode(texts, convert_to_numpy=True)
-        
+
         # Fallback to deterministic random vectors
         vectors = []
         for text in texts:
@@ -34,17 +184,27 @@ class Embedder:
     def search(self, query: str, corpus: List[str], top_k: int = 3):
         if not corpus:
             return []
-        
+
         query_vec = self.embed([query])[0]
         corpus_vecs = self.embed(corpus)
-        
+
         # Cosine similarity
         sim = np.dot(corpus_vecs, query_vec) / (np.linalg.norm(corpus_vecs, axis=1) * np.linalg.norm(query_vec))
-        
+
         # Get top_k results
         top_indices = np.argsort(-sim)[:top_k]
         return [(i, sim[i]) for i in top_indices]
 
     def find_similar_risks(self, text: str):
         # This is a stub as per the instructions
-        return []
\ No newline at end of file
+        return []
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the embedding model as an int8 ONNX graph")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    parser.add_argument("--out", default=os.getenv("EMBEDDING_ONNX_PATH", "models/all-MiniLM-L6-v2-int8"))
+    args = parser.parse_args()
+    print(export_onnx(args.model, args.out))
@@ -1,29 +1,15 @@
+import copy
+import hashlib
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
-# Optional imports for AI functionality
-try:
-    import torch
-except ImportError:
-    class TorchStub:
-        class cuda:
-            @staticmethod
-            def is_available():
-                return False
-            @staticmethod
-            def memory_allocated():
-                return 0
-    torch = TorchStub()
-
-try:
-    from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline, BitsAndBytesConfig
-except ImportError:
-    AutoTokenizer = None
-    AutoModelForCausalLM = None
-    pipeline = None
-    BitsAndBytesConfig = None
+import requests
 
 from app.models.prompt_manager import PromptManager
+from app.models.replica_pool import ReplicaPool, default_threads_per_slot
+from app.utils.metrics import stage
+from app.utils.optional import cuda_available, optional_import
 
 
 class ModelError(Exception):
@@ -37,7 +23,8 @@ class ModelManager:
         self.model_name = os.getenv("MODEL_NAME", "TinyLlama/TinyLlama-1.1B-Chat-v1.0")
         self.quantize = os.getenv("QUANTIZE")
         self.fast_test = os.getenv("FAST_TEST") == "1"
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Only a local model needs torch; other modes run on (and report) the CPU.
+        self.device = "cpu"
         self.last_device = self.device
 
         # External LLM (Akash AI or any HTTP endpoint)
@@ -47,11 +34,20 @@ class ModelManager:
         self.external_llm_scheme = os.getenv("EXTERNAL_LLM_API_KEY_SCHEME", "Bearer")
         # Accepts: "simple" (json {prompt}) or "openai" (OpenAI-compatible Chat Completions)
         self.external_llm_format = os.getenv("EXTERNAL_LLM_FORMAT", "simple").lower()
+        # Batch knobs: local pipeline batch size, concurrent external calls
+        self.batch_size = max(1, int(os.getenv("MODEL_BATCH_SIZE", "8")))
+        self.external_concurrency = max(1, int(os.getenv("EXTERNAL_LLM_CONCURRENCY", "4")))
+
+        # Local execution slots (see ReplicaPool)
+        self.replicas = max(1, int(os.getenv("MODEL_REPLICAS", "1")))
+        self.threads_per_replica = int(os.getenv("TORCH_THREADS_PER_REPLICA", "0")) or \
+            default_threads_per_slot(self.replicas)
 
         # Lazy model holders
         self.model = None
         self.tokenizer = None
         self.generator = None
+        self.pool = None
         self.prompt_manager = PromptManager()
 
         # Load local model only when not using external URL and not in fast-test mode
@@ -59,41 +55,81 @@ class ModelManager:
             self._load_local_model()
 
     def _load_local_model(self):
-        if not AutoTokenizer or not AutoModelForCausalLM or not pipeline:
+        transformers = optional_import("transformers")
+        if transformers is None:
             raise ModelError("Transformers library not available. Install transformers or use external API.")
-        
+        self.device = self.last_device = "cuda" if cuda_available() else "cpu"
+
         try:
             quantization_config = None
+            BitsAndBytesConfig = getattr(transformers, "BitsAndBytesConfig", None)
             if self.device == "cuda" and BitsAndBytesConfig:
                 if self.quantize == "8bit":
                     quantization_config = BitsAndBytesConfig(load_in_8bit=True)
                 elif self.quantize == "4bit":
                     quantization_config = BitsAndBytesConfig(load_in_4bit=True)
 
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_name)
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
 
-            self.model = AutoModelForCausalLM.from_pretrained(
+            self.model = transformers.AutoModelForCausalLM.from_pretrained(
                 self.model_name,
                 quantization_config=quantization_config,
                 device_map='auto' if self.device == 'cuda' else None,
             )
-            self.generator = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                max_new_tokens=512,
-                temperature=0.2,
-                do_sample=False,
+            self.generator = self._build_pipeline(self.tokenizer)
+            # Replicas share the loaded weights; each slot gets its own pipeline object and
+            # its own tokenizer (fast tokenizers are not thread-safe: "Already borrowed").
+            self.pool = ReplicaPool(
+                lambda idx: self.generator if idx == 0 else self._build_pipeline(copy.deepcopy(self.tokenizer)),
+                slots=self.replicas,
+                threads_per_slot=self.threads_per_replica,
             )
         except Exception as e:
             raise ModelError(f"Failed to load local model: {e}")
 
-    def _external_call(self, prompt):
-        if not self.external_llm_url:
-            raise ModelError("External LLM URL not configured")
+    def _build_pipeline(self, tokenizer):
+        return optional_import("transformers").pipeline(
+            "text-generation",
+            model=self.model,
+            tokenizer=tokenizer,
+            max_new_tokens=512,
+            temperature=0.2,
+            do_sample=False,
+        )
+
+    def _generate(self, prompt: str) -> str:
+        """Run the local pipeline on a free replica slot."""
+        if self.pool:
+            generated_outputs = self.pool.run(lambda gen: gen(prompt))
+        else:
+            generated_outputs = self.generator(prompt)
+        return generated_outputs[0]['generated_text'][len(prompt):]
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Run several prompts through one padded pipeline call on a replica slot.
+        Prompts go in shortest first, so each batch_size batch holds similar
+        lengths and pads little; results come back in the caller's order.
+        """
+        order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
 
+        def run(gen):
+            return gen([prompts[i] for i in order], batch_size=self.batch_size)
+        outputs = self.pool.run(run) if self.pool else run(self.generator)
+        results = [""] * len(prompts)
+        for i, out in zip(order, outputs):
+            results[i] = out[0]['generated_text'][len(prompts[i]):]
+        return results
+
+    def version(self, task: str) -> str:
+        """Which model and prompt produce `task` results, for keys of outputs stored long-term."""
+        prompt = hashlib.sha256(self.prompt_manager.build(task, "{content}").encode("utf-8")).hexdigest()[:12]
+        return f"{self.external_llm_url or self.model_name}:{prompt}"
+
+    def build_external_request(self, prompt):
+        """Headers and JSON payload for one call to the external LLM."""
         headers = {}
         if self.external_llm_key:
             if self.external_llm_hdr:
@@ -114,28 +150,37 @@ class ModelManager:
         else:
             # default "simple" schema
             payload = {"prompt": prompt}
+        return headers, payload
+
+    def parse_external_response(self, data):
+        """Extract the generated text from an external LLM JSON response."""
+        # Try common shapes
+        if self.external_llm_format == "openai":
+            # OpenAI-compatible: choices[0].message.content or choices[0].text
+            try:
+                if isinstance(data.get("choices"), list) and data["choices"]:
+                    choice = data["choices"][0]
+                    if isinstance(choice, dict):
+                        msg = choice.get("message", {})
+                        content = msg.get("content") if isinstance(msg, dict) else None
+                        if content:
+                            return content
+                        if choice.get("text"):
+                            return choice["text"]
+            except Exception:
+                pass
+        # Simple: { text: "..." } or { output: "..." }
+        return data.get("text") or data.get("output") or str(data)
 
+    def _external_call(self, prompt):
+        if not self.external_llm_url:
+            raise ModelError("External LLM URL not configured")
+
+        headers, payload = self.build_external_request(prompt)
         try:
             response = requests.post(self.external_llm_url, headers=headers, json=payload, timeout=60)
             response.raise_for_status()
-            data = response.json()
-            # Try common shapes
-            if self.external_llm_format == "openai":
-                # OpenAI-compatible: choices[0].message.content or choices[0].text
-                try:
-                    if isinstance(data.get("choices"), list) and data["choices"]:
-                        choice = data["choices"][0]
-                        if isinstance(choice, dict):
-                            msg = choice.get("message", {})
-                            content = msg.get("content") if isinstance(msg, dict) else None
-                            if content:
-                                return content
-                            if choice.get("text"):
-                                return choice["text"]
-                except Exception:
-                    pass
-            # Simple: { text: "..." } or { output: "..." }
-            return data.get("text") or data.get("output") or str(data)
+            return self.parse_external_response(response.json())
         except requests.RequestException as e:
             raise ModelError(f"External LLM API call failed: {e}")
 
@@ -143,21 +188,45 @@ class ModelManager:
         if self.fast_test:
             return {"plain_language": f"[{task.upper()} stub] {text[:50]}"}
 
-        prompt = self.prompt_manager.build(task, text, language)
+        with stage("prompt_build"):
+            prompt = self.prompt_manager.build(task, text, language)
 
         try:
-            if self.external_llm_url:
-                result = self._external_call(prompt)
-            elif self.generator:
-                generated_outputs = self.generator(prompt)
-                result = generated_outputs[0]['generated_text'][len(prompt):]
-            else:
-                raise ModelError("No model or external API available.")
+            with stage("model"):
+                if self.external_llm_url:
+                    result = self._external_call(prompt)
+                elif self.generator:
+                    result = self._generate(prompt)
+                else:
+                    raise ModelError("No model or external API available.")
             
             return {"plain_language": result.strip()}
         except Exception as e:
             return {"error": True, "message": str(e)}
 
+    def process_batch(self, texts: List[str], task: str, language: str = "en") -> List[dict]:
+        """
+        Process many texts at once. Returns one result per input, in order,
+        each shaped like process(): {"plain_language": ...} or {"error": True, ...}.
+        """
+        if self.fast_test or not texts:
+            return [self.process(t, task, language) for t in texts]
+
+        if self.external_llm_url:
+            with ThreadPoolExecutor(max_workers=min(self.external_concurrency, len(texts))) as pool:
+                return list(pool.map(lambda t: self.process(t, task, language), texts))
+
+        if not self.generator:
+            return [{"error": True, "message": "No model or external API available."} for _ in texts]
+        with stage("prompt_build"):
+            prompts = [self.prompt_manager.build(task, t, language) for t in texts]
+        try:
+            with stage("model"):
+                outputs = self._generate_batch(prompts)
+            return [{"plain_language": r.strip()} for r in outputs]
+        except Exception as e:
+            return [{"error": True, "message": str(e)} for _ in texts]
+
     def stream_process(self, text: str, task: str, language: str = "en"):
         if self.fast_test:
             stub_text = f"[{task.upper()} stub] {text[:50]}"
@@ -165,18 +234,20 @@ class ModelManager:
                 yield word + " "
             return
 
-        prompt = self.prompt_manager.build(task, text, language)
+        with stage("prompt_build"):
+            prompt = self.prompt_manager.build(task, text, language)
         
         try:
             if self.external_llm_url:
                 # Streaming from external URL not implemented in this example
-                result = self._external_call(prompt)
+                with stage("model"):
+                    result = self._external_call(prompt)
                 for word in result.split():
                     yield word + " "
             elif self.generator:
                 # This is a simplified stream, real streaming requires more complex setup
-                generated_outputs = self.generator(prompt)
-                result = generated_outputs[0]['generated_text'][len(prompt):]
+                with stage("model"):
+                    result = self._generate(prompt)
                 for word in result.split():
                     yield word + " "
             else:
@@ -0,0 +1,78 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from app.utils.optional import loaded
+
+
+def default_threads_per_slot(slots: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, slots))
+
+
+class ReplicaPool:
+    """
+    Fixed set of execution slots for in-process inference.
+
+    Each slot is a dedicated thread that owns one replica (e.g. a
+    Hugging Face pipeline) and pins its share of torch's intra-op threads,
+    so concurrent requests never touch the same pipeline object and never
+    oversubscribe the cores. Work is dispatched to whichever slot is free.
+    """
+
+    def __init__(self, factory: Callable[[int], Any], slots: int = 1,
+                 threads_per_slot: Optional[int] = None):
+        self.factory = factory
+        self.slots = max(1, slots)
+        self.threads_per_slot = threads_per_slot or default_threads_per_slot(self.slots)
+        self._tasks = queue.Queue()
+        self._ready = threading.Barrier(self.slots + 1)
+        self._errors = []
+        self._threads = []
+        for idx in range(self.slots):
+            t = threading.Thread(target=self._run, args=(idx,), name=f"replica-{idx}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._ready.wait()
+        if self._errors:
+            self.shutdown()
+            raise self._errors[0]
+
+    def _run(self, idx: int):
+        torch = loaded("torch")  # imported by the replica's library, if it uses torch at all
+        if torch is not None:
+            # Per-thread under OpenMP: only this slot's kernels use this budget.
+            torch.set_num_threads(self.threads_per_slot)
+        try:
+            replica = self.factory(idx)
+        except Exception as e:
+            self._errors.append(e)
+            self._ready.wait()
+            return
+        self._ready.wait()
+
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                break
+            fn, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(replica))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """Queue fn(replica) for the next free slot."""
+        fut = Future()
+        self._tasks.put((fn, fut))
+        return fut
+
+    def run(self, fn: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        return self.submit(fn).result(timeout=timeout)
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._tasks.put(None)
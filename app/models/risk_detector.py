@@ -1,9 +1,12 @@
 # app/models/risk_detector.py
 
+import hashlib
+import json
+import os
 import re
-from typing import List, Dict
-from app.models.embeddings import Embedder
-from app.utils.extract import split_into_clauses
+from typing import Dict, Iterable, List, Tuple
+from app.utils.extract import iter_clauses, split_into_clauses
+from app.utils.metrics import stage
 
 RISK_RULES = {
     "auto_renew": {
@@ -86,12 +89,53 @@ def full_clause_analysis(text: str) -> List[Dict]:
     """
     Splits text into clauses, applies risk detection to each, and de-duplicates the results.
     """
+    return merge_risks(clause_analysis(text)[1])
 
-    clauses = split_into_clauses(text)
+def clause_analysis(text: str) -> Tuple[List[str], List[List[Dict]]]:
+    """
+    The clauses of `text` and the risks of each, in order: the per-clause
+    form of full_clause_analysis() that the result store keeps.
+    """
+    with stage("clause_split"):
+        clauses = split_into_clauses(text)
+    with stage("risk_scan"):
+        risks = [analyze_clause(clause) for clause in clauses]
+    return clauses, risks
+
+def merge_risks(per_clause: Iterable[List[Dict]]) -> List[Dict]:
+    """Per-clause risks combined into the full_clause_analysis() result."""
+    return _dedupe_risks([risk for risks in per_clause for risk in risks])
+
+def stream_clause_analysis(chunks: Iterable[str]) -> List[Dict]:
+    """
+    full_clause_analysis() over text that is still being extracted: each clause
+    is scanned as soon as it is complete, e.g. while later PDF pages are parsed.
+    """
     all_risks = []
-    for clause in clauses:
-        all_risks.extend(detect_risks(clause))
-    
+    with stage("risk_scan"):
+        for clause in iter_clauses(chunks):
+            all_risks.extend(detect_risks(clause))
+    return _dedupe_risks(all_risks)
+
+def analyze_clause(clause: str) -> List[Dict]:
+    """
+    Risks of a single clause, spans relative to the clause. The unit cached
+    per clause by incremental (versioned-document) analysis.
+    """
+    return _dedupe_risks(detect_risks(clause))
+
+def rules_version() -> str:
+    """
+    Fingerprint of what analyze_clause() depends on: RISK_RULES and the
+    configured embedding model that scores matches. Stored per-clause
+    risks are keyed by it, so changed rules are not served from old results.
+    """
+    rules = [[name, r["pattern"].pattern, r["pattern"].flags, r["severity"], r["explanation"], r["suggested_action"]]
+             for name, r in sorted(RISK_RULES.items())]
+    embedder = [os.getenv("EMBEDDING_MODEL", ""), os.getenv("EMBEDDING_BACKEND", "")]
+    return hashlib.sha256(json.dumps([rules, embedder]).encode("utf-8")).hexdigest()[:12]
+
+def _dedupe_risks(all_risks: List[Dict]) -> List[Dict]:
     # De-duplicate risks based on span
     unique_risks = {}
     for risk in all_risks:
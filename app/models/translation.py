@@ -0,0 +1,158 @@
+"""Segment-level document translation.
+
+The document is split into sentence segments while every separator
+(spaces, newlines, blank lines, list indentation) is kept verbatim, so the
+translated text is reassembled with the original layout. Paragraphs already
+in the target language (langdetect, when installed) and segments without
+letters are passed through. The remaining distinct segments go to the model
+in one batch: ModelManager.process_batch runs them as length-sorted padded
+batches locally, or as concurrent calls to the external LLM.
+"""
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from langdetect import DetectorFactory, LangDetectException, detect_langs
+    DetectorFactory.seed = 0  # langdetect is randomised; keep results stable
+except ImportError:  # pragma: no cover - optional
+    detect_langs = None
+
+# Sentence punctuation, paragraph breaks and line breaks before list items.
+_BOUNDARY = re.compile(
+    r"(\s*\n[ \t]*\n\s*"
+    r"|(?<=[.!?;:])\s+"
+    r"|[ \t]*\n[ \t]*(?=(?:[-*•]|\d{1,3}[.)]|\([A-Za-z0-9]{1,3}\))\s))"
+)
+# A segment ending like this continues after the next space ("e.g. the", "Sec. 5", "1. Term").
+_ABBREVIATION = re.compile(
+    r"(?:\b(?:e\.g|i\.e|etc|vs|viz|cf|No|Nos|Sec|Art|Cl|para|Mr|Mrs|Ms|Dr|Inc|Ltd|Co|Corp|St)|\b[A-Z]"
+    r"|^(?:[-*•]\s+)?(?:\d{1,3}|[ivx]{1,4}))\.$"
+)
+_PARAGRAPH = re.compile(r"\n[ \t]*\n")
+_LETTER = re.compile(r"[^\W\d_]")
+
+LANGUAGE_CODES = {
+    "arabic": "ar", "bengali": "bn", "chinese": "zh", "dutch": "nl", "english": "en", "french": "fr",
+    "german": "de", "gujarati": "gu", "hindi": "hi", "italian": "it", "japanese": "ja", "kannada": "kn",
+    "korean": "ko", "malayalam": "ml", "marathi": "mr", "portuguese": "pt", "punjabi": "pa", "russian": "ru",
+    "spanish": "es", "tamil": "ta", "telugu": "te", "turkish": "tr", "urdu": "ur",
+}
+MAX_SEGMENT_CHARS = 1000
+DETECT_SAMPLE_CHARS = 400
+DETECT_MIN_PROBABILITY = 0.9
+
+
+def language_code(language: Optional[str]) -> str:
+    """ISO 639-1 code for a language name or locale ("English" -> "en", "es-ES" -> "es")."""
+    lang = (language or "").strip().lower()
+    return LANGUAGE_CODES.get(lang, lang).replace("_", "-").split("-")[0]
+
+
+def _wrap(segment: str, max_chars: int) -> Tuple[List[str], List[str]]:
+    parts, seps = [], []
+    while len(segment) > max_chars:
+        cut = segment.rfind(" ", 1, max_chars)
+        sep = " " if cut > 0 else ""
+        cut = cut if cut > 0 else max_chars
+        parts.append(segment[:cut])
+        seps.append(sep)
+        segment = segment[cut + len(sep):]
+    parts.append(segment)
+    return parts, seps
+
+
+def split_segments(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> Tuple[List[str], List[str], List[int]]:
+    """
+    (segments, separators, paragraph index per segment). There is one more
+    separator than segments: separators[0] + segments[0] + separators[1] +
+    ... + segments[-1] + separators[-1] == text.
+    """
+    body = text.strip()
+    if not body:
+        return [], [text], []
+    lead = text[:len(text) - len(text.lstrip())]
+    trail = text[len(text.rstrip()):]
+    pieces = _BOUNDARY.split(body)
+
+    segments, separators = [pieces[0]], [lead]
+    for sep, seg in zip(pieces[1::2], pieces[2::2]):
+        if "\n" not in sep and _ABBREVIATION.search(segments[-1]):
+            segments[-1] += sep + seg
+        else:
+            separators.append(sep)
+            segments.append(seg)
+    separators.append(trail)
+
+    out_segments, out_separators, paragraphs, paragraph = [], [separators[0]], [], 0
+    for seg, sep in zip(segments, separators[1:]):
+        parts, inner = _wrap(seg, max_chars)
+        out_segments.extend(parts)
+        out_separators.extend(inner + [sep])
+        paragraphs.extend([paragraph] * len(parts))
+        if _PARAGRAPH.search(sep):
+            paragraph += 1
+    return out_segments, out_separators, paragraphs
+
+
+def detect_language(text: str) -> Optional[str]:
+    """The language code of `text` when langdetect is confident, else None."""
+    if detect_langs is None:
+        return None
+    try:
+        best = detect_langs(text[:DETECT_SAMPLE_CHARS])[0]
+    except LangDetectException:
+        return None
+    return language_code(best.lang) if best.prob >= DETECT_MIN_PROBABILITY else None
+
+
+def segmented_translation(data: Dict, task: str) -> bool:
+    """Whether a translate request goes through translate_document ("segmented", TRANSLATE_SEGMENTED)."""
+    return task == "translate" and bool(data.get("segmented", os.getenv("TRANSLATE_SEGMENTED", "1") == "1"))
+
+
+def translate_document(text: str, language: str, translate_batch: Callable[[List[str]], List[Dict]],
+                       detect: Optional[bool] = None, max_chars: Optional[int] = None) -> Dict:
+    """
+    Translate `text` segment by segment with one `translate_batch` call
+    (model_manager.process_batch-style results). Language detection runs
+    once per paragraph. A segment whose translation failed keeps its text;
+    if every translation failed the result carries "error" like process().
+    """
+    if detect is None:
+        detect = os.getenv("TRANSLATE_DETECT_LANGUAGE", "1") == "1"
+    if max_chars is None:
+        max_chars = int(os.getenv("TRANSLATE_MAX_SEGMENT_CHARS", MAX_SEGMENT_CHARS))
+    segments, separators, paragraphs = split_segments(text, max_chars)
+    target = language_code(language)
+
+    skip = {i for i, seg in enumerate(segments) if not _LETTER.search(seg)}
+    if detect:
+        members: Dict[int, List[int]] = {}
+        for i, p in enumerate(paragraphs):
+            members.setdefault(p, []).append(i)
+        for idxs in members.values():
+            if detect_language(" ".join(segments[i] for i in idxs)) == target:
+                skip.update(idxs)
+
+    todo = list(dict.fromkeys(seg for i, seg in enumerate(segments) if i not in skip))
+    outputs = dict(zip(todo, translate_batch(todo))) if todo else {}
+
+    output, translated, errors = [], 0, {}
+    for i, seg in enumerate(segments):
+        out = outputs.get(seg) if i not in skip else None
+        if out is not None and out.get("error"):
+            errors.setdefault(seg, out.get("message", "Model processing failed"))
+        elif out is not None:
+            seg = out.get("plain_language", "").strip() or seg
+            translated += 1
+        output.append(seg)
+
+    result = {
+        "plain_language": separators[0] + "".join(seg + sep for seg, sep in zip(output, separators[1:])),
+        "stats": {"segments": len(segments), "translated": translated, "skipped": len(skip),
+                  "failed": len(segments) - len(skip) - translated, "unique": len(todo)},
+    }
+    if todo and len(errors) == len(todo):
+        result.update(error=True, message=next(iter(errors.values())))
+    return result
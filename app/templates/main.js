@@ -241,14 +241,20 @@ async function streamSimplify() {
   }
 }
 
-function handleSSE(chunk) {
-  const lines = chunk.split('\n');
-  let event = 'message'; let data = '';
-  for (const l of lines) {
-    if (l.startsWith('event:')) event = l.replace('event:', '').trim();
-    if (l.startsWith('data:')) data += l.replace('data:', '').trim();
+// One SSE frame -> { event, data }. Only the single space after "data:" is
+// part of the syntax; chunks keep their own spacing and line breaks.
+function parseSSE(frame) {
+  let event = 'message'; const data = [];
+  for (const l of frame.split('\n')) {
+    if (l.startsWith('event:')) event = l.slice(6).trim();
+    else if (l.startsWith('data:')) data.push(l.slice(l.startsWith('data: ') ? 6 : 5));
   }
-  if (event === 'simplify' || event === 'token' || event === 'chunk') ui.plain.textContent += data;
+  return { event, data: data.length ? data.join('\n') : null };
+}
+
+function handleSSE(chunk) {
+  const { event, data } = parseSSE(chunk);
+  if (data !== null && (event === 'simplify' || event === 'token' || event === 'chunk')) ui.plain.textContent += data;
 }
 
 function renderResult(data) {
@@ -496,19 +502,18 @@ document.addEventListener('DOMContentLoaded', () => {
                 const decoder = new TextDecoder();
                 resultOutput.innerHTML = '';
 
+                let buf = '';
                 while (true) {
                     const { done, value } = await reader.read();
                     if (done) break;
-                    
-                    const chunk = decoder.decode(value);
-                    const eventLines = chunk.split('\n\n');
-                    
-                    for(const line of eventLines) {
-                        if (line.startsWith('data:')) {
-                            const data = line.substring(5).trim();
-                            if(data) {
-                                resultOutput.textContent += data;
-                            }
+
+                    buf += decoder.decode(value, { stream: true });
+                    const frames = buf.split('\n\n');
+                    buf = frames.pop();
+                    for (const frame of frames) {
+                        const { event, data } = parseSSE(frame);
+                        if (event === 'chunk' && data !== null) {
+                            resultOutput.textContent += data;
                         }
                     }
                 }
@@ -0,0 +1,254 @@
+"""Admission control in front of ModelManager.
+
+Each worker process owns one AdmissionController. It hands out a fixed
+number of execution slots, parks overflow requests in a bounded queue and
+refuses work once that queue is full. Every request carries a deadline;
+tickets that expire while queued are dropped before generation starts.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from app.utils.metrics import record_stage
+
+
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+
+def parse_timeout_ms(raw: Optional[str]) -> Optional[float]:
+    """Seconds from an X-Request-Timeout-Ms header value, or None if absent/invalid."""
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw) / 1000.0)
+    except ValueError:
+        return None
+
+
+class AdmissionError(Exception):
+    """Raised when a request is not admitted to the model."""
+    def __init__(self, message: str, status_code: int, error_code: str, reason: str,
+                 retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.error_code = error_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionError):
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Inference queue is full, retry later", 503, "E503_QUEUE_FULL",
+                         "queue_full", retry_after=retry_after)
+
+
+class DeadlineExceededError(AdmissionError):
+    def __init__(self):
+        super().__init__("Request deadline exceeded before generation started", 504,
+                         "E504_DEADLINE_EXCEEDED", "deadline")
+
+
+class CancelledError(AdmissionError):
+    def __init__(self):
+        super().__init__("Request was cancelled by the client", 499, "E499_CLIENT_CLOSED",
+                         "cancelled")
+
+
+class Ticket:
+    """A single request's claim on an execution slot."""
+    def __init__(self, timeout: float, key: Optional[str] = None, cost: int = 1):
+        self.key = key
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+        self.deadline = self.enqueued_at + timeout
+        self.controller = None
+        self._granted = threading.Event()
+        self._waker = None
+        self._dropped = False
+        self._cancelled = False
+        self._active = False
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self):
+        """Mark the request as abandoned (e.g. the SSE client went away)."""
+        self._cancelled = True
+        if self.controller is not None:
+            self.controller._discard(self)
+
+    def _grant(self):
+        self._granted.set()
+        if self._waker is not None:
+            self._waker()
+
+    def check(self):
+        """Raise if the work behind this ticket should no longer run."""
+        if self._cancelled:
+            raise CancelledError()
+        if self.expired():
+            raise DeadlineExceededError()
+
+
+class FifoQueue:
+    """Default pending-work ordering: first come, first served."""
+    def __init__(self):
+        self._items = deque()
+
+    def push(self, ticket: Ticket):
+        self._items.append(ticket)
+
+    def pop(self) -> Optional[Ticket]:
+        return self._items.popleft() if self._items else None
+
+    def remove(self, ticket: Ticket) -> bool:
+        try:
+            self._items.remove(ticket)
+            return True
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self._items)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 32, default_timeout: float = 60.0,
+                 retry_after: int = 1, metrics=None, queue=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.default_timeout = default_timeout
+        self.retry_after = retry_after
+        self.metrics = metrics
+        self.queue = queue if queue is not None else FifoQueue()
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def ticket(self, timeout: Optional[float] = None, key: Optional[str] = None, cost: int = 1) -> Ticket:
+        t = Ticket(self.default_timeout if timeout is None else timeout, key=key, cost=cost)
+        t.controller = self
+        return t
+
+    def acquire(self, ticket: Ticket):
+        """Block until the ticket holds a slot, or raise AdmissionError."""
+        if not self._enter(ticket):
+            if not ticket._granted.wait(max(0.0, ticket.remaining())):
+                self._give_up(ticket)
+        self._admitted(ticket)
+
+    async def acquire_async(self, ticket: Ticket):
+        """Like acquire(), but waits on the event loop instead of a thread."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        ticket._waker = wake
+        if not self._enter(ticket):
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), max(0.0, ticket.remaining()))
+            except asyncio.TimeoutError:
+                self._give_up(ticket)
+            except asyncio.CancelledError:
+                # The waiting coroutine was torn down (client disconnected).
+                ticket.cancel()
+                self.release(ticket)
+                raise
+        self._admitted(ticket)
+
+    def _enter(self, ticket: Ticket) -> bool:
+        """Take a free slot or join the queue; True if the slot was granted immediately."""
+        with self._lock:
+            if ticket.expired():
+                self._reject("deadline")
+                raise DeadlineExceededError()
+            if self.active < self.max_concurrency and not len(self.queue):
+                self.active += 1
+                ticket._active = True
+                ticket._granted.set()
+            elif len(self.queue) >= self.max_queue:
+                self._reject("queue_full")
+                raise QueueFullError(self.retry_after)
+            else:
+                self.queue.push(ticket)
+            self._report()
+            return ticket._granted.is_set()
+
+    def _give_up(self, ticket: Ticket):
+        with self._lock:
+            if not ticket._granted.is_set():
+                self.queue.remove(ticket)
+                ticket._dropped = True
+                self._report()
+
+    def _admitted(self, ticket: Ticket):
+        if ticket._dropped:
+            reason = "cancelled" if ticket.cancelled else "deadline"
+            self._reject(reason)
+            raise CancelledError() if ticket.cancelled else DeadlineExceededError()
+
+        waited = time.monotonic() - ticket.enqueued_at
+        record_stage("queue_wait", waited)
+        if self.metrics:
+            self.metrics.inference_queue_wait.observe(waited)
+        try:
+            ticket.check()
+        except AdmissionError as e:
+            self.release(ticket)
+            self._reject(e.reason)
+            raise
+
+    @contextmanager
+    def admit(self, timeout: Optional[float] = None, key: Optional[str] = None, cost: int = 1):
+        ticket = self.ticket(timeout, key=key, cost=cost)
+        self.acquire(ticket)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def release(self, ticket: Ticket):
+        """Give the ticket's slot back, handing it to the next live waiter."""
+        with self._lock:
+            if not ticket._active:
+                return
+            ticket._active = False
+            nxt = self.queue.pop()
+            while nxt is not None and nxt.expired():
+                nxt._dropped = True
+                nxt._grant()
+                nxt = self.queue.pop()
+            if nxt is not None:
+                nxt._active = True
+                nxt._grant()
+            else:
+                self.active -= 1
+            self._report()
+
+    def _discard(self, ticket: Ticket):
+        with self._lock:
+            if self.queue.remove(ticket):
+                ticket._dropped = True
+                ticket._grant()
+                self._report()
+
+    def _reject(self, reason: str):
+        if self.metrics:
+            self.metrics.inference_rejected_total.labels(reason=reason).inc()
+
+    def _report(self):
+        if self.metrics:
+            self.metrics.inference_queue_depth.set(len(self.queue))
+            self.metrics.inference_inflight.set(self.active)
@@ -0,0 +1,149 @@
+"""Fingerprinted, precompressed static assets.
+
+At startup every file under the static source directory is hashed and
+copied to `<build_dir>/<name>.<hash>.<ext>`. Text assets also get `.gz`
+(and `.br` when the brotli module is installed) siblings. Because a
+fingerprinted URL never changes content it is served with an immutable,
+year-long Cache-Control header. HTML pages have their `src`/`href` and
+`url(...)` references rewritten to the fingerprinted URLs; so do the
+`url(...)` references inside stylesheets, which are fingerprinted after
+the rewrite.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import tempfile
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {".js", ".css", ".svg", ".html", ".json", ".txt", ".md", ".map", ".xml"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_SUFFIX = {"br": ".br", "gzip": ".gz"}
+_REF_RE = re.compile(r'(\b(?:src|href)=")([^"#?]+)(")')
+_URL_RE = re.compile(r"""(url\(\s*['"]?)([^'"()#?\s]+)(['"]?\s*\))""")
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _atomic_write(path: str, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class AssetManifest:
+    def __init__(self, source_dir: str, build_dir: str, url_prefix: str = "/assets",
+                 exclude_ext=(".html",)):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.url_prefix = url_prefix.rstrip("/")
+        self.exclude_ext = set(exclude_ext)
+        self.files: Dict[str, str] = {}   # logical path -> fingerprinted path
+        self.etags: Dict[str, str] = {}   # fingerprinted path -> content hash
+
+    def build(self) -> "AssetManifest":
+        """Fingerprint and precompress every asset; safe to run from several workers at once."""
+        os.makedirs(self.build_dir, exist_ok=True)
+        entries = []
+        for root, _, names in os.walk(self.source_dir):
+            for name in names:
+                src = os.path.join(root, name)
+                logical = os.path.relpath(src, self.source_dir).replace(os.sep, "/")
+                ext = os.path.splitext(logical)[1]
+                if ext.lower() not in self.exclude_ext:
+                    entries.append((ext.lower() == ".css", src, logical))
+        # Stylesheets last: their url(...) references must already be fingerprinted.
+        for is_css, src, logical in sorted(entries):
+            stem, ext = os.path.splitext(logical)
+            data = None
+            if is_css:
+                with open(src, "rb") as f:
+                    data = self.rewrite_css(f.read().decode("utf-8"), logical).encode("utf-8")
+                digest = hashlib.sha256(data).hexdigest()
+            else:
+                digest = _sha256_file(src)
+            fingerprinted = f"{stem}.{digest[:12]}{ext}"
+            dest = os.path.join(self.build_dir, fingerprinted)
+            if not os.path.exists(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                if data is None:
+                    with open(src, "rb") as f:
+                        data = f.read()
+                _atomic_write(dest, data)
+                self._precompress(dest, data, ext.lower())
+            self.files[logical] = fingerprinted
+            self.etags[fingerprinted] = digest
+        _atomic_write(os.path.join(self.build_dir, "manifest.json"),
+                      json.dumps(self.files, indent=2, sort_keys=True).encode("utf-8"))
+        return self
+
+    @staticmethod
+    def _precompress(dest: str, data: bytes, ext: str):
+        if ext not in COMPRESSIBLE or not data:
+            return
+        for encoding, blob in precompress_bytes(data).items():
+            _atomic_write(dest + _SUFFIX[encoding], blob)
+
+    def url(self, logical: str) -> Optional[str]:
+        if logical.startswith("./"):
+            logical = logical[2:]
+        fingerprinted = self.files.get(logical.lstrip("/"))
+        return f"{self.url_prefix}/{fingerprinted}" if fingerprinted else None
+
+    def _rewrite(self, pattern, text: str, base: str = "") -> str:
+        def sub(m):
+            ref = m.group(2)
+            if "://" in ref or ref.startswith("data:"):
+                return m.group(0)
+            url = self.url(ref if ref.startswith("/") else posixpath.normpath(posixpath.join(base, ref)))
+            return f"{m.group(1)}{url}{m.group(3)}" if url else m.group(0)
+        return pattern.sub(sub, text)
+
+    def rewrite_html(self, html: str) -> str:
+        """Point src/href attributes and url(...) references that name a known asset at its fingerprinted URL."""
+        return self._rewrite(_URL_RE, self._rewrite(_REF_RE, html))
+
+    def rewrite_css(self, css: str, logical: str) -> str:
+        """Point url(...) references (relative to the stylesheet `logical`) at fingerprinted URLs."""
+        return self._rewrite(_URL_RE, css, posixpath.dirname(logical))
+
+    def resolve(self, fingerprinted: str, accept_encoding: str = "") -> Optional[Tuple[str, str, Optional[str], str]]:
+        """(file path, mimetype, content-encoding, etag) of the best variant, or None."""
+        etag = self.etags.get(fingerprinted)
+        if etag is None:
+            return None
+        path = os.path.join(self.build_dir, fingerprinted)
+        mimetype = mimetypes.guess_type(fingerprinted)[0] or "application/octet-stream"
+        accepted = {enc.split(";")[0].strip() for enc in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and os.path.exists(path + _SUFFIX[encoding]):
+                return path + _SUFFIX[encoding], mimetype, encoding, f"{etag}-{encoding}"
+        return path, mimetype, None, etag
+
+
+def precompress_bytes(data: bytes) -> Dict[str, bytes]:
+    """In-memory gzip/brotli variants of a small generated document (e.g. the rewritten index)."""
+    variants = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants["br"] = br
+    return variants
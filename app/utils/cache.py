@@ -1,58 +1,379 @@
-import os
+"""Two-tier cache: a byte-budgeted in-process L1 in front of an optional Redis L2.
+
+Values are JSON-serialisable objects or raw bytes. In Redis they are stored
+as a small header (flags, expiry, recompute time) followed by the payload,
+zlib-compressed once it is larger than `compress_min_bytes`. With Redis, L1
+entries are kept for at most `l1_ttl` seconds so workers notice values
+rewritten in L2; without it they live for the caller's ttl. After a failed Redis
+call the cache runs on L1 alone for `retry_after` seconds, so an outage
+does not add a socket timeout to every lookup.
+
+`get_or_set()` protects expensive loaders (LLM calls, embeddings) from
+stampedes: one loader per key per process, a short Redis lock across
+processes, and probabilistic early refresh ("XFetch") so hot keys are
+recomputed by a single caller shortly before they expire instead of by
+every caller right after.
+"""
 import json
+import math
+import random
+import struct
+import sys
+import threading
 import time
+import zlib
 from collections import OrderedDict
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.utils.optional import optional_import
 
-try:
-    import redis
-except Exception:  # pragma: no cover
-    redis = None
+_HEADER = struct.Struct("!Bdd")  # flags, expires_at (epoch seconds), recompute time (seconds)
+_COMPRESSED = 0x01
+_BYTES = 0x02
+
+Entry = Tuple[Any, float, float]  # value, expires_at, delta
 
 
 class LRUCache:
-    def __init__(self, capacity: int = 128):
+    """
+    Thread-safe LRU bounded by entry count and, optionally, by the total size
+    of its values. Entries may carry a TTL.
+    """
+
+    def __init__(self, capacity: int = 128, max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
         self.capacity = capacity
-        self.cache = OrderedDict()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.cache: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self.bytes = 0
+        self._lock = threading.Lock()
 
     def get(self, key: str) -> Optional[Any]:
-        if key in self.cache:
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return None
+            if entry[2] is not None and entry[2] <= self.clock():
+                self._drop(key)
+                return None
             self.cache.move_to_end(key)
-            return self.cache[key]
-        return None
+            return entry[0]
+
+    def set(self, key: str, value: Any, size: Optional[int] = None, ttl: Optional[float] = None):
+        size = sys.getsizeof(value) if size is None else size
+        ttl = self.ttl if ttl is None else ttl
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.delete(key)
+            return
+        expires = self.clock() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self.cache:
+                self._drop(key)
+            self.cache[key] = (value, size, expires)
+            self.bytes += size
+            while len(self.cache) > self.capacity or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, old_size, _) = self.cache.popitem(last=False)
+                self.bytes -= old_size
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self.cache:
+                self._drop(key)
 
-    def set(self, key: str, value: Any):
-        self.cache[key] = value
-        self.cache.move_to_end(key)
-        if len(self.cache) > self.capacity:
-            self.cache.popitem(last=False)
+    def _drop(self, key: str):
+        self.bytes -= self.cache.pop(key)[1]
+
+    def __len__(self) -> int:
+        return len(self.cache)
 
 
 class Cache:
-    def __init__(self, redis_url: Optional[str] = None):
-        self.client = None
-        if redis_url and redis:
+    def __init__(self, redis_url: Optional[str] = None, name: str = "default", client=None,
+                 l1_max_bytes: int = 64 * 1024 * 1024, l1_max_items: int = 100_000, l1_ttl: float = 60.0,
+                 compress_min_bytes: int = 1024, lock_timeout: float = 10.0, metrics=None,
+                 retry_after: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.client = client
+        redis = optional_import("redis") if redis_url else None
+        if client is None and redis is not None:
             try:
-                self.client = redis.from_url(redis_url)
+                self.client = redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
             except Exception:
                 self.client = None
-        self.lru = LRUCache(256)
+        self.lru = LRUCache(l1_max_items, max_bytes=l1_max_bytes)
+        self.l1_ttl = l1_ttl
+        self.compress_min_bytes = compress_min_bytes
+        self.lock_timeout = lock_timeout
+        self.metrics = metrics
+        self.retry_after = retry_after
+        self.clock = clock
+        self._down_until = 0.0
+        self.stats: Dict[str, int] = {}
+        self._flights: Dict[str, list] = {}  # key -> [lock, callers holding a reference to it]
+        self._flights_lock = threading.Lock()
+
+    # --- encoding ---
+    def _encode(self, value: Any, expires_at: float, delta: float) -> Tuple[bytes, int]:
+        """(Redis blob, uncompressed size): L1 holds the decoded value, so it is charged the latter."""
+        flags = 0
+        if isinstance(value, (bytes, bytearray)):
+            flags |= _BYTES
+            payload = bytes(value)
+        else:
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        size = _HEADER.size + len(payload)
+        if len(payload) >= self.compress_min_bytes:
+            packed = zlib.compress(payload, 6)
+            if len(packed) < len(payload):
+                flags |= _COMPRESSED
+                payload = packed
+        return _HEADER.pack(flags, expires_at, delta) + payload, size
+
+    @staticmethod
+    def _decode(blob: bytes) -> Tuple[Entry, int]:
+        """(entry, uncompressed size) of a Redis blob."""
+        if blob[:1] >= b" ":  # plain JSON written before values had a header
+            return (json.loads(blob), math.inf, 0.0), len(blob)
+        flags, expires_at, delta = _HEADER.unpack_from(blob)
+        payload = blob[_HEADER.size:]
+        if flags & _COMPRESSED:
+            payload = zlib.decompress(payload)
+        value = payload if flags & _BYTES else json.loads(payload)
+        return (value, expires_at, delta), _HEADER.size + len(payload)
+
+    def _observe(self, tier: str, result: str, n: int = 1):
+        if not n:
+            return
+        stat = f"{tier}_{result}"
+        self.stats[stat] = self.stats.get(stat, 0) + n
+        if self.metrics is not None:
+            self.metrics.observe_cache(self.name, tier, result, n)
+
+    def _l2(self):
+        """The Redis client, or None while backing off after a failed call (see _l2_failed)."""
+        if self.client is None or self.clock() < self._down_until:
+            return None
+        return self.client
+
+    def _l2_failed(self):
+        # Skip Redis for a while, so lookups do not each wait out the socket timeout.
+        self._down_until = self.clock() + self.retry_after
+        self._observe("l2", "error")
+
+    def _fill_l1(self, key: str, entry: Entry, size: int):
+        ttl = entry[1] - time.time()
+        if self.client is not None:
+            # The cap only exists to notice L2 rewrites; without Redis, L1 is the cache.
+            ttl = min(self.l1_ttl, ttl)
+        if ttl > 0:
+            self.lru.set(key, entry, size=size, ttl=ttl)
+
+    # --- lookups ---
+    def _entry(self, key: str) -> Optional[Entry]:
+        entry = self.lru.get(key)
+        if entry is not None:
+            self._observe("l1", "hit")
+            return entry
+        self._observe("l1", "miss")
+        client = self._l2()
+        if client is None:
+            return None
+        try:
+            blob = client.get(key)
+        except Exception:
+            self._l2_failed()
+            return None
+        if not blob:
+            self._observe("l2", "miss")
+            return None
+        try:
+            entry, size = self._decode(blob)
+        except Exception:  # unreadable or foreign value: treat as a miss
+            self._observe("l2", "miss")
+            return None
+        self._observe("l2", "hit")
+        self._fill_l1(key, entry, size)
+        return entry
 
     def get(self, key: str) -> Optional[Any]:
-        if self.client:
+        entry = self._entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values of the keys that are cached; L2 misses are fetched in one MGET round trip."""
+        found, missing = {}, []
+        for key in dict.fromkeys(keys):
+            entry = self.lru.get(key)
+            if entry is not None:
+                found[key] = entry[0]
+            else:
+                missing.append(key)
+        self._observe("l1", "hit", len(found))
+        self._observe("l1", "miss", len(missing))
+        client = self._l2() if missing else None
+        if client is None:
+            return found
+        try:
+            blobs = client.mget(missing)
+        except Exception:
+            self._l2_failed()
+            return found
+        hits = 0
+        for key, blob in zip(missing, blobs):
+            if not blob:
+                continue
+            try:
+                entry, size = self._decode(blob)
+            except Exception:
+                continue
+            self._fill_l1(key, entry, size)
+            found[key] = entry[0]
+            hits += 1
+        self._observe("l2", "hit", hits)
+        self._observe("l2", "miss", len(missing) - hits)
+        return found
+
+    # --- writes ---
+    def set(self, key: str, value: Any, ttl: int = 3600, delta: float = 0.0):
+        expires_at = time.time() + ttl
+        blob, size = self._encode(value, expires_at, delta)
+        self._fill_l1(key, (value, expires_at, delta), size)
+        client = self._l2()
+        if client is not None:
             try:
-                data = self.client.get(key)
-                if data:
-                    return json.loads(data)
+                client.setex(key, ttl, blob)
             except Exception:
-                pass
-        return self.lru.get(key)
+                self._l2_failed()
 
-    def set(self, key: str, value: Any, ttl: int = 3600):
-        if self.client:
+    def set_many(self, mapping: Dict[str, Any], ttl: int = 3600):
+        """Write many values; L2 writes share one pipelined round trip."""
+        expires_at = time.time() + ttl
+        blobs = {}
+        for key, value in mapping.items():
+            blobs[key], size = self._encode(value, expires_at, 0.0)
+            self._fill_l1(key, (value, expires_at, 0.0), size)
+        client = self._l2()
+        if client is not None and blobs:
             try:
-                self.client.setex(key, ttl, json.dumps(value))
-                return
+                pipe = client.pipeline(transaction=False)
+                for key, blob in blobs.items():
+                    pipe.setex(key, ttl, blob)
+                pipe.execute()
             except Exception:
-                pass
-        self.lru.set(key, value)
+                self._l2_failed()
+
+    def delete(self, key: str):
+        self.lru.delete(key)
+        client = self._l2()
+        if client is not None:
+            try:
+                client.delete(key)
+            except Exception:
+                self._l2_failed()
+
+    # --- stampede protection ---
+    @staticmethod
+    def _refresh_due(entry: Entry, beta: float) -> bool:
+        # XFetch: recompute early with a probability that rises towards expiry,
+        # scaled by how long the value took to compute.
+        _, expires_at, delta = entry
+        return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+    def _flight(self, key: str) -> threading.Lock:
+        """The loader lock of `key`; every call must be paired with _land()."""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = [threading.Lock(), 0]
+            flight[1] += 1
+            return flight[0]
+
+    def _land(self, key: str):
+        # The lock is dropped only once no caller holds it or waits on it,
+        # so a newcomer never gets a second lock for the same key.
+        with self._flights_lock:
+            flight = self._flights[key]
+            flight[1] -= 1
+            if not flight[1]:
+                del self._flights[key]
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: int = 3600, beta: float = 1.0) -> Any:
+        """
+        Cached value of `key`, calling `loader()` to compute it on a miss or
+        an early refresh. Concurrent callers for the same key wait for one
+        loader instead of running their own; during an early refresh they
+        keep getting the current value.
+        """
+        entry = self._entry(key)
+        if entry is not None and not self._refresh_due(entry, beta):
+            return entry[0]
+
+        lock = self._flight(key)
+        try:
+            if not lock.acquire(blocking=entry is None):
+                return entry[0]  # someone in this process is already refreshing it
+            try:
+                return self._load(key, entry, loader, ttl)
+            finally:
+                lock.release()
+        finally:
+            self._land(key)
+
+    def _load(self, key: str, entry: Optional[Entry], loader: Callable[[], Any], ttl: int) -> Any:
+        """get_or_set() once it holds the key's loader lock."""
+        if entry is None:
+            # Waited behind another loader: its value is probably there now.
+            entry = self._entry(key)
+            if entry is not None:
+                return entry[0]
+        locked = self._redis_lock(key)
+        if not locked:
+            if entry is not None:
+                return entry[0]
+            entry = self._wait_for(key)
+            if entry is not None:
+                return entry[0]
+        try:
+            started = time.perf_counter()
+            value = loader()
+            self.set(key, value, ttl=ttl, delta=time.perf_counter() - started)
+            return value
+        finally:
+            if locked:
+                self._redis_unlock(key)
+
+    def _redis_lock(self, key: str) -> bool:
+        client = self._l2()
+        if client is None:
+            return True
+        try:
+            return bool(client.set("lock:" + key, b"1", nx=True, px=int(self.lock_timeout * 1000)))
+        except Exception:
+            self._l2_failed()
+            return True
+
+    def _redis_unlock(self, key: str):
+        client = self._l2()
+        if client is not None:
+            try:
+                client.delete("lock:" + key)
+            except Exception:
+                self._l2_failed()
+
+    def _wait_for(self, key: str, poll: float = 0.05) -> Optional[Entry]:
+        """Another process holds the loader lock: poll L2 for its value, up to lock_timeout."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll)
+            try:
+                blob = self.client.get(key)
+            except Exception:
+                self._l2_failed()
+                return None
+            if blob:
+                entry, size = self._decode(blob)
+                self._fill_l1(key, entry, size)
+                return entry
+        return None
@@ -5,34 +5,393 @@ Exit codes:
  0 success
  1 file not found
  2 extraction/unsupported error
+
+With --serve it stays up and answers length-prefixed JSON requests on
+stdin/stdout (or --socket PATH) instead; see read_message()/handle_message().
 """
-import argparse
-import json
 import os
 import sys
+
+if __name__ == "__main__":
+    # Run as a script, this directory is sys.path[0] and its logging.py would
+    # shadow the stdlib module that pdfminer and concurrent.futures import.
+    _here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != _here]
+
+import argparse
+import codecs
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
 import re
-from typing import Optional
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Iterator, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+Source = Union[str, IO[bytes]]  # a path, or a seekable binary file object (BytesIO, mmap, ...)
 
 MAX_DEFAULT = 5 * 1024 * 1024  # 5 MB default cap on output
+PDF_LAYOUT = os.getenv("PDF_LAYOUT", "full")  # full | fast | none
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 32))  # below this, parallel mode runs serially
+# Bump whenever extraction output changes, so cached text from older code is not served.
+EXTRACTOR_VERSION = "3"
 
 def extract_txt(path: str) -> str:
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
 def extract_pdf(path: str) -> str:
+    return "".join(text for _, text in iter_pdf_pages(path))
+
+def pdf_laparams(layout: Optional[str] = None, **overrides):
+    """
+    pdfminer layout parameters. "full" is pdfminer's default analysis, "fast"
+    keeps line/word grouping but skips the boxes-flow reading-order pass, and
+    "none" disables layout analysis (content-stream order, fastest).
+    Margins can be tuned with PDF_LINE_MARGIN / PDF_CHAR_MARGIN / PDF_WORD_MARGIN.
+    """
+    from pdfminer.layout import LAParams
+    layout = layout or PDF_LAYOUT
+    if layout == "none":
+        return None
+    params = {}
+    for name in ("line_margin", "char_margin", "word_margin"):
+        env = os.getenv(f"PDF_{name.upper()}")
+        if env:
+            params[name] = float(env)
+    if layout == "fast":
+        params.update(boxes_flow=None, detect_vertical=False, all_texts=False)
+    params.update(overrides)
+    return LAParams(**params)
+
+def parse_page_range(spec: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """"3-10" -> (3, 10), "5" -> (5, 5), "4-" -> (4, None); pages are 1-based."""
+    if not spec:
+        return None, None
+    first, sep, last = spec.partition("-")
+    first_page = int(first) if first.strip() else None
+    last_page = (int(last) if last.strip() else None) if sep else first_page
+    if (first_page is not None and first_page < 1) or (last_page is not None and last_page < (first_page or 1)):
+        raise ValueError(f"invalid page range: {spec}")
+    return first_page, last_page
+
+def iter_pdf_pages(source: Source, first_page: Optional[int] = None, last_page: Optional[int] = None,
+                   layout: Optional[str] = None, laparams=None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) one page at a time. Pages after last_page are
+    never parsed, and closing the generator early (e.g. at a byte budget)
+    stops pdfminer mid-document.
+    """
     try:
-        from pdfminer.high_level import extract_text
-        return extract_text(path)
+        from pdfminer.converter import TextConverter
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
     except ImportError:
         raise Exception("pdfminer.six not installed - cannot extract PDF")
+    params = laparams if laparams is not None else pdf_laparams(layout)
+    out = io.StringIO()
+    rsrcmgr = PDFResourceManager(caching=True)
+    device = TextConverter(rsrcmgr, out, laparams=params)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    f = open(source, "rb") if isinstance(source, str) else source
+    try:
+        for number, page in enumerate(PDFPage.get_pages(f, caching=True), 1):
+            if first_page is not None and number < first_page:
+                continue
+            if last_page is not None and number > last_page:
+                break
+            interpreter.process_page(page)
+            text = out.getvalue()
+            out.seek(0)
+            out.truncate()
+            yield number, text
+    finally:
+        device.close()
+        if f is not source:
+            f.close()
 
 def extract_docx(path: str) -> str:
+    return "".join(iter_docx(path))
+
+def count_pdf_pages(source: Source) -> int:
+    """Page count from the document's page tree, without laying out any page."""
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+    f = open(source, "rb") if isinstance(source, str) else source
     try:
-        import docx
-        doc = docx.Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
-    except ImportError:
-        raise Exception("python-docx not installed - cannot extract DOCX")
+        f.seek(0)
+        doc = PDFDocument(PDFParser(f))
+        count = resolve1(resolve1(doc.catalog.get("Pages")) or {}).get("Count")
+        if isinstance(count, int):
+            return count
+        return sum(1 for _ in PDFPage.create_pages(doc))
+    finally:
+        if f is not source:
+            f.close()
+        else:
+            f.seek(0)
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # One pool per process, reused across documents; spawned processes are
+    # safe to start from a multi-threaded server (fork is not).
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_workers = workers
+        return _pool
+
+def _pdf_range_text(path: str, first_page: int, last_page: int, layout: Optional[str]) -> str:
+    return "".join(text for _, text in iter_pdf_pages(path, first_page, last_page, layout=layout))
+
+def _spool(source: IO[bytes]) -> str:
+    """Copy an in-memory PDF to a temp file once, so slice tasks carry a path instead of the bytes."""
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        shutil.copyfileobj(source, f, 1 << 20)
+    return f.name
+
+def _remove_when_done(futures, path: str):
+    """Delete `path` once every future has finished or been cancelled."""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    for future in futures:
+        future.add_done_callback(done)
+
+def iter_pdf_parallel(source: Source, workers: int, first_page: Optional[int] = None, last_page: Optional[int] = None,
+                      layout: Optional[str] = None, min_pages: Optional[int] = None) -> Iterator[str]:
+    """
+    Split the page range across a process pool and yield each slice's text in
+    page order. Documents shorter than min_pages (PDF_PARALLEL_MIN_PAGES) are
+    extracted serially, where pool start-up and the per-process re-parse of
+    the document would cost more than they save.
+    """
+    total = count_pdf_pages(source)
+    first = first_page or 1
+    last = min(last_page or total, total)
+    min_pages = PDF_PARALLEL_MIN_PAGES if min_pages is None else min_pages
+    if workers <= 1 or last - first + 1 < max(2, min_pages):
+        for _, text in iter_pdf_pages(source, first, last, layout=layout):
+            yield text
+        return
+
+    path = source if isinstance(source, str) else _spool(source)
+    # Several slices per worker keep the pool busy when pages differ in cost,
+    # while keeping slices contiguous so text comes back in reading order.
+    n_pages = last - first + 1
+    size = max(1, -(-n_pages // (workers * 4)))
+    pool = _process_pool(workers)
+    futures = []
+    try:
+        for start in range(first, last + 1, size):
+            futures.append(pool.submit(_pdf_range_text, path, start, min(start + size - 1, last), layout))
+    finally:
+        if path is not source:
+            if futures:
+                _remove_when_done(futures, path)
+            else:
+                os.remove(path)
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        # Stopped early (byte budget reached): drop slices not started yet.
+        for future in futures:
+            future.cancel()
+
+def iter_txt(source: Source, chunk_size: int = 1 << 16) -> Iterator[str]:
+    """Decode UTF-8 text incrementally, with the same newline handling as open(..., "r")."""
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="ignore"), translate=True)
+    f = open(source, "rb") if isinstance(source, str) else source
+    try:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            text = decoder.decode(block)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+    finally:
+        if f is not source:
+            f.close()
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+_DOCX_TEXT = {W_NS + "tab": "\t", W_NS + "br": "\n", W_NS + "cr": "\n", W_NS + "noBreakHyphen": "-"}
+
+def iter_docx_part(part: IO[bytes]) -> Iterator[str]:
+    """
+    Paragraphs of one WordprocessingML part (document, header, footnotes, ...)
+    in document order. A table row becomes one line of tab-separated cells;
+    text boxes come out as paragraphs of their own. Each finished top-level
+    paragraph or row is dropped from the tree, so memory stays bounded by the
+    largest single block, not the document.
+    """
+    P, T, TR, TC, PPR = W_NS + "p", W_NS + "t", W_NS + "tr", W_NS + "tc", W_NS + "pPr"
+    runs = []      # text of the innermost open paragraph
+    outer = []     # runs of enclosing paragraphs (a text box nests paragraphs)
+    rows = []      # open table rows (lists of cell texts), innermost last
+    cells = []     # open table cells (lists of paragraph texts), innermost last
+    parents = []   # open elements
+    in_props = 0   # inside <w:pPr>: its <w:tab> elements are tab stops, not text
+    fallback = 0   # inside <mc:Fallback>: a copy of the preceding <mc:Choice>
+    for event, elem in ElementTree.iterparse(part, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            parents.append(elem)
+            if tag == P:
+                outer.append(runs)
+                runs = []
+            elif tag == PPR:
+                in_props += 1
+            elif tag == TR:
+                rows.append([])
+            elif tag == TC:
+                cells.append([])
+            elif tag == _MC_FALLBACK:
+                fallback += 1
+            continue
+        parents.pop()
+        if tag == T:
+            runs.append(elem.text or "")
+        elif tag == PPR:
+            in_props -= 1
+        elif tag in _DOCX_TEXT:
+            if not in_props:
+                runs.append(_DOCX_TEXT[tag])
+        elif tag == P or tag == TR:
+            if tag == P:
+                text = "".join(runs)
+                runs = outer.pop()
+            else:
+                text = "\t".join(rows.pop())
+            if fallback:
+                continue
+            if cells:
+                cells[-1].append(text)
+                continue
+            yield text
+            if parents:
+                parents[-1].remove(elem)
+        elif tag == TC:
+            rows[-1].append(" ".join(p for p in cells.pop() if p))
+        elif tag == _MC_FALLBACK:
+            fallback -= 1
+
+def _docx_part_order(name: str) -> Tuple[int, int]:
+    # header1.xml, header2.xml, ... by number, then footnotes, endnotes, footers.
+    kinds = ("word/header", "word/document", "word/footnotes", "word/endnotes", "word/footer")
+    kind = next(i for i, k in enumerate(kinds) if name.startswith(k))
+    digits = re.sub(r"\D", "", name)
+    return kind, int(digits) if digits else 0
+
+def iter_docx(source: Source) -> Iterator[str]:
+    """
+    Text of a .docx read straight from the zip with incremental XML parsing:
+    headers, then the body (paragraphs and tables in order), footnotes,
+    endnotes and footers. Headers and footers repeated across sections are
+    emitted once; empty paragraphs are kept in the body only.
+    """
+    try:
+        zf = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise Exception("not a valid DOCX (zip) file")
+    with zf:
+        names = [n for n in zf.namelist()
+                 if re.fullmatch(r"word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml", n)]
+        if "word/document.xml" not in names:
+            raise Exception("not a valid DOCX: word/document.xml missing")
+        first = True
+        seen = set()
+        for name in sorted(names, key=_docx_part_order):
+            body = name == "word/document.xml"
+            with zf.open(name) as part:
+                for text in iter_docx_part(part):
+                    if not body:
+                        if not text or text in seen:
+                            continue
+                        seen.add(text)
+                    yield text if first else "\n" + text
+                    first = False
+
+def iter_text(source: Source, ext: str, pages: Optional[str] = None, layout: Optional[str] = None,
+              workers: int = 0) -> Iterator[str]:
+    """
+    Text of a .pdf/.docx/other (read as text) document as a stream of chunks
+    (one per PDF page, or per page slice when workers > 1).
+    """
+    if ext == ".pdf":
+        first_page, last_page = parse_page_range(pages)
+        if workers > 1:
+            yield from iter_pdf_parallel(source, workers, first_page, last_page, layout=layout)
+            return
+        for _, text in iter_pdf_pages(source, first_page, last_page, layout=layout):
+            yield text
+    elif ext == ".docx":
+        yield from iter_docx(source)
+    else:
+        yield from iter_txt(source)
+
+def iter_budget(chunks: Iterator[str], max_bytes: Optional[int]) -> Iterator[str]:
+    """
+    Pass chunks through until max_bytes of UTF-8 output, then stop the producer.
+    Unlike maybe_truncate() the cap applies while text is produced.
+    """
+    used = 0
+    try:
+        for chunk in chunks:
+            if max_bytes is not None:
+                b = chunk.encode("utf-8")
+                if used + len(b) >= max_bytes:
+                    tail = b[:max_bytes - used].decode("utf-8", errors="ignore")
+                    if tail:
+                        yield tail
+                    return
+                used += len(b)
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+def take_bytes(chunks: Iterator[str], max_bytes: Optional[int]) -> str:
+    return "".join(iter_budget(chunks, max_bytes))
+
+def extract_stream(source: Source, ext: str, max_bytes: Optional[int] = None,
+                   pages: Optional[str] = None, layout: Optional[str] = None, workers: int = 0) -> str:
+    return take_bytes(iter_text(source, ext.lower(), pages=pages, layout=layout, workers=workers), max_bytes)
+
+def extract_file(path: str, max_bytes: Optional[int] = None) -> str:
+    """Dispatch on the file extension (.pdf, .docx, anything else as text)."""
+    return extract_stream(path, os.path.splitext(path)[1], max_bytes)
 
 def maybe_truncate(s: str, max_bytes: Optional[int]) -> str:
     if max_bytes is None:
@@ -45,6 +404,47 @@ def maybe_truncate(s: str, max_bytes: Optional[int]) -> str:
         # drop incomplete tail
         return b.decode("utf-8", errors="ignore")
 
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in blocks (hashlib.file_digest needs Python 3.11; the gofr image has 3.10)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def extraction_key(digest: str, ext: str, pages: Optional[str] = None, layout: Optional[str] = None,
+                   max_bytes: Optional[int] = None) -> str:
+    """Cache key for the text of a document with SHA-256 `digest` under these options."""
+    options = [EXTRACTOR_VERSION, ext.lower(), pages or "", max_bytes or 0]
+    if ext.lower() == ".pdf":
+        options.append(layout or PDF_LAYOUT)
+        options.extend(os.getenv(f"PDF_{m}_MARGIN", "") for m in ("LINE", "CHAR", "WORD"))
+    return hashlib.sha256(f"{digest}|{options!r}".encode("utf-8")).hexdigest()
+
+_cli_cache_instance = None
+
+def _cli_cache():
+    """The extraction cache for CLI runs (EXTRACT_CACHE_DIR), or None when disabled.
+
+    Built once per process, so a --serve worker scans the directory only at startup.
+    """
+    global _cli_cache_instance
+    if _cli_cache_instance is not None:
+        return _cli_cache_instance
+    if os.getenv("EXTRACT_CACHE", "1") != "1":
+        return None
+    directory = os.getenv("EXTRACT_CACHE_DIR") or os.path.join(
+        os.getenv("DATA_DIR") or os.path.join(tempfile.gettempdir(), "athenis"), "extract-cache")
+    # Loaded by path: as a script this file is not imported as part of the app package.
+    spec = importlib.util.spec_from_file_location(
+        "extract_cache", os.path.join(os.path.dirname(os.path.abspath(__file__)), "extract_cache.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _cli_cache_instance = module.ExtractionCache(
+        directory, int(os.getenv("EXTRACT_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+        redis_url=os.getenv("EXTRACT_CACHE_REDIS_URL"))
+    return _cli_cache_instance
+
 def split_into_clauses(text: str):
     """
     Splits text by periods or semicolons into simple clauses.
@@ -55,6 +455,20 @@ def split_into_clauses(text: str):
     clauses = [clause.strip() for clause in text.replace(';', '.').split('.') if clause.strip()]
     return clauses
 
+def iter_clauses(chunks: Iterable[str]) -> Iterator[str]:
+    """split_into_clauses() over a stream of text chunks, yielding each clause as soon as it ends."""
+    pending = ""
+    for chunk in chunks:
+        parts = (pending + chunk.replace(';', '.')).split('.')
+        pending = parts.pop()
+        for clause in parts:
+            clause = clause.strip()
+            if clause:
+                yield clause
+    pending = pending.strip()
+    if pending:
+        yield pending
+
 def maybe_truncate(s: str, max_bytes: Optional[int]) -> str:
     if max_bytes is None:
         return s
@@ -66,25 +480,27 @@ def maybe_truncate(s: str, max_bytes: Optional[int]) -> str:
         # drop incomplete tail
         return b.decode("utf-8", errors="ignore")
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Extract text from .txt | .pdf | .docx and print JSON")
-    parser.add_argument("--file", "-f", required=True, help="Path to input file")
-    parser.add_argument("--collapse", action="store_true", help="Collapse whitespace/newlines into single spaces")
-    parser.add_argument("--max-bytes", type=int, default=MAX_DEFAULT,
-                        help="Max output size in bytes (default 5MB). Use 0 for no limit.")
-    args = parser.parse_args()
-
-    path = args.file
-    if not os.path.exists(path):
-        print(json.dumps({"error": "file_not_found"}, ensure_ascii=False))
-        sys.exit(1)
+def run_request(path: str, collapse: bool = False, max_bytes: Optional[int] = MAX_DEFAULT,
+                pages: Optional[str] = None, layout: Optional[str] = None, workers: int = 0,
+                use_cache: bool = True) -> Tuple[dict, int]:
+    """One extraction: returns the JSON payload and the CLI exit code for it."""
+    if not path or not os.path.exists(path):
+        return {"error": "file_not_found"}, 1
 
     ext = os.path.splitext(path)[1].lower()
     try:
-        if ext == ".pdf":
-            text = extract_pdf(path)
-        elif ext == ".docx":
-            text = extract_docx(path)
+        if ext in (".pdf", ".docx"):
+            # Collapsing shrinks the text, so only cap during extraction without it.
+            budget = None if collapse else max_bytes
+            cache = _cli_cache() if use_cache else None
+            text = None
+            if cache is not None:
+                key = extraction_key(file_sha256(path), ext, pages=pages, layout=layout, max_bytes=budget)
+                text = cache.get(key)
+            if text is None:
+                text = extract_stream(path, ext, budget, pages=pages, layout=layout, workers=workers)
+                if cache is not None:
+                    cache.set(key, text)
         elif ext == ".txt" or ext == "":
             text = extract_txt(path)
         else:
@@ -92,23 +508,141 @@ def main() -> None:
             try:
                 text = extract_txt(path)
             except Exception:
-                print(json.dumps({"error": f"unsupported_extension_{ext}"}, ensure_ascii=False))
-                sys.exit(2)
+                return {"error": f"unsupported_extension_{ext}"}, 2
 
-        if args.collapse:
+        if collapse:
             text = " ".join(text.split())
 
-        max_bytes = None if args.max_bytes == 0 else args.max_bytes
         if max_bytes is not None:
             text = maybe_truncate(text, max_bytes)
 
-        # Preserve Unicode characters
-        print(json.dumps({"text": text}, ensure_ascii=False, separators=(",", ":")))
-        sys.exit(0)
+        return {"text": text}, 0
 
     except Exception as e:
-        print(json.dumps({"error": str(e)}, ensure_ascii=False))
-        sys.exit(2)
+        return {"error": str(e)}, 2
+
+# -----------------------------
+# Server mode: one warm process, many requests. Each message is a 4-byte
+# big-endian length followed by that many bytes of UTF-8 JSON.
+#   request:  {"id": ..., "file": "/tmp/x.pdf", "max_bytes": 0, "collapse": false, "pages": "1-20", "layout": "fast"}
+#   response: {"id": ..., "text": "..."} or {"id": ..., "error": "...", "code": 1|2}
+# "code" is the exit code the one-shot CLI would have used.
+# -----------------------------
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+def read_message(stream: IO[bytes]) -> Optional[dict]:
+    """Next request from `stream`, or None at a clean end of stream."""
+    header = stream.read(4)
+    if not header:
+        return None
+    if len(header) < 4:
+        raise EOFError("truncated frame header")
+    size = int.from_bytes(header, "big")
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"frame too large: {size} bytes")
+    body = b""
+    while len(body) < size:
+        chunk = stream.read(size - len(body))
+        if not chunk:
+            raise EOFError("truncated frame body")
+        body += chunk
+    return json.loads(body.decode("utf-8"))
+
+def write_message(stream: IO[bytes], message: dict):
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    stream.write(len(body).to_bytes(4, "big") + body)
+    stream.flush()
+
+def handle_message(message: dict, workers: int = 0, use_cache: bool = True) -> dict:
+    if not isinstance(message, dict):
+        return {"id": None, "error": "invalid_request", "code": 2}
+    max_bytes = message.get("max_bytes", MAX_DEFAULT)
+    try:
+        payload, code = run_request(
+            message.get("file"), collapse=bool(message.get("collapse")),
+            max_bytes=None if max_bytes == 0 else int(max_bytes),
+            pages=message.get("pages"), layout=message.get("layout"),
+            workers=int(message.get("workers", workers)), use_cache=use_cache,
+        )
+    except (TypeError, ValueError) as e:
+        payload, code = {"error": str(e)}, 2
+    payload["id"] = message.get("id")
+    if code:
+        payload["code"] = code
+    return payload
+
+def serve_stream(rfile: IO[bytes], wfile: IO[bytes], workers: int = 0, use_cache: bool = True):
+    """Answer requests from `rfile` on `wfile` until end of stream, one at a time."""
+    while True:
+        try:
+            message = read_message(rfile)
+        except ValueError as e:  # bad JSON or oversized frame: the stream is still in sync
+            write_message(wfile, {"id": None, "error": str(e), "code": 2})
+            continue
+        if message is None:
+            return
+        write_message(wfile, handle_message(message, workers=workers, use_cache=use_cache))
+
+def serve_socket(path: str, workers: int = 0, use_cache: bool = True):
+    """Listen on a Unix socket; each connection is a serve_stream() on its own thread."""
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                serve_stream(self.rfile, self.wfile, workers=workers, use_cache=use_cache)
+            except (EOFError, OSError):
+                pass
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract text from .txt | .pdf | .docx and print JSON")
+    parser.add_argument("--file", "-f", help="Path to input file")
+    parser.add_argument("--collapse", action="store_true", help="Collapse whitespace/newlines into single spaces")
+    parser.add_argument("--max-bytes", type=int, default=MAX_DEFAULT,
+                        help="Max output size in bytes (default 5MB). Use 0 for no limit.")
+    parser.add_argument("--pages", help="PDF page range, e.g. 1-20")
+    parser.add_argument("--layout", choices=["full", "fast", "none"], help="PDF layout analysis (default: PDF_LAYOUT or full)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PDF_WORKERS", 0)),
+                        help="Extract PDF pages in this many processes (0/1 = serial)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the extraction cache (EXTRACT_CACHE_DIR)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Stay up and answer length-prefixed JSON requests on stdin/stdout")
+    parser.add_argument("--socket", help="With --serve, listen on this Unix socket instead of stdin/stdout")
+    args = parser.parse_args()
+
+    if args.serve:
+        use_cache = not args.no_cache
+        if args.socket:
+            serve_socket(args.socket, workers=args.workers, use_cache=use_cache)
+            return
+        # Frames own stdout; anything a library prints goes to stderr instead.
+        out = sys.stdout.buffer
+        sys.stdout = sys.stderr
+        try:
+            serve_stream(sys.stdin.buffer, out, workers=args.workers, use_cache=use_cache)
+        except (EOFError, BrokenPipeError):
+            pass
+        return
+    if not args.file:
+        parser.error("the following arguments are required: --file/-f")
+
+    payload, code = run_request(
+        args.file, collapse=args.collapse, max_bytes=None if args.max_bytes == 0 else args.max_bytes,
+        pages=args.pages, layout=args.layout, workers=args.workers, use_cache=not args.no_cache,
+    )
+    # Preserve Unicode characters
+    separators = (",", ":") if code == 0 else None
+    print(json.dumps(payload, ensure_ascii=False, separators=separators))
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,116 @@
+"""Extraction cache: extracted text keyed by a hash of the document bytes and options.
+
+Two tiers: a local directory bounded by total bytes with LRU eviction (file
+mtime is bumped on every hit), and an optional Redis tier shared by every
+worker and pod. Only the standard library is required, so the extract.py
+CLI can use it without the Flask app.
+"""
+import os
+import tempfile
+import threading
+import zlib
+from typing import Optional
+
+
+
+class ExtractionCache:
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, redis_url: Optional[str] = None,
+                 ttl: int = 7 * 24 * 3600, prefix: str = "extract:", metrics=None):
+        self.directory = directory
+        self.metrics = metrics
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+        self.client = None
+        if redis_url:
+            try:
+                import redis  # on first use, so workers without Redis never pay for the import
+                self.client = redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            except Exception:
+                self.client = None
+        self._lock = threading.Lock()
+        self._size = self._scan_size()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".z")
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".z"):
+                        yield entry
+
+    def _scan_size(self) -> int:
+        return sum(e.stat().st_size for e in self._entries())
+
+    def _observe(self, tier: str, result: str):
+        if self.metrics is not None:
+            self.metrics.observe_cache("extract", tier, result)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.utime(path)  # LRU: recently used entries are evicted last
+            text = zlib.decompress(blob).decode("utf-8")
+            self._observe("disk", "hit")
+            return text
+        except (OSError, zlib.error):
+            self._observe("disk", "miss")
+        if self.client is not None:
+            try:
+                blob = self.client.get(self.prefix + key)
+                if blob:
+                    self._write_local(key, blob)
+                    text = zlib.decompress(blob).decode("utf-8")
+                    self._observe("redis", "hit")
+                    return text
+                self._observe("redis", "miss")
+            except Exception:
+                self._observe("redis", "error")
+        return None
+
+    def set(self, key: str, text: str):
+        blob = zlib.compress(text.encode("utf-8"), 6)
+        self._write_local(key, blob)
+        if self.client is not None:
+            try:
+                self.client.setex(self.prefix + key, self.ttl, blob)
+            except Exception:
+                pass
+
+    def _write_local(self, key: str, blob: bytes):
+        if len(blob) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._size += len(blob)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # The running size is a per-process estimate (other workers share the
+        # directory), so re-measure before deleting, then trim to 90% of budget.
+        entries = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries()))
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
@@ -0,0 +1,274 @@
+"""Batch document jobs: a SQLite-backed store and a background worker pool.
+
+Jobs and their items live in SQLite so they survive a worker restart.
+Workers claim pending items in small batches under a lease; an item whose
+lease expired (its worker died mid-batch) becomes claimable again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+from app.utils.admission import AdmissionError
+from app.utils.fair_scheduler import estimate_tokens
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    task TEXT NOT NULL,
+    language TEXT,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    doc_id TEXT,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    lease_until REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (status, job_id, idx);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str, lease_seconds: float = 300.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_job(self, task: str, documents: List[Dict], language: Optional[str] = None,
+                   owner: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, task, language, status, total, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, owner, task, language, len(documents), now, now),
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, doc_id, text, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, i, d.get("id") or str(i), d["text"]) for i, d in enumerate(documents)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def has_pending(self) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM job_items WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) LIMIT 1",
+            (time.time(),),
+        ).fetchone()
+        return row is not None
+
+    def claim(self, limit: int) -> Optional[Dict]:
+        """Lease up to `limit` pending items of the oldest unfinished job."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            head = conn.execute(
+                "SELECT j.id, j.owner, j.task, j.language FROM job_items i JOIN jobs j ON j.id = i.job_id"
+                " WHERE i.status = 'pending' OR (i.status = 'running' AND i.lease_until < ?)"
+                " ORDER BY j.created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if head is None:
+                conn.execute("COMMIT")
+                return None
+            rows = conn.execute(
+                "SELECT idx, doc_id, text FROM job_items WHERE job_id = ?"
+                " AND (status = 'pending' OR (status = 'running' AND lease_until < ?)) ORDER BY idx LIMIT ?",
+                (head["id"], now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE job_items SET status = 'running', lease_until = ? WHERE job_id = ? AND idx = ?",
+                [(now + self.lease_seconds, head["id"], r["idx"]) for r in rows],
+            )
+            conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                         (now, head["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {**dict(head), "items": [dict(r) for r in rows]}
+
+    def complete(self, job_id: str, results: List[Dict]):
+        """Store per-item results ({"idx", "result"} or {"idx", "error"}) and roll up the job."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, lease_until = NULL"
+                " WHERE job_id = ? AND idx = ? AND status = 'running'",
+                [("failed" if r.get("error") else "done",
+                  json.dumps(r["result"]) if r.get("result") is not None else None,
+                  r.get("error"), job_id, r["idx"]) for r in results],
+            )
+            counts = conn.execute(
+                "SELECT SUM(status = 'done') AS done, SUM(status = 'failed') AS failed FROM job_items WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            conn.execute(
+                "UPDATE jobs SET done = ?, failed = ?, updated_at = ?,"
+                " status = CASE WHEN ? + ? >= total THEN 'completed' ELSE status END WHERE id = ?",
+                (counts["done"], counts["failed"], now, counts["done"], counts["failed"], job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def unclaim(self, job_id: str, idxs: List[int]):
+        """Hand leased items back to the queue without recording a result."""
+        self._conn().executemany(
+            "UPDATE job_items SET status = 'pending', lease_until = NULL WHERE job_id = ? AND idx = ? AND status = 'running'",
+            [(job_id, i) for i in idxs],
+        )
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT idx, doc_id, status, result, error FROM job_items WHERE job_id = ?"
+            " AND idx >= ? ORDER BY idx LIMIT ?",
+            (job_id, offset, limit),
+        ).fetchall()
+        return [_item(r) for r in rows]
+
+    def iter_finished(self, job_id: str, follow: bool = False, poll: float = 0.5) -> Iterator[Dict]:
+        """Yield finished items in index order; with follow=True wait for the rest."""
+        next_idx = 0
+        while True:
+            rows = self._conn().execute(
+                "SELECT idx, doc_id, status, result, error FROM job_items WHERE job_id = ? AND idx >= ?"
+                " ORDER BY idx LIMIT 500",
+                (job_id, next_idx),
+            ).fetchall()
+            stalled = not rows
+            for r in rows:
+                if r["status"] not in ("done", "failed"):
+                    stalled = True
+                    break
+                yield _item(r)
+                next_idx = r["idx"] + 1
+            job = self.get_job(job_id)
+            if job is None or next_idx >= job["total"] or not follow:
+                return
+            if stalled:
+                time.sleep(poll)
+
+
+def _item(row) -> Dict:
+    item = {"index": row["idx"], "id": row["doc_id"], "status": row["status"]}
+    if row["result"] is not None:
+        item["result"] = json.loads(row["result"])
+    if row["error"]:
+        item["error"] = row["error"]
+    return item
+
+
+class BatchRunner:
+    """Background worker threads that drain the JobStore through ModelManager.process_batch."""
+
+    def __init__(self, store: JobStore, model_manager, workers: int = 2, batch_size: int = 8,
+                 admission=None, poll_interval: float = 1.0):
+        self.store = store
+        self.model_manager = model_manager
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.admission = admission
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._loop, name=f"batch-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def notify(self):
+        self.start()
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once()
+            except Exception:
+                worked = False
+            if not worked:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_once(self) -> bool:
+        """Process one claimed batch; returns False when there was nothing to do."""
+        claim = self.store.claim(self.batch_size)
+        if not claim:
+            return False
+        texts = [item["text"] for item in claim["items"]]
+        language = claim["language"] or "en"
+        if self.admission is not None:
+            cost = sum(estimate_tokens(t, claim["task"]) for t in texts)
+            # Batch work competes fairly with interactive keys for the same slots.
+            try:
+                with self.admission.admit(timeout=self.store.lease_seconds, key=claim["owner"], cost=cost):
+                    outputs = self.model_manager.process_batch(texts, claim["task"], language)
+            except AdmissionError:
+                self.store.unclaim(claim["id"], [item["idx"] for item in claim["items"]])
+                return False
+        else:
+            outputs = self.model_manager.process_batch(texts, claim["task"], language)
+
+        results = []
+        for item, out in zip(claim["items"], outputs):
+            if isinstance(out, dict) and out.get("error"):
+                results.append({"idx": item["idx"], "error": out.get("message", "Model processing failed")})
+            else:
+                results.append({"idx": item["idx"], "result": out})
+        self.store.complete(claim["id"], results)
+        return True
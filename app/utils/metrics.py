@@ -1,7 +1,19 @@
-from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest, multiprocess
+
+# Under gunicorn every worker has its own registry; with PROMETHEUS_MULTIPROC_DIR
+# set, prometheus_client writes samples to shared files and /metrics merges them.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
 
 class Metrics:
     def __init__(self):
+        if MULTIPROC_DIR:
+            os.makedirs(MULTIPROC_DIR, exist_ok=True)
         # Use a dedicated registry for this instance
         self.registry = CollectorRegistry()
 
@@ -15,6 +27,7 @@ class Metrics:
         self.request_latency = Histogram(
             "request_latency_seconds", 
             "Latency of requests in seconds", 
+            ["endpoint", "method"],
             buckets=(0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10),
             registry=self.registry
         )
@@ -22,5 +35,169 @@ class Metrics:
         self.gpu_memory_used = Gauge(
             "gpu_memory_used_bytes", 
             "GPU memory used in bytes",
+            multiprocess_mode="livesum",
+            registry=self.registry
+        )
+
+        # Inference admission (see app/utils/admission.py)
+        self.inference_queue_depth = Gauge(
+            "inference_queue_depth",
+            "Inference requests waiting for an execution slot",
+            multiprocess_mode="livesum",
+            registry=self.registry
+        )
+
+        self.inference_inflight = Gauge(
+            "inference_inflight",
+            "Inference requests currently holding an execution slot",
+            multiprocess_mode="livesum",
+            registry=self.registry
+        )
+
+        self.inference_queue_wait = Histogram(
+            "inference_queue_wait_seconds",
+            "Time spent waiting for an inference slot",
+            buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+            registry=self.registry
+        )
+
+        self.inference_rejected_total = Counter(
+            "inference_rejected_total",
+            "Inference requests dropped before generation",
+            ["reason"],
+            registry=self.registry
+        )
+
+        # Per-tenant usage (see app/utils/fair_scheduler.py)
+        self.tenant_requests_total = Counter(
+            "tenant_requests_total",
+            "Inference requests admitted per client key",
+            ["tenant"],
+            registry=self.registry
+        )
+
+        self.tenant_tokens_total = Counter(
+            "tenant_tokens_total",
+            "Estimated tokens consumed per client key",
+            ["tenant", "direction"],
+            registry=self.registry
+        )
+
+        # Per-stage breakdown of request latency (see stage() below)
+        self.stage_latency = Histogram(
+            "stage_duration_seconds",
+            "Time spent in each processing stage of a request",
+            ["stage"],
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+            registry=self.registry
+        )
+
+        self.time_to_first_token = Histogram(
+            "time_to_first_token_seconds",
+            "Time from request start to the first streamed chunk",
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+            registry=self.registry
+        )
+
+        self.request_tokens = Histogram(
+            "request_tokens",
+            "Estimated tokens per request",
+            ["direction"],
+            buckets=(16, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
             registry=self.registry
         )
+
+        # Per cache and tier (l1/l2, or disk/redis for extracted text); hit rate = hit / (hit + miss)
+        self.cache_requests_total = Counter(
+            "cache_requests_total",
+            "Cache lookups by cache, tier and result",
+            ["cache", "tier", "result"],
+            registry=self.registry
+        )
+
+        # Selective simplify (see app/models/complexity.py): clauses sent to the model vs. passed through
+        self.simplify_clauses_total = Counter(
+            "simplify_clauses_total",
+            "Clauses handled by selective simplify, by route",
+            ["route"],
+            registry=self.registry
+        )
+
+    def observe_request(self, endpoint: str, method: str, status: int, timings: Optional["StageTimings"]):
+        """Record one finished request and flush its stage timings."""
+        self.requests_total.labels(endpoint=endpoint, method=method, status=str(status)).inc()
+        if timings is None:
+            return
+        self.request_latency.labels(endpoint=endpoint, method=method).observe(timings.elapsed())
+        for name, seconds in timings.durations.items():
+            if name == "ttft":
+                self.time_to_first_token.observe(seconds)
+            else:
+                self.stage_latency.labels(stage=name).observe(seconds)
+        for name, value in timings.counts.items():
+            if name in ("tokens_in", "tokens_out"):
+                self.request_tokens.labels(direction="input" if name == "tokens_in" else "output").observe(value)
+
+    def observe_cache(self, cache: str, tier: str, result: str, n: int = 1):
+        self.cache_requests_total.labels(cache=cache, tier=tier, result=result).inc(n)
+
+    def render(self) -> bytes:
+        """Exposition for /metrics, merged across worker processes when multiprocess mode is on."""
+        if MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry)
+        return generate_latest(self.registry)
+
+
+_timings: contextvars.ContextVar = contextvars.ContextVar("stage_timings", default=None)
+
+
+class StageTimings:
+    """Stage durations (seconds) and counters collected while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, float] = {}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: float = 1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+
+def begin_request() -> StageTimings:
+    timings = StageTimings()
+    _timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _timings.get()
+
+
+def record_stage(name: str, seconds: float):
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def record_count(name: str, value: float = 1):
+    timings = _timings.get()
+    if timings is not None:
+        timings.count(name, value)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as stage `name` of the current request; a no-op cost outside requests."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
@@ -0,0 +1,39 @@
+"""Heavy optional dependencies, imported on first use.
+
+torch, transformers and sentence-transformers take seconds and hundreds of
+MB to import. Workers using the external LLM, and FAST_TEST runs, never
+touch them, so modules must not import them at the top: they call
+optional_import() at the point of use and keep their usual fallback for
+None (library not installed).
+"""
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Dict, Optional
+
+_modules: Dict[str, Optional[ModuleType]] = {}
+_lock = threading.Lock()
+
+
+def optional_import(name: str) -> Optional[ModuleType]:
+    """The module `name`, imported on first call, or None if it is not installed."""
+    if name not in _modules:
+        with _lock:
+            if name not in _modules:
+                try:
+                    _modules[name] = importlib.import_module(name)
+                except ImportError:
+                    _modules[name] = None
+    return _modules[name]
+
+
+def loaded(name: str) -> Optional[ModuleType]:
+    """The module `name` if something already imported it; never imports it."""
+    return sys.modules.get(name)
+
+
+def cuda_available() -> bool:
+    """Whether torch is installed and sees a GPU (imports torch)."""
+    torch = optional_import("torch")
+    return bool(torch is not None and torch.cuda.is_available())
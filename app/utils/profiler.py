@@ -0,0 +1,111 @@
+"""Per-request profiling.
+
+`server_timing()` turns the stage timings collected in app/utils/metrics.py
+into a `Server-Timing` header. `SamplingProfiler` samples one thread's stack
+with `sys._current_frames()` and aggregates it into collapsed stacks
+("root;caller;callee count" lines), the input format of flamegraph.pl and
+speedscope. Finished profiles are kept in a small in-memory `ProfileStore`.
+Nothing here runs unless a request is actually being profiled.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+PROFILE_HEADER = "X-Profile"
+
+
+def server_timing(timings) -> str:
+    """`Server-Timing` value with per-stage and total durations in milliseconds."""
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.durations.items()]
+    parts.append(f"total;dur={timings.elapsed() * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def should_sample(percent: float) -> bool:
+    return percent > 0 and random.random() * 100 < percent
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread on a background thread until stopped."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.id = uuid.uuid4().hex[:16]
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self) -> Counter:
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            self.duration = time.perf_counter() - self.started
+        return self.stacks
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Ring buffer of the most recent profiles."""
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = max(1, capacity)
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profiler: SamplingProfiler, **info) -> str:
+        profile_id = profiler.id
+        entry = {
+            "id": profile_id,
+            "created_at": time.time(),
+            "duration_ms": round(profiler.duration * 1000, 1),
+            "samples": sum(profiler.stacks.values()),
+            "collapsed": profiler.collapsed(),
+            **info,
+        }
+        with self._lock:
+            self._profiles[profile_id] = entry
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            entries = list(self._profiles.values())
+        return [{k: v for k, v in e.items() if k != "collapsed"} for e in reversed(entries)]
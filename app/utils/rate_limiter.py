@@ -1,43 +1,117 @@
+import threading
 import time
-from collections import defaultdict, deque
+import zlib
+from typing import Callable, Optional
+
+from app.utils.optional import optional_import
 
 
 class RateLimiter:
-    def __init__(self, rate_per_minute: int = 60):
+    """
+    In-process GCRA (generic cell rate algorithm) limiter.
+
+    Each key stores one float, its theoretical arrival time (TAT), so memory
+    is constant per key regardless of the rate. Keys are spread over striped
+    locks, and fully recovered keys are expired a few at a time on the
+    request path instead of in a periodic O(keys) sweep.
+    """
+
+    def __init__(self, rate_per_minute: int = 60, burst: Optional[int] = None, stripes: int = 16,
+                 clock: Callable[[], float] = time.monotonic):
         self.rate = rate_per_minute
-        self.buckets = defaultdict(deque)
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 300  # Clean up every 5 minutes
-
-    def _cleanup_old_buckets(self):
-        """Remove old buckets to prevent memory leaks"""
-        now = time.time()
-        if now - self.last_cleanup < self.cleanup_interval:
-            return
-            
-        keys_to_remove = []
-        for key, q in self.buckets.items():
-            # Remove timestamps older than 2 minutes
-            while q and now - q[0] > 120:
-                q.popleft()
-            # If bucket is empty, mark for removal
-            if not q:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.buckets[key]
-            
-        self.last_cleanup = now
+        self.burst = max(1, burst if burst is not None else rate_per_minute)
+        self.interval = 60.0 / max(1, rate_per_minute)
+        # A key may run `burst` requests ahead of the steady rate.
+        self.tolerance = self.interval * (self.burst - 1)
+        self.clock = clock
+        self._stripes = [({}, threading.Lock()) for _ in range(max(1, stripes))]
+
+    def _stripe(self, key: str):
+        return self._stripes[zlib.crc32(key.encode("utf-8")) % len(self._stripes)]
 
     def allow(self, key: str) -> bool:
-        self._cleanup_old_buckets()
-        
-        now = time.time()
-        window = 60
-        q = self.buckets[key]
-        while q and now - q[0] > window:
-            q.popleft()
-        if len(q) < self.rate:
-            q.append(now)
+        key = key or ""
+        now = self.clock()
+        tats, lock = self._stripe(key)
+        with lock:
+            tat = max(tats.pop(key, now), now)
+            self._expire(tats, now)
+            if tat - now > self.tolerance:
+                tats[key] = tat
+                return False
+            tats[key] = tat + self.interval
             return True
-        return False
+
+    @staticmethod
+    def _expire(tats: dict, now: float, budget: int = 2):
+        # Dicts keep insertion order and allow() re-inserts on every hit, so the
+        # first entries are the least recently seen keys.
+        for _ in range(budget):
+            if not tats:
+                return
+            oldest = next(iter(tats))
+            if tats[oldest] > now:
+                return
+            del tats[oldest]
+
+    def __len__(self):
+        return sum(len(tats) for tats, _ in self._stripes)
+
+
+# Atomic GCRA check-and-update using the Redis server clock, so all
+# workers and pods share one limit without trusting their own clocks.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+if tat - now > tolerance then return 0 end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil((new_tat - now) * 1000))
+return 1
+"""
+
+
+class RedisRateLimiter:
+    """
+    GCRA limiter shared through Redis; falls back to a local limiter if Redis
+    is unreachable. After a failed call the local limiter is used directly
+    for `retry_after` seconds, so requests do not each wait out the socket
+    timeout while Redis is down.
+    """
+
+    def __init__(self, rate_per_minute: int = 60, redis_url: Optional[str] = None, client=None,
+                 burst: Optional[int] = None, prefix: str = "ratelimit:", retry_after: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.local = RateLimiter(rate_per_minute, burst=burst, clock=clock)
+        self.rate = rate_per_minute
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.clock = clock
+        self._down_until = 0.0
+        self.client = client
+        redis = optional_import("redis") if redis_url else None
+        if self.client is None and redis is not None:
+            try:
+                self.client = redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+            except Exception:
+                self.client = None
+        self._script = self.client.register_script(GCRA_SCRIPT) if self.client is not None else None
+
+    def allow(self, key: str) -> bool:
+        if self._script is not None and self.clock() >= self._down_until:
+            try:
+                return bool(self._script(keys=[self.prefix + (key or "")],
+                                         args=[self.local.interval, self.local.tolerance]))
+            except Exception:
+                self._down_until = self.clock() + self.retry_after
+        return self.local.allow(key)
+
+
+def create_rate_limiter(rate_per_minute: int, backend: str = "memory", redis_url: Optional[str] = None,
+                        burst: Optional[int] = None, retry_after: float = 5.0):
+    if backend == "redis" and redis_url:
+        return RedisRateLimiter(rate_per_minute, redis_url=redis_url, burst=burst, retry_after=retry_after)
+    return RateLimiter(rate_per_minute, burst=burst)
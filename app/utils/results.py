@@ -0,0 +1,263 @@
+"""Persistent, content-addressed store of analysis results.
+
+Documents are keyed by a hash of their whitespace-normalised text, so a
+contract submitted again (by anyone) is looked up instead of re-analysed.
+Which tenant submitted what, and when, is kept separately and scopes every
+query. Clauses are indexed for full-text search (SQLite FTS5 when the
+build has it, LIKE otherwise) and every detected risk is a row indexed by
+type and severity, so past findings can be queried without re-running
+anything. Model outputs are stored per analysis key (task + model), since
+they change with the model while clauses and risks do not.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Bump when risk rules or clause splitting change: stored findings of an
+# older version are recomputed on the next submission.
+ANALYSIS_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    chars INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    owner TEXT NOT NULL,
+    doc_hash TEXT NOT NULL,
+    name TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (owner, doc_hash)
+);
+CREATE INDEX IF NOT EXISTS submissions_owner_time ON submissions (owner, created_at);
+CREATE TABLE IF NOT EXISTS clauses (
+    id INTEGER PRIMARY KEY,
+    doc_hash TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (doc_hash, idx)
+);
+CREATE TABLE IF NOT EXISTS risks (
+    id INTEGER PRIMARY KEY,
+    doc_hash TEXT NOT NULL,
+    clause_idx INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT,
+    confidence REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS risks_doc ON risks (doc_hash, clause_idx);
+CREATE INDEX IF NOT EXISTS risks_type ON risks (type, severity);
+CREATE INDEX IF NOT EXISTS risks_severity ON risks (severity);
+CREATE TABLE IF NOT EXISTS outputs (
+    doc_hash TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (doc_hash, analysis)
+);
+"""
+
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5(text, content='clauses', content_rowid='id')"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:32]
+
+
+class ResultStore:
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        try:
+            conn.execute(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False  # SQLite built without FTS5: search falls back to LIKE
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+
+    def save(self, owner: str, text: str, clauses: List[str], risks: List[List[Dict]],
+             analysis: Optional[str] = None, result: Optional[Dict] = None, name: Optional[str] = None) -> str:
+        return self.save_many(owner, [{"text": text, "clauses": clauses, "risks": risks, "result": result,
+                                       "name": name}], analysis)[0]
+
+    def save_many(self, owner: str, documents: List[Dict], analysis: Optional[str] = None) -> List[str]:
+        """
+        Store analysed documents in one transaction. Each item has "text",
+        "clauses" and "risks" (one list per clause), optionally "result" (the
+        model output for `analysis`) and "name". Findings already stored at
+        the current ANALYSIS_VERSION are kept as they are. Returns the ids.
+        """
+        now = time.time()
+        ids = [content_hash(d["text"]) for d in documents]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = self._current(ids)
+            clause_rows, risk_rows = [], []
+            for doc_hash, doc in zip(ids, documents):
+                if doc_hash not in current:
+                    current.add(doc_hash)
+                    self._drop_findings(conn, doc_hash)
+                    conn.execute("INSERT OR REPLACE INTO documents (doc_hash, version, chars, created_at)"
+                                 " VALUES (?, ?, ?, ?)", (doc_hash, ANALYSIS_VERSION, len(doc["text"]), now))
+                    clause_rows.extend((doc_hash, i, text) for i, text in enumerate(doc["clauses"]))
+                    risk_rows.extend(
+                        (doc_hash, i, r["type"], r.get("severity"), r.get("confidence"), json.dumps(r, ensure_ascii=False))
+                        for i, clause_risks in enumerate(doc["risks"]) for r in clause_risks
+                    )
+            conn.executemany("INSERT INTO clauses (doc_hash, idx, text) VALUES (?, ?, ?)", clause_rows)
+            conn.executemany("INSERT INTO risks (doc_hash, clause_idx, type, severity, confidence, data)"
+                             " VALUES (?, ?, ?, ?, ?, ?)", risk_rows)
+            if self.fts and clause_rows:
+                self._index_clauses(conn, list(dict.fromkeys(row[0] for row in clause_rows)))
+            if analysis is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO outputs (doc_hash, analysis, result, created_at) VALUES (?, ?, ?, ?)",
+                    [(h, analysis, json.dumps(d["result"], ensure_ascii=False), now)
+                     for h, d in zip(ids, documents) if d.get("result") is not None],
+                )
+            conn.executemany(
+                "INSERT INTO submissions (owner, doc_hash, name, created_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (owner, doc_hash) DO UPDATE SET created_at = excluded.created_at,"
+                " name = COALESCE(excluded.name, submissions.name)",
+                [(owner, h, d.get("name"), now) for h, d in zip(ids, documents)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def touch(self, owner: str, doc_hash: str, name: Optional[str] = None):
+        """Record that `owner` submitted an already-stored document (now)."""
+        self._conn().execute(
+            "INSERT INTO submissions (owner, doc_hash, name, created_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (owner, doc_hash) DO UPDATE SET created_at = excluded.created_at,"
+            " name = COALESCE(excluded.name, submissions.name)",
+            (owner, doc_hash, name, time.time()),
+        )
+
+    def _current(self, ids: List[str]) -> set:
+        unique = list(dict.fromkeys(ids))
+        found = set()
+        for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+            chunk = unique[i:i + 500]
+            rows = self._conn().execute(
+                f"SELECT doc_hash FROM documents WHERE version = ? AND doc_hash IN ({','.join('?' * len(chunk))})",
+                (ANALYSIS_VERSION, *chunk),
+            ).fetchall()
+            found.update(r["doc_hash"] for r in rows)
+        return found
+
+    def _drop_findings(self, conn: sqlite3.Connection, doc_hash: str):
+        if self.fts:
+            conn.execute("INSERT INTO clauses_fts (clauses_fts, rowid, text)"
+                         " SELECT 'delete', id, text FROM clauses WHERE doc_hash = ?", (doc_hash,))
+        conn.execute("DELETE FROM clauses WHERE doc_hash = ?", (doc_hash,))
+        conn.execute("DELETE FROM risks WHERE doc_hash = ?", (doc_hash,))
+
+    def _index_clauses(self, conn: sqlite3.Connection, doc_hashes: List[str]):
+        for i in range(0, len(doc_hashes), 500):
+            chunk = doc_hashes[i:i + 500]
+            conn.execute(f"INSERT INTO clauses_fts (rowid, text) SELECT id, text FROM clauses"
+                         f" WHERE doc_hash IN ({','.join('?' * len(chunk))})", chunk)
+
+    # --- Reads ---
+
+    def find(self, text: str, analysis: Optional[str] = None) -> Optional[Dict]:
+        """
+        Stored findings for `text` at the current ANALYSIS_VERSION, or None:
+        {"id", "clauses", "risks" (per clause), "result" (None if not stored
+        for `analysis`)}.
+        """
+        doc_hash = content_hash(text)
+        conn = self._conn()
+        row = conn.execute("SELECT version FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        if row is None or row["version"] != ANALYSIS_VERSION:
+            return None
+        clauses = [r["text"] for r in conn.execute(
+            "SELECT text FROM clauses WHERE doc_hash = ? ORDER BY idx", (doc_hash,))]
+        risks = [[] for _ in clauses]
+        for r in conn.execute("SELECT clause_idx, data FROM risks WHERE doc_hash = ? ORDER BY id", (doc_hash,)):
+            risks[r["clause_idx"]].append(json.loads(r["data"]))
+        result = None
+        if analysis is not None:
+            out = conn.execute("SELECT result FROM outputs WHERE doc_hash = ? AND analysis = ?",
+                               (doc_hash, analysis)).fetchone()
+            result = json.loads(out["result"]) if out else None
+        return {"id": doc_hash, "clauses": clauses, "risks": risks, "result": result}
+
+    def get(self, owner: str, doc_hash: str) -> Optional[Dict]:
+        """A document `owner` has submitted, with clauses, risks and every stored output."""
+        conn = self._conn()
+        sub = conn.execute("SELECT name, created_at FROM submissions WHERE owner = ? AND doc_hash = ?",
+                           (owner, doc_hash)).fetchone()
+        if sub is None:
+            return None
+        clauses = [{"index": r["idx"], "text": r["text"], "risks": []} for r in conn.execute(
+            "SELECT idx, text FROM clauses WHERE doc_hash = ? ORDER BY idx", (doc_hash,))]
+        for r in conn.execute("SELECT clause_idx, data FROM risks WHERE doc_hash = ? ORDER BY id", (doc_hash,)):
+            clauses[r["clause_idx"]]["risks"].append(json.loads(r["data"]))
+        outputs = {r["analysis"]: json.loads(r["result"]) for r in conn.execute(
+            "SELECT analysis, result FROM outputs WHERE doc_hash = ?", (doc_hash,))}
+        return {"id": doc_hash, "name": sub["name"], "submitted_at": sub["created_at"],
+                "clauses": clauses, "outputs": outputs}
+
+    def search(self, owner: str, query: Optional[str] = None, risk_type: Optional[str] = None,
+               severity: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               offset: int = 0, limit: int = 50) -> Dict:
+        """
+        Findings (one per stored risk) in documents `owner` submitted, newest
+        submission first. `query` is matched against the clause text (FTS5
+        syntax when available). Returns {"items", "has_more"}.
+        Raises ValueError for a malformed query.
+        """
+        sql = ["SELECT r.id, r.doc_hash, r.clause_idx, r.data, c.text AS clause, s.name, s.created_at"
+               " FROM submissions s JOIN risks r ON r.doc_hash = s.doc_hash"
+               " JOIN clauses c ON c.doc_hash = r.doc_hash AND c.idx = r.clause_idx WHERE s.owner = ?"]
+        params: list = [owner]
+        for clause, value in (("s.created_at >= ?", since), ("s.created_at < ?", until),
+                              ("r.type = ?", risk_type), ("r.severity = ?", severity)):
+            if value is not None:
+                sql.append(clause)
+                params.append(value)
+        if query:
+            if self.fts:
+                sql.append("c.id IN (SELECT rowid FROM clauses_fts WHERE clauses_fts MATCH ?)")
+                params.append(query)
+            else:
+                for term in query.split():
+                    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    sql.append("c.text LIKE ? ESCAPE '\\'")
+                    params.append(f"%{escaped}%")
+        statement = " AND ".join(sql) + " ORDER BY s.created_at DESC, r.id LIMIT ? OFFSET ?"
+        try:
+            rows = self._conn().execute(statement, (*params, limit + 1, offset)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query: {e}") from None
+        items = [{"document_id": r["doc_hash"], "document_name": r["name"], "submitted_at": r["created_at"],
+                  "clause_index": r["clause_idx"], "clause": r["clause"], "risk": json.loads(r["data"])}
+                 for r in rows[:limit]]
+        return {"items": items, "has_more": len(rows) > limit}
@@ -0,0 +1,244 @@
+"""Versioned documents: incremental re-analysis across contract revisions.
+
+Each submission is split into clauses whose ids are hashes of their
+(whitespace-normalised) text, so an unchanged clause has the same id in
+every revision. The clause-id list of each version is kept per document,
+and per-clause results (risks, simplified text) are stored under the
+clause id. A new revision is diffed against the previous one and only
+clauses without stored results are analysed; everything else is merged
+from the store. Results are stored under a kind that carries the version
+of what produced them (risk rules, model and prompt), so a rule or model
+change re-analyses clauses instead of serving stale results. Summaries are
+not part of this: a document summary depends on every clause and cannot be
+merged from per-clause results.
+"""
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.utils.extract import split_into_clauses
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doc_versions (
+    owner TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    clause_ids TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (owner, doc_id, version)
+);
+CREATE TABLE IF NOT EXISTS clauses (
+    clause_id TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clause_results (
+    clause_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (clause_id, kind)
+);
+"""
+
+
+def normalize_clause(text: str) -> str:
+    return " ".join(text.split())
+
+
+def clause_id(text: str) -> str:
+    return hashlib.sha256(normalize_clause(text).encode("utf-8")).hexdigest()[:24]
+
+
+def segment(text: str) -> List[Dict]:
+    """Clauses of `text` as [{"id", "text"}], in order (duplicates keep their position)."""
+    clauses = (normalize_clause(c) for c in split_into_clauses(text))
+    return [{"id": clause_id(c), "text": c} for c in clauses if c]
+
+
+def diff_clauses(previous: List[str], current: List[str]) -> Dict:
+    """
+    Status of every clause position in `current` ("unchanged", "changed" or
+    "inserted") relative to `previous`, plus the ids that were removed.
+    """
+    status = ["inserted"] * len(current)
+    removed = []
+    matcher = difflib.SequenceMatcher(a=previous, b=current, autojunk=False)
+    for op, a0, a1, b0, b1 in matcher.get_opcodes():
+        if op == "equal":
+            status[b0:b1] = ["unchanged"] * (b1 - b0)
+        elif op == "replace":
+            status[b0:b1] = ["changed"] * (b1 - b0)
+            removed.extend(previous[a0:a1])
+        elif op == "delete":
+            removed.extend(previous[a0:a1])
+    current_ids = set(current)
+    return {"status": status, "removed": [i for i in dict.fromkeys(removed) if i not in current_ids]}
+
+
+class RevisionStore:
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def latest(self, owner: str, doc_id: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT version, clause_ids, created_at FROM doc_versions WHERE owner = ? AND doc_id = ?"
+            " ORDER BY version DESC LIMIT 1",
+            (owner, doc_id),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"version": row["version"], "clause_ids": json.loads(row["clause_ids"]), "created_at": row["created_at"]}
+
+    def add_version(self, owner: str, doc_id: str, clauses: List[Dict]) -> int:
+        """Record a new version (clause texts and the id list); returns its number."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT MAX(version) AS v FROM doc_versions WHERE owner = ? AND doc_id = ?",
+                               (owner, doc_id)).fetchone()
+            version = (row["v"] or 0) + 1
+            conn.executemany("INSERT OR IGNORE INTO clauses (clause_id, text) VALUES (?, ?)",
+                             [(c["id"], c["text"]) for c in clauses])
+            conn.execute(
+                "INSERT INTO doc_versions (owner, doc_id, version, clause_ids, created_at) VALUES (?, ?, ?, ?, ?)",
+                (owner, doc_id, version, json.dumps([c["id"] for c in clauses]), now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def clause_texts(self, ids: List[str]) -> Dict[str, str]:
+        return self._select("SELECT clause_id, text FROM clauses WHERE clause_id IN ({})", ids, "text")
+
+    def results(self, ids: List[str], kind: str) -> Dict:
+        found = self._select("SELECT clause_id, result FROM clause_results WHERE kind = ? AND clause_id IN ({})",
+                             ids, "result", kind)
+        return {k: json.loads(v) for k, v in found.items()}
+
+    def store_results(self, kind: str, results: Dict):
+        now = time.time()
+        self._conn().executemany(
+            "INSERT OR REPLACE INTO clause_results (clause_id, kind, result, created_at) VALUES (?, ?, ?, ?)",
+            [(cid, kind, json.dumps(r, ensure_ascii=False), now) for cid, r in results.items()],
+        )
+
+    def _select(self, sql: str, ids: List[str], column: str, *params) -> Dict:
+        found = {}
+        unique = list(dict.fromkeys(ids))
+        for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+            chunk = unique[i:i + 500]
+            rows = self._conn().execute(sql.format(",".join("?" * len(chunk))), (*params, *chunk)).fetchall()
+            found.update((r["clause_id"], r[column]) for r in rows)
+        return found
+
+
+class IncrementalAnalyzer:
+    """Risk detection and simplification that only run on clauses not seen before."""
+
+    def __init__(self, store: RevisionStore, detect: Callable[[str], List[Dict]], risk_version: str = "",
+                 model_version: str = ""):
+        self.store = store
+        self.detect = detect
+        self.risk_version = risk_version
+        self.model_version = model_version
+
+    @staticmethod
+    def _kind(*parts: str) -> str:
+        return ":".join(p for p in parts if p)
+
+    def submit(self, owner: str, doc_id: str, text: str,
+               simplify: Optional[Callable[[List[str]], List[Dict]]] = None, language: str = "en") -> Dict:
+        """
+        Analyse a new revision of `doc_id`. `simplify` maps clause texts to
+        model_manager-style results and is only called for clauses without a
+        stored simplification; failed results are returned but not stored.
+        """
+        clauses = segment(text)
+        ids = [c["id"] for c in clauses]
+        previous = self.store.latest(owner, doc_id)
+        diff = diff_clauses(previous["clause_ids"] if previous else [], ids)
+        texts = {c["id"]: c["text"] for c in clauses}
+
+        risk_kind = self._kind("risk", self.risk_version)
+        risks = self.store.results(ids, risk_kind)
+        fresh = {cid: self.detect(texts[cid]) for cid in dict.fromkeys(ids) if cid not in risks}
+        self.store.store_results(risk_kind, fresh)
+        risks.update(fresh)
+        analyzed = set(fresh)
+
+        simplified = {}
+        if simplify is not None:
+            kind = self._kind("simplify", self.model_version, language)
+            simplified = self.store.results(ids, kind)
+            missing = [cid for cid in dict.fromkeys(ids) if cid not in simplified]
+            if missing:
+                outputs = simplify([texts[cid] for cid in missing])
+                produced = dict(zip(missing, outputs))
+                self.store.store_results(kind, {cid: r for cid, r in produced.items() if not r.get("error")})
+                simplified.update(produced)
+                analyzed.update(missing)
+
+        version = self.store.add_version(owner, doc_id, clauses)
+        out = []
+        for index, (clause, status) in enumerate(zip(clauses, diff["status"])):
+            cid = clause["id"]
+            item = {"index": index, "id": cid, "text": clause["text"], "status": status,
+                    "risks": [{**r, "clause_id": cid} for r in risks[cid]]}
+            if simplify is not None:
+                item["simplified"] = simplified[cid]
+            out.append(item)
+        return {
+            "id": doc_id,
+            "version": version,
+            "previous_version": previous["version"] if previous else None,
+            "clauses": out,
+            "removed": diff["removed"],
+            "stats": {
+                "clauses": len(clauses),
+                **{s: diff["status"].count(s) for s in ("unchanged", "changed", "inserted")},
+                "removed": len(diff["removed"]),
+                "analyzed": len(analyzed),
+                "reused": len(set(ids) - analyzed),
+            },
+        }
+
+    def get(self, owner: str, doc_id: str, language: str = "en") -> Optional[Dict]:
+        """The latest version of `doc_id` with its stored per-clause results."""
+        latest = self.store.latest(owner, doc_id)
+        if latest is None:
+            return None
+        ids = latest["clause_ids"]
+        texts = self.store.clause_texts(ids)
+        risks = self.store.results(ids, self._kind("risk", self.risk_version))
+        simplified = self.store.results(ids, self._kind("simplify", self.model_version, language))
+        clauses = []
+        for index, cid in enumerate(ids):
+            item = {"index": index, "id": cid, "text": texts.get(cid, ""),
+                    "risks": [{**r, "clause_id": cid} for r in risks.get(cid, [])]}
+            if cid in simplified:
+                item["simplified"] = simplified[cid]
+            clauses.append(item)
+        return {"id": doc_id, "version": latest["version"], "created_at": latest["created_at"], "clauses": clauses}
@@ -12,6 +12,15 @@ class AuthError(Exception):
         self.error_code = error_code
 
 
+def check_api_key(hdr, expected_key=None):
+    """Raise AuthError unless `hdr` matches the configured API key."""
+    exp = expected_key or os.getenv("API_KEY", "secret123")
+    if not hdr:
+        raise AuthError("Missing API key", status_code=401, error_code="E401_MISSING_API_KEY")
+    if hdr != exp:
+        raise AuthError("Invalid API key", status_code=401, error_code="E401_INVALID_API_KEY")
+
+
 def require_api_key(func_or_key=None):
     """
     Flexible API-key check decorator.
@@ -25,11 +34,7 @@ def require_api_key(func_or_key=None):
         except Exception:
             # fallback to global request
             hdr = flask_request.headers.get("X-API-Key")
-        exp = expected_key or os.getenv("API_KEY", "secret123")
-        if not hdr:
-            raise AuthError("Missing API key", status_code=401, error_code="E401_MISSING_API_KEY")
-        if hdr != exp:
-            raise AuthError("Invalid API key", status_code=401, error_code="E401_INVALID_API_KEY")
+        check_api_key(hdr, expected_key)
 
     def decorator(func, expected_key=None):
         @wraps(func)
@@ -1,21 +1,54 @@
 # utils/sse.py
+"""Server-Sent Events: framing, coalescing and resumable streams.
+
+Generation and delivery are decoupled. A producer (a thread for Flask, a
+task for ASGI) appends model tokens to a `Stream`, which numbers them and
+keeps the most recent ones in a bounded replay buffer. Each connected
+client reads the stream through its own subscriber, which coalesces tokens
+into frames (flushed by size or age, the first one immediately), sends a
+comment heartbeat when the connection would otherwise be idle, and tags
+every frame with `<stream id>:<last token number>`. A client that
+reconnects with that value as `Last-Event-ID` gets the tokens after it
+from the buffer, then follows the live stream; generation is not
+restarted. A subscriber that falls so far behind that tokens it has not
+read were evicted gets an `error` event and is closed, rather than
+silently skipping them. A stream nobody has been reading for `grace`
+seconds is abandoned, which cancels generation.
+"""
+import asyncio
+import contextvars
 import json
-from typing import Generator, Union
+import threading
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Generator, Iterator, List, Optional, Tuple, Union
+
+HEARTBEAT = ": keep-alive\n\n"
+
+
+def _field(value: str) -> str:
+    # id/event values end at the first line break and may not contain NUL.
+    return str(value).replace("\0", "").replace("\r", " ").replace("\n", " ")
+
 
 def sse_event(data: Union[str, dict], event: str = "message", event_id: str = None) -> str:
     """
-    Format a single Server-Sent Event (SSE) message.
+    Format a single Server-Sent Event (SSE) message. Every line of the
+    payload becomes its own `data:` line, so clients rebuild it exactly,
+    including empty lines and a trailing newline.
     """
     payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
     lines = []
     if event_id:
-        lines.append(f"id: {event_id}")
+        lines.append(f"id: {_field(event_id)}")
     if event:
-        lines.append(f"event: {event}")
-    for line in str(payload).splitlines():
+        lines.append(f"event: {_field(event)}")
+    for line in payload.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
         lines.append(f"data: {line}")
     return "\n".join(lines) + "\n\n"
 
+
 def sse_from_text_stream(gen: Generator[str, None, None], event: str = "chunk") -> Generator[str, None, None]:
     """
     Wrap a generator[str] of text chunks into SSE frames.
@@ -23,3 +56,322 @@ def sse_from_text_stream(gen: Generator[str, None, None], event: str = "chunk")
     for chunk in gen:
         yield sse_event(chunk, event=event)
     yield sse_event("", event="done")
+
+
+def event_id(stream_id: str, seq: int) -> str:
+    return f"{stream_id}:{seq}"
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(stream id, token number) from a Last-Event-ID value, or None if it is not one of ours."""
+    if not value or ":" not in value:
+        return None
+    stream_id, _, seq = value.strip().rpartition(":")
+    try:
+        seq = int(seq)
+    except ValueError:
+        return None
+    return (stream_id, seq) if stream_id and seq >= 0 else None
+
+
+class Stream:
+    """Numbered tokens of one generation, with a bounded replay buffer."""
+
+    def __init__(self, stream_id: str, owner: Optional[str] = None, replay_bytes: int = 256 * 1024):
+        self.id = stream_id
+        self.owner = owner
+        self.replay_bytes = replay_bytes
+        self.outcome: Optional[Tuple[str, str]] = None  # ("done", data) or ("error", message)
+        self.cancelled = False
+        self.subscribers = 0
+        self.detached_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._tokens: deque = deque()  # (seq, text, size)
+        self._bytes = 0
+        self._seq = 0
+        self._evicted = 0  # highest token number no longer in the buffer
+        self._async_waiters: set = set()
+
+    def append(self, text: str):
+        if not text:
+            return
+        size = len(text.encode("utf-8"))
+        with self._cond:
+            self._seq += 1
+            self._tokens.append((self._seq, text, size))
+            self._bytes += size
+            while self._bytes > self.replay_bytes and len(self._tokens) > 1:
+                seq, _, dropped = self._tokens.popleft()
+                self._bytes -= dropped
+                self._evicted = seq
+            self._notify()
+
+    def finish(self, error: Optional[str] = None):
+        with self._cond:
+            self.outcome = ("error", error) if error is not None else ("done", "{}")
+            self.finished_at = time.monotonic()
+            self._notify()
+
+    def _notify(self):
+        # Called with the lock held.
+        self._cond.notify_all()
+        for loop, event in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # loop already closed
+                self._async_waiters.discard((loop, event))
+
+    def can_resume(self, after: int) -> bool:
+        """Whether every token after `after` is still in the replay buffer."""
+        with self._cond:
+            return self._evicted <= after <= self._seq
+
+    def read(self, after: int) -> Tuple[List[Tuple[int, str]], Optional[Tuple[str, str]]]:
+        """
+        Tokens numbered above `after`, and the outcome if generation has
+        ended. If some of those tokens were already evicted, no tokens and
+        an ("error", ...) outcome.
+        """
+        with self._cond:
+            return self._read(after)
+
+    def _read(self, after: int):
+        if after < self._evicted:
+            return [], ("error", f"Tokens {after + 1}-{self._evicted} were dropped from the replay buffer.")
+        if after >= self._seq:
+            return [], self.outcome
+        start = max(0, len(self._tokens) - (self._seq - after))
+        return [(seq, text) for seq, text, _ in list(self._tokens)[start:]], self.outcome
+
+    def wait(self, after: int, timeout: Optional[float]):
+        """read(), blocking up to `timeout` seconds until there is something new."""
+        with self._cond:
+            tokens, outcome = self._read(after)
+            if not tokens and outcome is None and (timeout is None or timeout > 0):
+                self._cond.wait(timeout)
+                tokens, outcome = self._read(after)
+            return tokens, outcome
+
+    async def wait_async(self, after: int, timeout: Optional[float]):
+        """wait() on the event loop instead of a thread."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._cond:
+            tokens, outcome = self._read(after)
+            if tokens or outcome is not None or (timeout is not None and timeout <= 0):
+                return tokens, outcome
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+        return self.read(after)
+
+    def attach(self):
+        with self._cond:
+            self.subscribers += 1
+
+    def detach(self):
+        with self._cond:
+            self.subscribers -= 1
+            self.detached_at = time.monotonic()
+
+    def abandoned(self, grace: float) -> bool:
+        """No client has been reading for more than `grace` seconds."""
+        with self._cond:
+            return self.subscribers == 0 and time.monotonic() - self.detached_at > grace
+
+
+class Subscriber:
+    """
+    One client's view of a Stream: turns tokens into coalesced SSE frames.
+    Drive it with `timeout()` (how long to wait for tokens) and `feed()`.
+    """
+
+    def __init__(self, stream: Stream, after: int = 0, max_bytes: int = 512, max_delay: float = 0.05,
+                 heartbeat: float = 15.0, clock: Callable[[], float] = time.monotonic):
+        self.stream = stream
+        self.cursor = after
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.closed = False
+        self._pending: List[str] = []
+        self._size = 0
+        self._since: Optional[float] = None
+        self._flushed = 0
+        self._last_write = clock()
+
+    def timeout(self) -> float:
+        now = self.clock()
+        wait = self.heartbeat - (now - self._last_write)
+        if self._pending:
+            wait = min(wait, self.max_delay - (now - self._since))
+        return max(0.0, wait)
+
+    def feed(self, tokens: List[Tuple[int, str]], outcome: Optional[Tuple[str, str]]) -> List[str]:
+        """Frames to send after reading `tokens` (and `outcome`, once generation ended)."""
+        frames = []
+        for seq, text in tokens:
+            if not self._pending:
+                self._since = self.clock()
+            self._pending.append(text)
+            self._size += len(text)
+            self.cursor = seq
+        now = self.clock()
+        if self._pending and (outcome is not None or self._flushed == 0 or self._size >= self.max_bytes
+                              or now - self._since >= self.max_delay):
+            frames.append(sse_event("".join(self._pending), event="chunk",
+                                    event_id=event_id(self.stream.id, self.cursor)))
+            self._pending, self._size, self._since = [], 0, None
+            self._flushed += 1
+        if outcome is not None:
+            frames.append(sse_event(outcome[1], event=outcome[0], event_id=event_id(self.stream.id, self.cursor)))
+            self.closed = True
+        elif not frames and now - self._last_write >= self.heartbeat:
+            frames.append(HEARTBEAT)
+        if frames:
+            self._last_write = now
+        return frames
+
+
+class StreamRegistry:
+    """The live (and recently finished) streams of this process, by id."""
+
+    def __init__(self, replay_bytes: int = 256 * 1024, retain: float = 120.0, max_streams: int = 1000,
+                 grace: float = 10.0, coalesce_bytes: int = 512, coalesce_delay: float = 0.05,
+                 heartbeat: float = 15.0):
+        self.replay_bytes = replay_bytes
+        self.retain = retain
+        self.max_streams = max_streams
+        self.grace = grace
+        self.coalesce_bytes = coalesce_bytes
+        self.coalesce_delay = coalesce_delay
+        self.heartbeat = heartbeat
+        self._streams: Dict[str, Stream] = {}
+        self._lock = threading.Lock()
+
+    def create(self, owner: Optional[str] = None) -> Stream:
+        stream = Stream(uuid.uuid4().hex, owner=owner, replay_bytes=self.replay_bytes)
+        with self._lock:
+            self._prune()
+            self._streams[stream.id] = stream
+        return stream
+
+    def get(self, stream_id: str) -> Optional[Stream]:
+        with self._lock:
+            self._prune()
+            return self._streams.get(stream_id)
+
+    def resumable(self, last_event_id: Optional[str], owner: Optional[str] = None) -> Optional[Tuple[Stream, int]]:
+        """(stream, after) for a Last-Event-ID that can be resumed by `owner`, else None."""
+        parsed = parse_event_id(last_event_id)
+        if parsed is None:
+            return None
+        stream = self.get(parsed[0])
+        if stream is None or stream.owner != owner or not stream.can_resume(parsed[1]):
+            return None
+        return stream, parsed[1]
+
+    def _prune(self):
+        # Called with the lock held: forget finished streams past `retain`,
+        # then the oldest finished ones while over `max_streams`.
+        now = time.monotonic()
+        for stream_id, stream in list(self._streams.items()):
+            if stream.finished_at is not None and now - stream.finished_at > self.retain:
+                del self._streams[stream_id]
+        if len(self._streams) >= self.max_streams:
+            finished = sorted((s.finished_at, s.id) for s in self._streams.values() if s.finished_at is not None)
+            for _, stream_id in finished[:len(self._streams) - self.max_streams + 1]:
+                del self._streams[stream_id]
+
+    def _subscriber(self, stream: Stream, after: int) -> Subscriber:
+        return Subscriber(stream, after, max_bytes=self.coalesce_bytes, max_delay=self.coalesce_delay,
+                          heartbeat=self.heartbeat)
+
+    def subscribe(self, stream: Stream, after: int = 0) -> Iterator[str]:
+        """SSE frames of `stream` after token `after`, until it ends (blocking iterator)."""
+        sub = self._subscriber(stream, after)
+        stream.attach()
+        try:
+            while not sub.closed:
+                yield from sub.feed(*stream.wait(sub.cursor, sub.timeout()))
+        finally:
+            stream.detach()
+
+    async def subscribe_async(self, stream: Stream, after: int = 0) -> AsyncIterator[str]:
+        sub = self._subscriber(stream, after)
+        stream.attach()
+        try:
+            while not sub.closed:
+                for frame in sub.feed(*await stream.wait_async(sub.cursor, sub.timeout())):
+                    yield frame
+        finally:
+            stream.detach()
+
+    def pump(self, stream: Stream, chunks: Iterator[str], on_first: Optional[Callable[[], None]] = None,
+             on_end: Optional[Callable[[str, Optional[str], bool], None]] = None) -> threading.Thread:
+        """
+        Feed `chunks` into `stream` on a background thread (carrying the
+        caller's context, so stage timings still land on the request).
+        `on_end(output, error, cancelled)` runs before the stream is marked
+        finished, so a client that saw the last frame sees its effects.
+        """
+        def run():
+            produced, error = [], None
+            try:
+                for chunk in chunks:
+                    if not produced and on_first is not None:
+                        on_first()
+                    produced.append(chunk)
+                    stream.append(chunk)
+                    if stream.abandoned(self.grace):
+                        stream.cancelled = True
+                        break
+            except Exception as e:
+                error = str(e)
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+                self._end(stream, "".join(produced), error, on_end)
+
+        ctx = contextvars.copy_context()
+        thread = threading.Thread(target=ctx.run, args=(run,), name=f"sse-{stream.id[:8]}", daemon=True)
+        thread.start()
+        return thread
+
+    def pump_async(self, stream: Stream, chunks: AsyncIterator[str], on_first: Optional[Callable[[], None]] = None,
+                   on_end: Optional[Callable[[str, Optional[str], bool], None]] = None) -> "asyncio.Task":
+        """pump() for an async iterator, as a task on the running loop."""
+        async def run():
+            produced, error = [], None
+            try:
+                async for chunk in chunks:
+                    if not produced and on_first is not None:
+                        on_first()
+                    produced.append(chunk)
+                    stream.append(chunk)
+                    if stream.abandoned(self.grace):
+                        stream.cancelled = True
+                        break
+            except Exception as e:
+                error = str(e)
+            finally:
+                await chunks.aclose()
+                self._end(stream, "".join(produced), error, on_end)
+
+        return asyncio.ensure_future(run())
+
+    @staticmethod
+    def _end(stream: Stream, output: str, error: Optional[str], on_end):
+        try:
+            if on_end is not None:
+                on_end(output, error, stream.cancelled)
+        finally:
+            stream.finish("cancelled" if stream.cancelled and error is None else error)
@@ -0,0 +1,107 @@
+"""Upload buffering for ingest.
+
+Werkzeug spools every multipart file to a SpooledTemporaryFile; the ingest
+routes used to copy that into a second temp file before extracting. Here
+small uploads stay in a BytesIO and are extracted from memory, larger ones
+are written to one anonymous temp file and read back through mmap.
+The SHA-256 of each upload is computed as werkzeug writes it, for the
+extraction cache.
+"""
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+from flask import Request
+
+MEMORY_UPLOAD_BYTES = int(os.getenv("INGEST_MEMORY_BYTES", 1024 * 1024))
+
+
+class HashingBuffer:
+    """Upload buffer that hashes bytes as they are written; everything else is delegated."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= MEMORY_UPLOAD_BYTES:
+            return HashingBuffer(io.BytesIO())
+        return HashingBuffer(tempfile.TemporaryFile("w+b"))
+
+
+def upload_digest(stream) -> str:
+    """SHA-256 of an uploaded file; free for HashingBuffer uploads, one read pass otherwise."""
+    if isinstance(stream, HashingBuffer):
+        return stream.sha256.hexdigest()
+    h = hashlib.sha256()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(1 << 16), b""):
+        h.update(block)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+class MappedFile(io.RawIOBase):
+    """Read-only file object over an mmap (mmap itself lacks readable()/seekable())."""
+
+    def __init__(self, view: mmap.mmap):
+        super().__init__()
+        self._view = view
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._view.read() if size is None or size < 0 else self._view.read(size)
+
+    def readall(self):
+        return self._view.read()
+
+    def readinto(self, b):
+        data = self._view.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        self._view.seek(pos, whence)
+        return self._view.tell()
+
+    def tell(self):
+        return self._view.tell()
+
+
+@contextmanager
+def upload_source(stream):
+    """Seekable, read-only view of an uploaded file's bytes."""
+    stream.seek(0)
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield stream
+        return
+    if os.fstat(fileno).st_size == 0:
+        yield stream
+        return
+    view = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    try:
+        yield MappedFile(view)
+    finally:
+        view.close()
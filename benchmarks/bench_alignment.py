@@ -0,0 +1,53 @@
+"""Clause alignment latency for an N x N contract-vs-template comparison.
+
+    python -m benchmarks.bench_alignment --clauses 1000
+
+Vectors are random unit embeddings (384 dims, like all-MiniLM-L6-v2); the
+contract is the template with some clauses reworded, dropped, added and
+moved, so every alignment pass has work to do. Embedding time is excluded:
+in the endpoint, template vectors come from the cache after the first call.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.models.alignment import align, normalize_rows
+
+
+def documents(n: int, dim: int = 384, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    template = normalize_rows(rng.standard_normal((n, dim)))
+    contract = template.copy()
+    reworded = rng.choice(n, n // 10, replace=False)
+    contract[reworded] = normalize_rows(contract[reworded] + 0.6 * normalize_rows(rng.standard_normal((len(reworded), dim))))
+    keep = np.ones(n, dtype=bool)
+    keep[rng.choice(n, n // 20, replace=False)] = False
+    contract = np.concatenate([contract[keep], normalize_rows(rng.standard_normal((n - keep.sum(), dim)))])
+    moved = rng.choice(len(contract), 10, replace=False)
+    order = [i for i in range(len(contract)) if i not in set(moved.tolist())]
+    for i in moved.tolist():
+        order.insert(int(rng.integers(len(order))), i)
+    return template, contract[order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clauses", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    template, contract = documents(args.clauses)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        sim = template @ contract.T
+        result = align(sim)
+        timings.append(time.perf_counter() - start)
+    print(f"{args.clauses}x{args.clauses} clauses: best {min(timings) * 1000:.1f} ms, "
+          f"median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms; "
+          f"{len(result['pairs'])} aligned, {len(result['moved'])} moved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Clause complexity scoring speed, and how much selective simplify sends to the model.
+
+    python -m benchmarks.bench_complexity --clauses 20000 --threshold 0.35
+
+Scoring is timed over a synthetic mix of plain and legalese clauses. The
+routing report runs over the text files in samples/ (or --corpus DIR): the
+share of clauses and estimated tokens that would still go to the model.
+"""
+import argparse
+import glob
+import os
+import time
+
+from app.models.complexity import complexity_scores, split_sentences
+from app.utils.fair_scheduler import count_tokens
+
+CLAUSES = [
+    "This Agreement is governed by the laws of England.",
+    "Fees are due monthly.",
+    "Notwithstanding anything to the contrary herein, the Supplier shall indemnify and hold harmless the "
+    "Customer from and against any and all losses arising out of any breach hereof.",
+    "Either party may terminate this agreement on thirty days written notice.",
+    "The Receiving Party shall not, without the prior written consent of the Disclosing Party, disclose any "
+    "Confidential Information to any third party save as expressly permitted hereunder.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clauses", type=int, default=20000)
+    parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--corpus", default="samples")
+    args = parser.parse_args()
+
+    clauses = [f"{CLAUSES[i % len(CLAUSES)]} ({i})" for i in range(args.clauses)]
+    start = time.perf_counter()
+    complexity_scores(clauses)
+    elapsed = time.perf_counter() - start
+    print(f"scored {len(clauses)} clauses in {elapsed * 1000:.1f} ms ({len(clauses) / elapsed:,.0f} clauses/s)")
+
+    total = sent = tokens = sent_tokens = 0
+    for path in sorted(glob.glob(os.path.join(args.corpus, "*.txt"))):
+        with open(path, encoding="utf-8") as fh:
+            doc = split_sentences(fh.read())
+        hard = complexity_scores(doc) >= args.threshold
+        total += len(doc)
+        sent += int(hard.sum())
+        tokens += sum(count_tokens(c) for c in doc)
+        sent_tokens += sum(count_tokens(c) for c, h in zip(doc, hard) if h)
+    if total:
+        print(f"corpus {args.corpus}: {sent}/{total} clauses ({sent / total:.0%}) and "
+              f"{sent_tokens}/{tokens} input tokens ({sent_tokens / max(tokens, 1):.0%}) sent to the model "
+              f"at threshold {args.threshold}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""python-docx vs. streaming zip/iterparse DOCX extraction on a generated large contract.
+
+    python -m benchmarks.bench_docx_extract --paragraphs 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.utils.extract import extract_docx
+from tests.docx_samples import make_docx, para, table
+
+LINE = "The Supplier shall indemnify the Customer against all losses arising from clause {n}."
+
+
+def build(paragraphs: int, table_every: int) -> bytes:
+    blocks = []
+    for n in range(paragraphs):
+        blocks.append(para(LINE.format(n=n)))
+        if table_every and n % table_every == table_every - 1:
+            blocks.append(table([["Fee", f"{n} EUR"], ["Liability cap", "12 months of fees"]]))
+    return make_docx(blocks, headers=["Confidential"], footnotes=["Fees exclude VAT."])
+
+
+def python_docx(path: str) -> str:
+    import docx
+    return "\n".join(p.text for p in docx.Document(path).paragraphs)
+
+
+def measure(fn, path: str):
+    start = time.perf_counter()
+    text = fn(path)
+    elapsed = time.perf_counter() - start
+    # Peak memory in a second run: tracing allocations slows both extractors down.
+    tracemalloc.start()
+    fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--table-every", type=int, default=50, help="insert a fee table every N paragraphs (0 = none)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.docx")
+        with open(path, "wb") as f:
+            f.write(build(args.paragraphs, args.table_every))
+        print(f"{args.paragraphs} paragraphs, {os.path.getsize(path) / 1e6:.1f} MB zipped")
+
+        results = [("python-docx", *measure(python_docx, path)), ("streaming", *measure(extract_docx, path))]
+        base = results[0][1]
+        for name, elapsed, peak, text in results:
+            print(f"{name:<12} {elapsed:7.2f}s  peak {peak / 1e6:7.1f} MB  {len(text) / 1e6:5.1f} MB text"
+                  f"  ({base / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Sentence-embedding throughput, RSS and agreement: PyTorch vs. int8 ONNX backend.
+
+Export the quantized model once, then compare:
+
+    python -m app.models.embeddings --out models/all-MiniLM-L6-v2-int8
+    python -m benchmarks.bench_embeddings --sentences 2000 --threads 4
+
+Each backend runs in its own process, so peak RSS covers only that backend.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+CLAUSES = [
+    "The Supplier shall indemnify the Customer against all losses arising from any breach.",
+    "This Agreement renews automatically for successive one-year terms.",
+    "Either party may terminate for convenience on thirty days notice.",
+    "Liability is limited to the fees paid in the twelve months before the claim.",
+    "Payment is due within thirty days of invoice",
+    "Confidential information excludes information that is publicly available",
+]
+
+
+def sentences(n: int):
+    # Vary lengths the way real clauses do, so padding matters.
+    return [" ".join([CLAUSES[i % len(CLAUSES)]] * (1 + i % 4)) + f" ({i})" for i in range(n)]
+
+
+def child(backend: str, n: int, out: str):
+    os.environ["EMBEDDING_BACKEND"] = backend
+    from app.models.embeddings import Embedder
+
+    embedder = Embedder()
+    if backend == "onnx" and embedder.encoder is None:
+        sys.exit("ONNX backend unavailable: install onnxruntime + tokenizers and export the model first")
+    if backend == "torch" and embedder.model is None:
+        sys.exit("sentence-transformers model unavailable")
+    texts = sentences(n)
+    embedder.embed(texts[:32])  # warm up
+    start = time.perf_counter()
+    vectors = np.asarray(embedder.embed(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    np.save(out, vectors)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.6f} {rss_mb:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="EMBEDDING_THREADS for onnx")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.sentences, args.child[1])
+        return
+
+    env = dict(os.environ, EMBEDDING_THREADS=str(args.threads), EMBEDDING_BATCH_SIZE=str(args.batch_size))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ("torch", "onnx"):
+            out = os.path.join(tmp, f"{backend}.npy")
+            proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_embeddings", "--sentences",
+                                   str(args.sentences), "--child", backend, out],
+                                  env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{backend:<6} skipped: {(proc.stderr or proc.stdout).strip().splitlines()[-1]}")
+                continue
+            elapsed, rss = map(float, proc.stdout.split()[-2:])
+            results[backend] = np.load(out)
+            print(f"{backend:<6} {args.sentences / elapsed:9.1f} sentences/s   peak RSS {rss:7.1f} MB")
+
+    if len(results) == 2:
+        a, b = results["torch"], results["onnx"]
+        cos = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+        print(f"cosine(torch, onnx): mean {cos.mean():.4f}  min {cos.min():.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Serial vs. process-pool PDF extraction on a generated multi-hundred-page PDF.
+
+    python -m benchmarks.bench_pdf_extract --pages 400 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.utils.extract import extract_stream
+from tests.pdf_samples import make_pdf
+
+LINE = "The Supplier shall indemnify the Customer against all losses arising from clause {n}."
+
+
+def build(pages: int, lines_per_page: int) -> bytes:
+    return make_pdf(["\n".join(LINE.format(n=p * 100 + i) for i in range(lines_per_page)) for p in range(pages)])
+
+
+def timed(path: str, workers: int, layout: str):
+    start = time.perf_counter()
+    text = extract_stream(path, ".pdf", workers=workers, layout=layout)
+    return time.perf_counter() - start, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=45, help="text lines per page")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--layout", default="full", choices=["full", "fast", "none"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdf")
+        with open(path, "wb") as f:
+            f.write(build(args.pages, args.lines))
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB, layout={args.layout}")
+
+        serial, expected = timed(path, 0, args.layout)
+        print(f"serial            {serial:7.2f}s  {args.pages / serial:7.1f} pages/s")
+        timed(path, args.workers, args.layout)  # start the pool outside the measurement
+        parallel, text = timed(path, args.workers, args.layout)
+        assert text == expected, "parallel output differs from serial"
+        print(f"parallel x{args.workers:<3}     {parallel:7.2f}s  {args.pages / parallel:7.1f} pages/s"
+              f"  ({serial / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Worker startup cost: import time, create_app() time and peak RSS per mode.
+
+    python -m benchmarks.bench_startup --modes fast_test external --max-seconds 1
+
+Each mode starts a fresh interpreter (cold module cache, like a new worker),
+imports app.app and builds the app. The report also lists which heavy
+optional libraries were imported; FAST_TEST and external-LLM workers should
+import none of them. --max-seconds / --max-rss-mb make the run exit
+non-zero on a regression.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HEAVY = ("torch", "transformers", "sentence_transformers", "onnxruntime", "tokenizers", "pdfminer", "docx")
+
+MODES = {
+    "fast_test": {"FAST_TEST": "1"},
+    "external": {"FAST_TEST": "0", "EXTERNAL_LLM_API_URL": "http://127.0.0.1:9/v1/generate"},
+    "local": {"FAST_TEST": "0", "EXTERNAL_LLM_API_URL": ""},
+}
+
+# Runs in the child. The meta-path probe records import attempts, so a heavy
+# library counts even where it is not installed.
+PROBE = """
+import json, resource, sys, time
+
+class Probe:
+    def find_spec(self, name, path=None, target=None):
+        top = name.partition(".")[0]
+        if top in HEAVY and top not in attempted:
+            attempted.append(top)
+        return None
+
+HEAVY, attempted = set(sys.argv[1].split(",")), []
+sys.meta_path.insert(0, Probe())
+start = time.perf_counter()
+import app.app
+imported = time.perf_counter()
+error = None
+try:
+    app.app.create_app()
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+done = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "create_app_s": done - imported, "total_s": done - start,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "heavy": attempted, "error": error}))
+"""
+
+
+def measure(mode: str, data_dir: str = None) -> dict:
+    """Startup figures for one mode, measured in a fresh interpreter."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATA_DIR=data_dir or tmp, API_KEY=os.getenv("API_KEY", "bench"), **MODES[mode])
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (root, env.get("PYTHONPATH")) if p)
+        out = subprocess.run([sys.executable, "-c", PROBE, ",".join(HEAVY)], env=env, cwd=root,
+                             capture_output=True, text=True, timeout=600)
+    if out.returncode != 0:
+        raise RuntimeError(f"{mode}: startup probe failed:\n{out.stderr}")
+    return {"mode": mode, **json.loads(out.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["fast_test", "external", "local"])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode; the fastest is reported")
+    parser.add_argument("--max-seconds", type=float, help="fail if fast_test/external startup exceeds this")
+    parser.add_argument("--max-rss-mb", type=float, help="fail if fast_test/external peak RSS exceeds this")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results, failures = [], []
+    for mode in args.modes:
+        r = min((measure(mode) for _ in range(max(1, args.repeat))), key=lambda r: r["total_s"])
+        results.append(r)
+        print(f"{mode:>9}: import {r['import_s'] * 1000:6.0f} ms  create_app {r['create_app_s'] * 1000:6.0f} ms  "
+              f"rss {r['rss_mb']:6.1f} MB  heavy imports: {', '.join(r['heavy']) or 'none'}"
+              + (f"  ({r['error']})" if r["error"] else ""))
+        if mode == "local":
+            continue
+        if r["heavy"]:
+            failures.append(f"{mode} imported {', '.join(r['heavy'])}")
+        if args.max_seconds is not None and r["total_s"] > args.max_seconds:
+            failures.append(f"{mode} took {r['total_s']:.2f}s > {args.max_seconds}s")
+        if args.max_rss_mb is not None and r["rss_mb"] > args.max_rss_mb:
+            failures.append(f"{mode} used {r['rss_mb']:.0f} MB > {args.max_rss_mb} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if failures:
+        sys.exit("startup regression: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
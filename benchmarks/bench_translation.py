@@ -0,0 +1,60 @@
+"""Segmented translation: splitting/detection speed and padding saved by length buckets.
+
+    python -m benchmarks.bench_translation --batch-size 8
+
+Runs over the text files in samples/ (or --corpus DIR). Padding is counted
+in estimated tokens: a padded batch costs batch size x its longest segment,
+compared for segments in document order and sorted by length (what
+ModelManager._generate_batch does).
+"""
+import argparse
+import glob
+import os
+import time
+
+from app.models.translation import detect_language, split_segments
+from app.utils.fair_scheduler import count_tokens
+
+
+def padded_tokens(lengths, batch_size):
+    return sum(len(chunk) * max(chunk) for chunk in
+               (lengths[i:i + batch_size] for i in range(0, len(lengths), batch_size)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--corpus", default="samples")
+    args = parser.parse_args()
+
+    docs = []
+    for path in sorted(glob.glob(os.path.join(args.corpus, "*.txt"))):
+        with open(path, encoding="utf-8") as fh:
+            docs.append(fh.read())
+    if not docs:
+        raise SystemExit(f"no .txt files in {args.corpus}")
+
+    start = time.perf_counter()
+    split = [split_segments(doc) for doc in docs]
+    split_ms = (time.perf_counter() - start) * 1000
+    segments = [s for doc_segments, _, _ in split for s in doc_segments]
+    print(f"split {len(docs)} documents into {len(segments)} segments in {split_ms:.1f} ms")
+
+    start = time.perf_counter()
+    paragraphs = 0
+    for doc_segments, _, owners in split:
+        for p in sorted(set(owners)):
+            detect_language(" ".join(s for s, o in zip(doc_segments, owners) if o == p))
+            paragraphs += 1
+    print(f"language detection: {paragraphs} paragraphs in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    lengths = [count_tokens(s) for s in segments]
+    real = sum(lengths)
+    in_order = padded_tokens(lengths, args.batch_size)
+    bucketed = padded_tokens(sorted(lengths), args.batch_size)
+    print(f"padded tokens at batch size {args.batch_size}: {in_order} in document order, {bucketed} length-sorted "
+          f"({real} real; padding {in_order - real} -> {bucketed - real})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Load test: the API under gunicorn, backed by the stub LLM, at a fixed concurrency.
+
+Starts benchmarks.stub_llm and the app (gunicorn -c app/gunicorn_conf.py)
+on free local ports with EXTERNAL_LLM_API_URL pointing at the stub, then
+drives each scenario for --duration seconds and reports throughput,
+latency percentiles, time to first token and errors. Runs offline.
+
+    python -m benchmarks.loadtest --concurrency 16 --duration 20 --llm-latency 0.3 --token-rate 40
+    python -m benchmarks.loadtest --target http://127.0.0.1:8080 --scenarios stream   # an already running server
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "loadtest"
+SCENARIOS = ("simplify", "full-analysis", "ingest", "stream")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 60.0, proc=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with {proc.returncode}")
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def load_samples():
+    texts = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "samples", "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts or ["The tenant shall indemnify the landlord. This agreement renews automatically."]
+
+
+# --- scenarios: each returns (ok, status, ttft seconds or None) ---
+def run_simplify(session, base, text):
+    res = session.post(f"{base}/api/simplify", json={"text": text[:2000]}, headers={"X-API-Key": API_KEY}, timeout=120)
+    return res.status_code == 200, res.status_code, None
+
+
+def run_full_analysis(session, base, text):
+    # A unique line per request, so the stored-results index cannot answer it without running the analysis.
+    res = session.post(f"{base}/api/full-analysis", json={"text": f"{text[:2000]}\n{uuid.uuid4().hex}"},
+                       headers={"X-API-Key": API_KEY}, timeout=120)
+    if res.status_code != 200:
+        return False, res.status_code, None
+    # Model failures come back inside a 200 as {"error": true, ...} results.
+    result = res.json()["result"]
+    if result["simplified"].get("error") or result["summary"].get("error"):
+        return False, "model_error", None
+    return True, 200, None
+
+
+def run_ingest(session, base, text):
+    # A unique line per upload, so every request extracts instead of hitting the extraction cache.
+    data = f"{text}\n{uuid.uuid4().hex}".encode("utf-8")
+    res = session.post(f"{base}/gofr/ingest", files={"file": ("contract.txt", data, "text/plain")}, timeout=120)
+    return res.status_code == 200, res.status_code, None
+
+
+def run_stream(session, base, text):
+    started = time.perf_counter()
+    ttft = None
+    ok = True
+    with session.post(f"{base}/api/v1/inference", headers={"X-API-Key": API_KEY}, stream=True, timeout=120,
+                      json={"task": "simplify", "text": text[:2000], "stream": True}) as res:
+        if res.status_code != 200:
+            return False, res.status_code, None
+        for line in res.iter_lines():
+            if line.startswith(b"event: chunk") and ttft is None:
+                ttft = time.perf_counter() - started
+            elif line.startswith(b"event: error") or line.startswith(b"data: Error:"):
+                ok = False  # model failures are streamed as an "Error: ..." chunk
+    return ok, 200 if ok else "stream_error", ttft
+
+
+RUNNERS = {"simplify": run_simplify, "full-analysis": run_full_analysis, "ingest": run_ingest, "stream": run_stream}
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100.0 * len(ordered)) - 1))]  # nearest rank
+
+
+def drive(scenario, base, concurrency, duration, samples):
+    """Run `scenario` from `concurrency` threads for `duration` seconds."""
+    runner = RUNNERS[scenario]
+    latencies, ttfts, errors = [], [], {}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(n):
+        session = requests.Session()
+        i = n
+        while time.perf_counter() < stop_at:
+            text = samples[i % len(samples)]
+            i += concurrency
+            started = time.perf_counter()
+            try:
+                ok, status, ttft = runner(session, base, text)
+            except requests.RequestException as e:
+                ok, status, ttft = False, type(e).__name__, None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+    ms = lambda v: round(v * 1000, 1) if v is not None else None
+    return {
+        "scenario": scenario,
+        "requests": len(latencies) + sum(errors.values()),
+        "ok": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2),
+        "latency_ms": {f"p{p}": ms(percentile(latencies, p)) for p in (50, 90, 99)},
+        "latency_max_ms": ms(max(latencies) if latencies else None),
+        "ttft_ms": {f"p{p}": ms(percentile(ttfts, p)) for p in (50, 90, 99)} if ttfts else None,
+    }
+
+
+def print_report(results):
+    header = f"{'scenario':<14}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'ttft50':>9}{'ttft99':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        lat, ttft = r["latency_ms"], r["ttft_ms"] or {}
+        cell = lambda v: f"{v:>9.1f}" if v is not None else f"{'-':>9}"
+        print(f"{r['scenario']:<14}{r['requests']:>7}{sum(r['errors'].values()):>6}{r['rps']:>9.1f}"
+              f"{cell(lat['p50'])}{cell(lat['p90'])}{cell(lat['p99'])}{cell(ttft.get('p50'))}{cell(ttft.get('p99'))}")
+        if r["errors"]:
+            print(f"{'':<14}errors: {r['errors']}")
+    print("latencies in ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unreported traffic per scenario")
+    parser.add_argument("--target", help="base URL of a running server (skips starting gunicorn)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, help="gunicorn threads per worker (default: --concurrency)")
+    parser.add_argument("--format", choices=["simple", "openai"], default="simple", help="stub LLM API format")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-rate", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server environment")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    procs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            stub_port = free_port()
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.stub_llm", "--port", str(stub_port),
+                 "--latency", str(args.llm_latency), "--token-rate", str(args.token_rate),
+                 "--tokens", str(args.tokens), "--error-rate", str(args.error_rate)],
+                cwd=ROOT, stdout=subprocess.DEVNULL))
+            stub_url = f"http://127.0.0.1:{stub_port}"
+            wait_until_up(stub_url, proc=procs[-1])
+
+            base = args.target
+            if base is None:
+                port = free_port()
+                env = dict(
+                    os.environ,
+                    EXTERNAL_LLM_API_URL=stub_url + ("/v1/chat/completions" if args.format == "openai" else "/generate"),
+                    EXTERNAL_LLM_FORMAT=args.format,
+                    API_KEY=API_KEY,
+                    RATE_LIMIT_PER_MIN=str(10 ** 9),
+                    DATA_DIR=tmp,
+                    PROMETHEUS_MULTIPROC_DIR=os.path.join(tmp, "prometheus"),
+                    GUNICORN_BIND=f"127.0.0.1:{port}",
+                    GUNICORN_WORKERS=str(args.workers),
+                    GUNICORN_THREADS=str(args.threads or args.concurrency),
+                    HF_HUB_OFFLINE="1",
+                    TRANSFORMERS_OFFLINE="1",
+                )
+                env.pop("FAST_TEST", None)
+                env.update(kv.split("=", 1) for kv in args.env)
+                procs.append(subprocess.Popen(
+                    [sys.executable, "-m", "gunicorn", "-c", "app/gunicorn_conf.py", "app.wsgi:application"],
+                    cwd=ROOT, env=env))
+                base = f"http://127.0.0.1:{port}"
+            else:
+                print(f"using {base}; point its EXTERNAL_LLM_API_URL at {stub_url}")
+            wait_until_up(base + "/api/v1/health", proc=procs[-1] if args.target is None else None)
+
+            samples = load_samples()
+            print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per scenario, stub LLM "
+                  f"{args.format} latency={args.llm_latency}s token_rate={args.token_rate}/s errors={args.error_rate:.0%}")
+            results = []
+            for scenario in scenarios:
+                if args.warmup > 0:
+                    drive(scenario, base, args.concurrency, args.warmup, samples)
+                results.append(drive(scenario, base, args.concurrency, args.duration, samples))
+            print_report(results)
+            if args.json:
+                with open(args.json, "w", encoding="utf-8") as f:
+                    json.dump(results, f, indent=2)
+        finally:
+            for proc in reversed(procs):
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+if __name__ == "__main__":
+    main()
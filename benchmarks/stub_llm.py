@@ -0,0 +1,120 @@
+"""Stand-in for the external LLM (EXTERNAL_LLM_API_URL) for offline load tests.
+
+Answers POSTs in the formats ModelManager._external_call speaks: "simple"
+({"prompt"} -> {"text"}) and "openai" (chat completions, picked when the
+body has "messages"; "stream": true gets SSE chunks). Each reply waits
+--latency seconds, then produces --tokens words at --token-rate words per
+second; --error-rate of the requests fail with a 500.
+
+    python -m benchmarks.stub_llm --port 9100 --latency 0.2 --token-rate 50
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = "the tenant may terminate this agreement with thirty days written notice to the landlord".split()
+
+
+class StubLLM:
+    def __init__(self, latency: float = 0.2, token_rate: float = 0.0, tokens: int = 40, error_rate: float = 0.0,
+                 seed=None):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def words(self):
+        return [WORDS[i % len(WORDS)] for i in range(self.tokens)]
+
+    def token_delay(self) -> float:
+        return 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+
+    def fails(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self.random.random() < self.error_rate
+
+
+def make_handler(stub: StubLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._json(200, {"ok": True, "requests": stub.requests})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(stub.latency)
+            if stub.fails():
+                self._json(500, {"error": "stub failure"})
+                return
+            words = stub.words()
+            if "messages" not in body:
+                time.sleep(stub.token_delay() * len(words))
+                self._json(200, {"text": " ".join(words)})
+            elif not body.get("stream"):
+                time.sleep(stub.token_delay() * len(words))
+                self._json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                                              "finish_reason": "stop"}]})
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in words:
+                    time.sleep(stub.token_delay())
+                    chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+    return Handler
+
+
+def serve(stub: StubLLM, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; port 0 picks a free one (see server.server_port)."""
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="words per second after that (0 = instant)")
+    parser.add_argument("--tokens", type=int, default=40, help="words per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(
+        StubLLM(args.latency, args.token_rate, args.tokens, args.error_rate)))
+    server.daemon_threads = True
+    print(f"stub LLM on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+package handlers
+
+import (
+	"bufio"
+	"context"
+	"encoding/binary"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"io"
+	"os"
+	"os/exec"
+	"sync/atomic"
+	"time"
+)
+
+// ErrExtractTimeout is returned when a worker does not answer within the pool timeout.
+var ErrExtractTimeout = errors.New("extraction timed out")
+
+// ExtractRequest is one job for a warm `extract.py --serve` worker.
+type ExtractRequest struct {
+	ID       uint64 `json:"id"`
+	File     string `json:"file"`
+	MaxBytes *int   `json:"max_bytes,omitempty"`
+	Collapse bool   `json:"collapse,omitempty"`
+	Pages    string `json:"pages,omitempty"`
+	Layout   string `json:"layout,omitempty"`
+}
+
+// ExtractResult mirrors the one-shot CLI output; Code is the exit code the CLI would have used.
+type ExtractResult struct {
+	ID    uint64 `json:"id"`
+	Text  string `json:"text"`
+	Error string `json:"error"`
+	Code  int    `json:"code"`
+}
+
+type extractWorker struct {
+	cmd    *exec.Cmd
+	stdin  io.WriteCloser
+	stdout *bufio.Reader
+}
+
+func startExtractWorker(python, script string) (*extractWorker, error) {
+	cmd := exec.Command(python, script, "--serve")
+	cmd.Stderr = os.Stderr
+	stdin, err := cmd.StdinPipe()
+	if err != nil {
+		return nil, err
+	}
+	stdout, err := cmd.StdoutPipe()
+	if err != nil {
+		return nil, err
+	}
+	if err := cmd.Start(); err != nil {
+		return nil, err
+	}
+	return &extractWorker{cmd: cmd, stdin: stdin, stdout: bufio.NewReader(stdout)}, nil
+}
+
+// call sends one length-prefixed JSON frame (4-byte big-endian size) and reads the reply.
+func (w *extractWorker) call(req ExtractRequest) (ExtractResult, error) {
+	var res ExtractResult
+	body, err := json.Marshal(req)
+	if err != nil {
+		return res, err
+	}
+	frame := make([]byte, 4+len(body))
+	binary.BigEndian.PutUint32(frame, uint32(len(body)))
+	copy(frame[4:], body)
+	if _, err := w.stdin.Write(frame); err != nil {
+		return res, err
+	}
+
+	var header [4]byte
+	if _, err := io.ReadFull(w.stdout, header[:]); err != nil {
+		return res, err
+	}
+	reply := make([]byte, binary.BigEndian.Uint32(header[:]))
+	if _, err := io.ReadFull(w.stdout, reply); err != nil {
+		return res, err
+	}
+	if err := json.Unmarshal(reply, &res); err != nil {
+		return res, err
+	}
+	if res.ID != req.ID {
+		return res, fmt.Errorf("extract worker answered request %d, expected %d", res.ID, req.ID)
+	}
+	return res, nil
+}
+
+func (w *extractWorker) kill() {
+	w.stdin.Close()
+	_ = w.cmd.Process.Kill()
+	_ = w.cmd.Wait()
+}
+
+// ExtractPool keeps warm Python extraction workers so a request does not pay
+// interpreter start-up and pdfminer import on every upload. Each worker serves
+// one request at a time; a worker that times out or errors is killed and its
+// slot restarts a fresh process on next use.
+type ExtractPool struct {
+	python  string
+	script  string
+	timeout time.Duration
+	idle    chan *extractWorker // a nil entry is a slot whose worker must be (re)started
+	nextID  atomic.Uint64
+}
+
+// NewExtractPool starts size workers running `python script --serve`.
+func NewExtractPool(python, script string, size int, timeout time.Duration) *ExtractPool {
+	p := &ExtractPool{python: python, script: script, timeout: timeout, idle: make(chan *extractWorker, size)}
+	for i := 0; i < size; i++ {
+		w, err := startExtractWorker(python, script)
+		if err != nil {
+			w = nil // retried on first use
+		}
+		p.idle <- w
+	}
+	return p
+}
+
+// Extract waits for an idle worker and runs req on it, bounded by the pool timeout and ctx.
+func (p *ExtractPool) Extract(ctx context.Context, req ExtractRequest) (ExtractResult, error) {
+	var w *extractWorker
+	select {
+	case w = <-p.idle:
+	case <-ctx.Done():
+		return ExtractResult{}, ctx.Err()
+	}
+	if w == nil {
+		var err error
+		if w, err = startExtractWorker(p.python, p.script); err != nil {
+			p.idle <- nil
+			return ExtractResult{}, err
+		}
+	}
+
+	req.ID = p.nextID.Add(1)
+	type reply struct {
+		res ExtractResult
+		err error
+	}
+	done := make(chan reply, 1)
+	go func() {
+		res, err := w.call(req)
+		done <- reply{res, err}
+	}()
+
+	var expired <-chan time.Time
+	if p.timeout > 0 {
+		timer := time.NewTimer(p.timeout)
+		defer timer.Stop()
+		expired = timer.C
+	}
+	select {
+	case r := <-done:
+		if r.err != nil {
+			w.kill()
+			p.idle <- nil
+			return ExtractResult{}, r.err
+		}
+		p.idle <- w
+		return r.res, nil
+	case <-expired:
+		w.kill()
+		p.idle <- nil
+		return ExtractResult{}, ErrExtractTimeout
+	case <-ctx.Done():
+		// The worker is still busy with this request; its late reply would
+		// desynchronise the stream, so it is replaced rather than reused.
+		w.kill()
+		p.idle <- nil
+		return ExtractResult{}, ctx.Err()
+	}
+}
+
+// Close stops every worker, waiting for in-flight requests to finish.
+func (p *ExtractPool) Close() {
+	for i := 0; i < cap(p.idle); i++ {
+		if w := <-p.idle; w != nil {
+			w.kill()
+		}
+	}
+}
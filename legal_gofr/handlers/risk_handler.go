@@ -2,6 +2,7 @@ package handlers
 
 import (
 	"encoding/json"
+	"errors"
 	"io"
 	"net/http"
 	"os"
@@ -12,11 +13,13 @@ import (
 
 type handler struct {
 	pyScriptPath string
+	pool         *ExtractPool
 }
 
-// New creates a new handler with the given python script path
-func New(pyScriptPath string) *handler {
-	return &handler{pyScriptPath: pyScriptPath}
+// New creates a new handler with the given python script path. With a pool,
+// extraction runs on its warm workers; without one, the script is run per request.
+func New(pyScriptPath string, pool *ExtractPool) *handler {
+	return &handler{pyScriptPath: pyScriptPath, pool: pool}
 }
 
 // Health is a simple health check endpoint
@@ -51,25 +54,14 @@ func (h *handler) Ingest(c *gofr.Context) (interface{}, error) {
 	}
 	tempFile.Close() // Close so the python script can open it
 
-	// Execute the python script
-	cmd := exec.CommandContext(c.Request.Context(), "python", h.pyScriptPath, "--file", tempFile.Name())
-	output, err := cmd.CombinedOutput()
+	extractResult, err := h.extract(c, tempFile.Name())
+	if errors.Is(err, ErrExtractTimeout) {
+		return nil, gofr.NewError(http.StatusGatewayTimeout, "Extraction timed out")
+	}
 	if err != nil {
-		c.Logger.Errorf("Python script execution failed: %v, Output: %s", err, string(output))
-		return nil, gofr.NewError(http.StatusInternalServerError, "Error running extraction script")
+		return nil, err
 	}
 
-	// Parse the JSON output from the Python script
-	var extractResult struct {
-		Text  string `json:"text"`
-		Error string `json:"error"`
-	}
-	
-	if err := json.Unmarshal(output, &extractResult); err != nil {
-		c.Logger.Errorf("Failed to parse Python script output: %v", err)
-		return nil, gofr.NewError(http.StatusInternalServerError, "Invalid extraction output format")
-	}
-	
 	if extractResult.Error != "" {
 		return nil, gofr.NewError(http.StatusBadRequest, "Extraction failed: "+extractResult.Error)
 	}
@@ -80,3 +72,31 @@ func (h *handler) Ingest(c *gofr.Context) (interface{}, error) {
 		"bytes": bytesCopied,
 	}, nil
 }
+
+// extract runs the extraction script on path, on the pool when there is one.
+func (h *handler) extract(c *gofr.Context, path string) (ExtractResult, error) {
+	var extractResult ExtractResult
+	if h.pool != nil {
+		res, err := h.pool.Extract(c.Request.Context(), ExtractRequest{File: path})
+		if err != nil && !errors.Is(err, ErrExtractTimeout) {
+			c.Logger.Errorf("Extraction worker failed: %v", err)
+			return res, gofr.NewError(http.StatusInternalServerError, "Error running extraction script")
+		}
+		return res, err
+	}
+
+	// Execute the python script
+	cmd := exec.CommandContext(c.Request.Context(), "python", h.pyScriptPath, "--file", path)
+	output, err := cmd.CombinedOutput()
+	if err != nil {
+		c.Logger.Errorf("Python script execution failed: %v, Output: %s", err, string(output))
+		return extractResult, gofr.NewError(http.StatusInternalServerError, "Error running extraction script")
+	}
+
+	// Parse the JSON output from the Python script
+	if err := json.Unmarshal(output, &extractResult); err != nil {
+		c.Logger.Errorf("Failed to parse Python script output: %v", err)
+		return extractResult, gofr.NewError(http.StatusInternalServerError, "Invalid extraction output format")
+	}
+	return extractResult, nil
+}
@@ -3,6 +3,8 @@ package main
 import (
 	"legal_gofr/handlers"
 	"os"
+	"strconv"
+	"time"
 
 	"gofr.dev/pkg/gofr"
 )
@@ -18,8 +20,20 @@ func main() {
 		pyScriptPath = "/app/app/utils/extract.py"
 	}
 
+	// Warm extraction workers (extract.py --serve); PY_EXTRACT_WORKERS=0 runs the script per request
+	var pool *handlers.ExtractPool
+	if workers := envInt("PY_EXTRACT_WORKERS", 2); workers > 0 {
+		python := os.Getenv("PY_EXECUTABLE")
+		if python == "" {
+			python = "python"
+		}
+		timeout := time.Duration(envInt("PY_EXTRACT_TIMEOUT_SECONDS", 60)) * time.Second
+		pool = handlers.NewExtractPool(python, pyScriptPath, workers, timeout)
+		defer pool.Close()
+	}
+
 	// Create a handler with the script path
-	h := handlers.New(pyScriptPath)
+	h := handlers.New(pyScriptPath, pool)
 
 	// Register routes
 	app.GET("/health", h.Health)
@@ -28,3 +42,10 @@ func main() {
 	// Run the app
 	app.Run()
 }
+
+func envInt(name string, fallback int) int {
+	if v, err := strconv.Atoi(os.Getenv(name)); err == nil {
+		return v
+	}
+	return fallback
+}
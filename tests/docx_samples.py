@@ -0,0 +1,64 @@
+"""Minimal hand-built .docx files (body, tables, headers, footers, footnotes) for extraction tests and benchmarks."""
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+MAIN = "application/vnd.openxmlformats-officedocument.wordprocessingml"
+
+
+def para(text: str) -> str:
+    # A tab stop in the paragraph properties must not show up as text.
+    runs = "<w:tab/>".join(f'<w:t xml:space="preserve">{escape(part)}</w:t>' for part in text.split("\t"))
+    return f'<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr><w:r>{runs}</w:r></w:p>'
+
+
+def table(rows) -> str:
+    cells = lambda row: "".join(f"<w:tc>{para(cell)}</w:tc>" for cell in row)
+    return "<w:tbl>" + "".join(f"<w:tr>{cells(row)}</w:tr>" for row in rows) + "</w:tbl>"
+
+
+def make_docx(blocks, headers=(), footers=(), footnotes=()) -> bytes:
+    """`blocks` are para()/table() XML strings; the other parts take plain text."""
+    types = [("/word/document.xml", f"{MAIN}.document.main+xml")]
+    rels = []
+    parts = {}
+    sect = ""
+    for kind, texts in (("header", headers), ("footer", footers)):
+        for n, text in enumerate(texts, 1):
+            name = f"{kind}{n}.xml"
+            rid = f"r{kind}{n}"
+            tag = "hdr" if kind == "header" else "ftr"
+            parts["word/" + name] = f'<w:{tag} xmlns:w="{W}">{para(text)}</w:{tag}>'
+            types.append(("/word/" + name, f"{MAIN}.{kind}+xml"))
+            rels.append((rid, f"{REL}/{kind}", name))
+            sect += f'<w:{kind}Reference w:type="default" r:id="{rid}"/>'
+    if footnotes:
+        notes = ('<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+                 + "".join(f'<w:footnote w:id="{n}">{para(text)}</w:footnote>' for n, text in enumerate(footnotes, 1)))
+        parts["word/footnotes.xml"] = f'<w:footnotes xmlns:w="{W}">{notes}</w:footnotes>'
+        types.append(("/word/footnotes.xml", f"{MAIN}.footnotes+xml"))
+        rels.append(("rfootnotes", f"{REL}/footnotes", "footnotes.xml"))
+    parts["word/document.xml"] = (f'<w:document xmlns:w="{W}" xmlns:r="{R}"><w:body>{"".join(blocks)}'
+                                  f'<w:sectPr>{sect}</w:sectPr></w:body></w:document>')
+
+    overrides = "".join(f'<Override PartName="{name}" ContentType="{ct}"/>' for name, ct in types)
+    parts["[Content_Types].xml"] = (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        f'<Default Extension="xml" ContentType="application/xml"/>{overrides}</Types>')
+    parts["_rels/.rels"] = (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{REL}/officeDocument" Target="word/document.xml"/></Relationships>')
+    parts["word/_rels/document.xml.rels"] = (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(f'<Relationship Id="{rid}" Type="{t}" Target="{target}"/>' for rid, t, target in rels)
+        + "</Relationships>")
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in parts.items():
+            zf.writestr(name, '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' + xml)
+    return out.getvalue()
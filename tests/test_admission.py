@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.app import create_app
+from app.utils.admission import (
+    AdmissionController, QueueFullError, DeadlineExceededError, CancelledError
+)
+
+
+def test_queue_full_rejects_immediately():
+    ac = AdmissionController(max_concurrency=1, max_queue=0)
+    with ac.admit():
+        with pytest.raises(QueueFullError):
+            ac.acquire(ac.ticket())
+
+
+def test_stale_ticket_dropped_before_it_runs():
+    ac = AdmissionController(max_concurrency=1, max_queue=4)
+    holder = ac.ticket()
+    ac.acquire(holder)
+    with pytest.raises(DeadlineExceededError):
+        ac.acquire(ac.ticket(timeout=0.05))
+    ac.release(holder)
+    assert ac.active == 0 and len(ac.queue) == 0
+
+
+def test_slot_handed_to_waiters_in_order():
+    ac = AdmissionController(max_concurrency=1, max_queue=4)
+    holder = ac.ticket()
+    ac.acquire(holder)
+    order = []
+
+    def worker(n):
+        with ac.admit(timeout=5):
+            order.append(n)
+
+    threads = []
+    for n in range(3):
+        t = threading.Thread(target=worker, args=(n,))
+        t.start()
+        threads.append(t)
+        while len(ac.queue) <= n:
+            time.sleep(0.001)
+    ac.release(holder)
+    for t in threads:
+        t.join()
+    assert order == [0, 1, 2]
+    assert ac.active == 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    ac = AdmissionController(max_concurrency=1, max_queue=4)
+    holder = ac.ticket()
+    ac.acquire(holder)
+    waiter = ac.ticket(timeout=5)
+    errors = []
+
+    def wait():
+        try:
+            ac.acquire(waiter)
+        except CancelledError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=wait)
+    t.start()
+    while not len(ac.queue):
+        time.sleep(0.001)
+    waiter.cancel()
+    t.join()
+    assert errors and len(ac.queue) == 0
+
+
+def test_endpoint_returns_503_with_retry_after(monkeypatch):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("INFERENCE_CONCURRENCY", "1")
+    monkeypatch.setenv("INFERENCE_QUEUE_SIZE", "0")
+    app = create_app()
+    client = app.test_client()
+    with app.admission.admit():
+        res = client.post("/api/simplify", json={"text": "Hello"}, headers={"X-API-Key": "k"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert res.get_json()["error"]["code"] == "E503_QUEUE_FULL"
+    res = client.post("/api/v1/inference", json={"text": "Hello", "stream": True},
+                      headers={"X-API-Key": "k"})
+    assert res.status_code == 200
+    assert "event: done" in res.get_data(as_text=True)
+    res.close()
+    assert app.admission.active == 0
+
+
+def test_async_waiter_is_woken_by_release():
+    ac = AdmissionController(max_concurrency=1, max_queue=4)
+    holder = ac.ticket()
+    ac.acquire(holder)
+
+    async def main():
+        ticket = ac.ticket(timeout=5)
+        asyncio.get_running_loop().call_later(0.02, ac.release, holder)
+        await ac.acquire_async(ticket)
+        ac.release(ticket)
+
+    asyncio.run(main())
+    assert ac.active == 0
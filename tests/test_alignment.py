@@ -0,0 +1,105 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from app.app import create_app
+from app.models.alignment import _increasing, align, cached_embed, compare_documents
+
+TEMPLATE = (
+    "The term of this agreement is one year. "
+    "Fees are payable within thirty days of invoice. "
+    "Either party may terminate for convenience on sixty days notice. "
+    "Each party keeps the other party's information confidential. "
+    "This agreement is governed by the laws of England."
+)
+CONTRACT = (
+    "This agreement is governed by the laws of England. "
+    "The term of this agreement is one year. "
+    "Fees are payable within ninety days of invoice. "
+    "Each party keeps the other party's information confidential. "
+    "The supplier shall indemnify the customer against all losses."
+)
+
+
+def bag_of_words(texts):
+    vectors = np.zeros((len(texts), 512), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 512] += 1
+    return vectors
+
+
+def test_increasing_subsequence_positions():
+    assert _increasing(np.array([0, 4, 1, 2, 3])).tolist() == [0, 2, 3, 4]
+    assert _increasing(np.array([], dtype=np.int64)).tolist() == []
+
+
+def test_align_identity_and_swap():
+    assert align(np.eye(4))["pairs"] == [(0, 0), (1, 1), (2, 2), (3, 3)]
+    sim = np.eye(3)[[2, 0, 1]].T  # template clause 2 moved to the front
+    result = align(sim)
+    assert result["pairs"] == [(0, 1), (1, 2)] and result["moved"] == [(2, 0)]
+
+
+def test_compare_reports_changed_missing_added_and_moved():
+    detected = []
+
+    def detect(text):
+        detected.append(text)
+        return [{"type": "Indemnity"}] if "indemnify" in text else []
+
+    report = compare_documents(TEMPLATE, CONTRACT, bag_of_words, detect=detect)
+    summary = report["summary"]
+    assert summary == {"template_clauses": 5, "contract_clauses": 5, "unchanged": 2, "changed": 1,
+                       "moved": 1, "missing": 1, "added": 1}
+    changed = [m for m in report["matches"] if m["status"] == "changed"]
+    assert changed[0]["contract"] == "Fees are payable within ninety days of invoice"
+    assert report["missing"][0]["template"].startswith("Either party may terminate")
+    assert report["added"][0]["risks"] == [{"type": "Indemnity"}]
+    # Unchanged clauses are never sent to risk detection.
+    assert sorted(detected) == sorted([changed[0]["contract"], report["added"][0]["contract"]])
+
+
+def test_cached_embed_only_embeds_new_texts():
+    class Store:
+        def __init__(self):
+            self.data = {}
+
+        def get_many(self, keys):
+            return {k: self.data[k] for k in keys if k in self.data}
+
+        def set_many(self, mapping, ttl=None):
+            self.data.update(mapping)
+
+    class Model:
+        model, encoder, model_name, backend = object(), None, "m", "torch"
+        calls = []
+
+        def embed(self, texts):
+            self.calls.append(list(texts))
+            return bag_of_words(texts)
+
+    model = Model()
+    embed = cached_embed(model, Store())
+    first = embed(["a b", "c"])
+    second = embed(["c", "a b", "d"])
+    assert model.calls == [["a b", "c"], ["d"]]
+    np.testing.assert_array_equal(first[0], second[1])
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    return create_app().test_client()
+
+
+def test_compare_endpoint(client):
+    headers = {"X-API-Key": "k"}
+    assert client.post("/api/v1/compare", json={"template": TEMPLATE}, headers=headers).status_code == 400
+    resp = client.post("/api/v1/compare", json={"template": TEMPLATE, "contract": TEMPLATE}, headers=headers)
+    assert resp.status_code == 200
+    summary = resp.get_json()["comparison"]["summary"]
+    assert summary["unchanged"] == 5 and summary["missing"] == summary["added"] == 0
@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+from app.app import create_app
+from app import asgi_app
+from app.asgi_app import create_asgi_app
+from app.utils.fair_scheduler import tenant_id
+
+
+def _call(asgi, method, path, body=b"", headers=()):
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+    start = sent[0]
+    data = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], dict(start["headers"]), data
+
+
+def _asgi(monkeypatch):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    return create_asgi_app(create_app())
+
+
+def test_native_inference_matches_flask_shape(monkeypatch):
+    asgi = _asgi(monkeypatch)
+    status, _, data = _call(asgi, "POST", "/api/simplify", json.dumps({"text": "Hello"}).encode(),
+                            [("Content-Type", "application/json"), ("X-API-Key", "k")])
+    assert status == 200
+    payload = json.loads(data)
+    assert payload["ok"] is True and "plain_language" in payload["result"]
+
+    status, _, data = _call(asgi, "POST", "/api/simplify", b"{}", [("X-API-Key", "bad")])
+    assert status == 401 and json.loads(data)["error"]["code"] == "E401_INVALID_API_KEY"
+
+
+def test_streaming_inference(monkeypatch):
+    asgi = _asgi(monkeypatch)
+    body = json.dumps({"text": "hello world", "task": "simplify", "stream": True}).encode()
+    status, headers, data = _call(asgi, "POST", "/api/v1/inference", body, [("X-API-Key", "k")])
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    text = data.decode()
+    assert "event: chunk" in text and text.rstrip().endswith("data: {}")
+    assert asgi.admission.active == 0
+
+
+def test_other_routes_go_through_wsgi_bridge(monkeypatch):
+    asgi = _asgi(monkeypatch)
+    status, _, data = _call(asgi, "GET", "/api/v1/health")
+    assert status == 200 and json.loads(data)["status"] == "ready"
+    status, _, data = _call(asgi, "GET", "/does-not-exist")
+    assert status == 404
+
+
+def test_wsgi_bridge_stops_streaming_when_the_client_disconnects(monkeypatch):
+    asgi = _asgi(monkeypatch)
+    asgi.streams.heartbeat = 0.05  # wakes the subscription in the worker thread
+    stream = asgi.streams.create(owner=tenant_id("k"))
+    stream.append("first")
+    scope = {"type": "http", "method": "GET", "path": f"/api/v1/streams/{stream.id}", "query_string": b"",
+             "headers": [(b"x-api-key", b"k")], "client": ("127.0.0.1", 1234), "server": ("test", 80)}
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent, hung_up = [], asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await hung_up.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body"):
+            hung_up.set()
+
+    asyncio.run(asyncio.wait_for(asgi(scope, receive, send), 5))
+    assert sent[0]["status"] == 200 and b"first" in sent[1]["body"]
+    assert all(m.get("more_body") for m in sent[1:])  # no final frame to a closed connection
+    assert stream.subscribers == 0  # result.close() ended the Flask-side subscription
+
+
+def test_native_external_calls_record_stages_and_tokens(monkeypatch):
+    asgi = _asgi(monkeypatch)
+    mm = asgi.model_manager
+    monkeypatch.setattr(mm, "fast_test", False)
+    monkeypatch.setattr(mm, "external_llm_url", "http://llm.test/v1/generate")
+    monkeypatch.setattr(asgi_app, "httpx", object())  # only needs to be "installed"
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"text": "Pay rent every month."}
+
+    class Client:
+        async def post(self, url, headers=None, json=None):
+            return Response()
+
+    asgi._client = Client()
+    observed = []
+    monkeypatch.setattr(asgi.flask_app.metrics, "observe_request",
+                        lambda endpoint, method, status, timings: observed.append(timings))
+    status, _, data = _call(asgi, "POST", "/api/simplify", json.dumps({"text": "Rent is payable monthly."}).encode(),
+                            [("X-API-Key", "k")])
+    assert status == 200 and json.loads(data)["result"]["plain_language"] == "Pay rent every month."
+    timings = observed[0]
+    assert {"queue_wait", "prompt_build", "model"} <= set(timings.durations)
+    assert timings.counts["tokens_in"] > 0 and timings.counts["tokens_out"] > 0
+
+
+def test_oversized_bodies_get_the_json_413(monkeypatch):
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "100")
+    asgi = _asgi(monkeypatch)
+    for path, body, headers in (("/api/simplify", b"x" * 101, [("X-API-Key", "k")]),  # native route
+                                ("/gofr/ingest", b"x" * 101, [("X-API-Key", "k")]),  # WSGI bridge, streamed
+                                ("/api/v1/health", b"", [("Content-Length", "5000")])):  # declared length
+        status, _, data = _call(asgi, "POST", path, body, headers)
+        assert status == 413 and json.loads(data)["error"]["code"] == "E413_PAYLOAD_TOO_LARGE"
@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+
+from app.app import create_app
+from app.utils.assets import AssetManifest
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("BATCH_DB_PATH", str(tmp_path / "batch.sqlite3"))
+    return create_app().test_client()
+
+
+def test_manifest_fingerprints_and_rewrites(tmp_path):
+    src = tmp_path / "src"
+    (src / "public").mkdir(parents=True)
+    (src / "app.js").write_text("console.log('hi');" * 50)
+    (src / "public" / "logo.png").write_bytes(b"\x89PNG....")
+    manifest = AssetManifest(str(src), str(tmp_path / "build")).build()
+
+    js_url = manifest.url("app.js")
+    assert js_url.startswith("/assets/app.") and js_url.endswith(".js")
+    assert (tmp_path / "build" / (manifest.files["app.js"] + ".gz")).exists()
+    assert not (tmp_path / "build" / (manifest.files["public/logo.png"] + ".gz")).exists()
+
+    html = '<script src="app.js"></script><img src="./public/logo.png"><a href="https://x/app.js">'
+    out = manifest.rewrite_html(html)
+    assert js_url in out and manifest.url("public/logo.png") in out
+    assert 'href="https://x/app.js"' in out
+
+
+def test_index_references_fingerprinted_assets(client):
+    res = client.get("/")
+    assert res.status_code == 200 and res.headers["Cache-Control"] == "no-cache"
+    body = res.get_data(as_text=True)
+    assert 'src="/assets/main.' in body
+    assert client.get("/", headers={"If-None-Match": res.headers["ETag"]}).status_code == 304
+
+
+def test_asset_served_immutable_with_encoding_and_304(client):
+    body = client.get("/").get_data(as_text=True)
+    url = body.split('href="/assets/styles.', 1)[1].split('"', 1)[0]
+    url = "/assets/styles." + url
+
+    res = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert "immutable" in res.headers["Cache-Control"]
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert b"{" in gzip.decompress(res.get_data())
+
+    res2 = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": res.headers["ETag"]})
+    assert res2.status_code == 304
+    assert client.get("/assets/nope.js").status_code == 404
+
+
+def test_url_references_in_css_and_inline_styles(tmp_path):
+    src = tmp_path / "src"
+    (src / "public").mkdir(parents=True)
+    (src / "css").mkdir()
+    (src / "public" / "bg.png").write_bytes(b"\x89PNG bg")
+    (src / "css" / "site.css").write_text(".hero { background: url('../public/bg.png') } .m { mask: url(#m) }")
+    manifest = AssetManifest(str(src), str(tmp_path / "build")).build()
+    png = manifest.url("public/bg.png")
+
+    css = (tmp_path / "build" / manifest.files["css/site.css"]).read_text()
+    assert f"url('{png}')" in css and "url(#m)" in css
+    html = manifest.rewrite_html('<div style="background-image: url(\'public/bg.png\');"><g mask="url(#m)">')
+    assert f"url('{png}')" in html and 'mask="url(#m)"' in html
+
+
+def test_index_inline_background_is_fingerprinted(client):
+    body = client.get("/").get_data(as_text=True)
+    assert "url('/assets/public/legal-document." in body
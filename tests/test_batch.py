@@ -0,0 +1,86 @@
+import io
+import json
+import time
+
+import pytest
+
+from app.app import create_app
+from app.utils.jobs import JobStore, BatchRunner
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("BATCH_DB_PATH", str(tmp_path / "batch.sqlite3"))
+    app = create_app()
+    app.batch_runner.poll_interval = 0.05
+    return app.test_client()
+
+
+def _wait_done(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/api/v1/batch/{job_id}", headers={"X-API-Key": "k"}).get_json()["job"]
+        if job["status"] == "completed":
+            return job
+        time.sleep(0.02)
+    raise AssertionError("batch job did not finish")
+
+
+def test_batch_json_pages_and_ndjson(client):
+    docs = [{"id": f"doc-{i}", "text": f"Clause number {i}."} for i in range(12)]
+    res = client.post("/api/v1/batch", json={"task": "summarize", "documents": docs},
+                      headers={"X-API-Key": "k"})
+    assert res.status_code == 202
+    job_id = res.get_json()["job_id"]
+    job = _wait_done(client, job_id)
+    assert job["done"] == 12 and job["failed"] == 0
+
+    page = client.get(f"/api/v1/batch/{job_id}/results?page=2&page_size=5",
+                      headers={"X-API-Key": "k"}).get_json()
+    assert [item["id"] for item in page["items"]] == [f"doc-{i}" for i in range(5, 10)]
+
+    res = client.get(f"/api/v1/batch/{job_id}/results?format=ndjson", headers={"X-API-Key": "k"})
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert res.mimetype == "application/x-ndjson"
+    assert [item["index"] for item in lines] == list(range(12))
+    assert "SUMMARIZE" in lines[0]["result"]["plain_language"]
+
+
+def test_batch_validation(client):
+    res = client.post("/api/v1/batch", json={"documents": []}, headers={"X-API-Key": "k"})
+    assert res.status_code == 400
+    res = client.get("/api/v1/batch/nope", headers={"X-API-Key": "k"})
+    assert res.status_code == 404
+
+
+def test_batch_uploads_are_checked_like_ingest(client):
+    files = {"files": [(io.BytesIO(b"Clause one."), "a.TXT"), (io.BytesIO(b"MZ"), "tool.exe")]}
+    res = client.post("/api/v1/batch", data={"task": "summarize", **files}, headers={"X-API-Key": "k"},
+                      content_type="multipart/form-data")
+    assert res.status_code == 400 and res.get_json()["error"]["code"] == "E400_UNSUPPORTED_FILE"
+    assert "tool.exe" in res.get_json()["error"]["message"]
+
+
+def test_fast_test_instances_do_not_share_state(monkeypatch):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.delenv("DATA_DIR", raising=False)
+    first, second = create_app(), create_app()
+    assert first.config["DATA_DIR"] != second.config["DATA_DIR"]
+
+
+def test_expired_lease_is_reclaimed_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path, lease_seconds=0)
+    job_id = store.create_job("simplify", [{"text": "a"}, {"text": "b"}])
+    assert len(store.claim(10)["items"]) == 2  # worker "dies" holding the lease
+
+    class Stub:
+        def process_batch(self, texts, task, language):
+            return [{"plain_language": t.upper()} for t in texts]
+
+    restarted = JobStore(path)
+    assert restarted.has_pending()
+    assert BatchRunner(restarted, Stub()).run_once()
+    job = restarted.get_job(job_id)
+    assert job["status"] == "completed" and job["done"] == 2
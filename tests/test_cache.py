@@ -1,6 +1,195 @@
-from app.utils.cache import Cache
+import threading
+import time
+
+from app.utils.cache import Cache, LRUCache
 
 def test_lru_cache():
     c = Cache()
     c.set('a', {'x':1})
     assert c.get('a')['x'] == 1
+
+
+class FakeRedis:
+    """Just the commands Cache uses, backed by a dict."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append("get")
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, key, ttl, value):
+        self.calls.append("setex")
+        self.data[key] = value
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        redis, ops = self, []
+
+        class Pipe:
+            def setex(self, *args):
+                ops.append(args)
+
+            def execute(self):
+                redis.calls.append("pipeline")
+                for key, _, value in ops:
+                    redis.data[key] = value
+        return Pipe()
+
+
+def test_lru_is_bounded_by_bytes_and_ttl():
+    now = [0.0]
+    lru = LRUCache(100, max_bytes=10, clock=lambda: now[0])
+    lru.set("a", "x", size=4)
+    lru.set("b", "y", size=4, ttl=5)
+    assert lru.get("a") == "x"  # a is now most recently used
+    lru.set("c", "z", size=4)
+    assert lru.get("b") is None and lru.get("a") == "x" and lru.bytes == 8
+    lru.set("d", "w", size=4, ttl=5)
+    now[0] = 6
+    assert lru.get("d") is None
+    lru.set("huge", "v", size=11)
+    assert lru.get("huge") is None
+
+
+def test_l1_in_front_of_l2_with_compression():
+    redis = FakeRedis()
+    cache = Cache(client=redis, compress_min_bytes=64)
+    value = {"text": "indemnify " * 100}
+    cache.set("k", value)
+    assert len(redis.data["k"]) < 200  # compressed in Redis
+    assert cache.get("k") == value and redis.calls == ["setex"]  # served from L1
+
+    other = Cache(client=redis)  # another worker: empty L1
+    assert other.get("k") == value and other.get("k") == value
+    assert other.stats == {"l1_miss": 1, "l2_hit": 1, "l1_hit": 1}
+    cache.set("raw", b"\x00\x01 embedding bytes")
+    assert Cache(client=redis).get("raw") == b"\x00\x01 embedding bytes"
+
+
+def test_get_many_and_set_many_use_one_round_trip():
+    redis = FakeRedis()
+    Cache(client=redis).set_many({f"k{i}": i for i in range(5)})
+    assert redis.calls == ["pipeline"]
+    cache = Cache(client=redis)
+    cache.set("local", "x")
+    redis.calls.clear()
+    assert cache.get_many(["k0", "k3", "local", "missing"]) == {"k0": 0, "k3": 3, "local": "x"}
+    assert redis.calls == ["mget"]
+
+
+def test_get_or_set_runs_one_loader_for_concurrent_callers():
+    cache = Cache(client=FakeRedis())
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["value"] * 8 and len(calls) == 1
+
+
+def test_get_or_set_refreshes_early_near_expiry():
+    cache = Cache()
+    cache.set("k", "old", ttl=3600, delta=0.01)
+    assert cache.get_or_set("k", lambda: "new") == "old"
+    # A value that took as long to compute as it has left to live is due.
+    cache.set("k", "old", ttl=1, delta=1000)
+    assert cache.get_or_set("k", lambda: "new") == "new"
+
+
+def test_l1_ttl_cap_applies_only_in_front_of_redis():
+    local = Cache(l1_ttl=0.05)
+    local.set("k", "v", ttl=3600)
+    shared = Cache(client=FakeRedis(), l1_ttl=0.05)
+    shared.set("k", "v", ttl=3600)
+    time.sleep(0.1)
+    assert local.get("k") == "v"  # no L2: the caller's ttl holds
+    assert shared.get("k") == "v" and shared.stats["l1_miss"] == 1  # re-read from Redis
+    local.set("short", "v", ttl=0.05)
+    time.sleep(0.1)
+    assert local.get("short") is None
+
+
+def test_l1_budget_charges_uncompressed_size():
+    cache = Cache(client=FakeRedis(), compress_min_bytes=64)
+    cache.set("k", "x" * 200_000)
+    assert 200_000 <= cache.lru.bytes < 200_100  # not the ~200-byte compressed blob
+    assert len(cache.client.data["k"]) < 1000
+    other = Cache(client=cache.client)
+    other.get_many(["k"])
+    assert 200_000 <= other.lru.bytes < 200_100
+
+    small = Cache(l1_max_bytes=1_000_000)
+    for i in range(10):
+        small.set(f"k{i}", "y" * 200_000)
+    assert len(small.lru) == 4 and small.lru.bytes <= 1_000_000
+
+
+def test_redis_failures_back_off_to_l1():
+    now = [0.0]
+    calls = []
+
+    class DownRedis:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                calls.append(name)
+                raise ConnectionError("timeout")
+            return fail
+
+    cache = Cache(client=DownRedis(), retry_after=5, clock=lambda: now[0])
+    assert cache.get("a") is None
+    cache.set("b", 1)
+    assert cache.get_many(["a", "c"]) == {}
+    assert cache.get_or_set("d", lambda: 2) == 2 and cache.get("b") == 1
+    assert calls == ["get"]  # later lookups and writes skip Redis instead of waiting out the timeout
+    assert cache.stats["l2_error"] == 1
+    now[0] = 5.0
+    assert cache.get("a") is None and calls == ["get", "get"]
+
+
+def test_single_flight_holds_across_back_to_back_loads():
+    cache = Cache()
+    running, peak, guard = [0], [0], threading.Lock()
+
+    def loader():
+        with guard:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.001)
+        with guard:
+            running[0] -= 1
+        return 1
+
+    def worker():
+        for _ in range(50):
+            cache.get_or_set("k", loader, ttl=0)  # ttl=0: nothing is cached, every caller loads
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+    assert cache._flights == {}
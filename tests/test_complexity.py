@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from app.app import create_app
+from app.asgi_app import create_asgi_app
+from app.models.complexity import complexity_scores, selective_simplify, split_sentences, usage_texts
+from tests.test_asgi import _call
+
+PLAIN = "This Agreement is governed by the laws of England."
+LEGALESE = ("Notwithstanding anything to the contrary herein, the Indemnifying Party shall indemnify, defend and "
+            "hold harmless the Indemnified Party from and against any and all losses arising out of or in "
+            "connection with any breach hereof.")
+TEXT = f"{PLAIN} {LEGALESE} Fees are due monthly."
+
+
+def test_scores_rank_legalese_above_plain_sentences():
+    scores = complexity_scores([PLAIN, LEGALESE, "Fees are due monthly.", ""])
+    assert scores[1] > 0.7 and scores[0] < 0.2 and scores[2] < 0.2 and scores[3] == 0
+    assert split_sentences(TEXT) == [PLAIN, LEGALESE, "Fees are due monthly."]
+
+
+def test_only_complex_clauses_reach_the_model():
+    sent = []
+
+    def simplify(texts):
+        sent.extend(texts)
+        return [{"plain_language": "The other side pays for any losses you cause. "} for _ in texts]
+
+    result = selective_simplify(TEXT, simplify, threshold=0.35)
+    assert sent == [LEGALESE] and result["rewritten"] == [1]
+    assert result["plain_language"] == f"{PLAIN} The other side pays for any losses you cause. Fees are due monthly."
+    assert result["stats"]["passed_through"] == 2
+    assert usage_texts(result) == (LEGALESE, "The other side pays for any losses you cause.")
+
+
+def test_failed_rewrites_keep_the_original_clause():
+    result = selective_simplify(TEXT, lambda texts: [{"error": True, "message": "down"} for _ in texts])
+    assert result["clauses"][1]["output"] == LEGALESE and result["clauses"][1]["error"] == "down"
+    assert result["error"] is True and result["rewritten"] == []
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    return create_app()
+
+
+def test_selective_mode_on_flask_and_asgi(app):
+    headers = {"X-API-Key": "k"}
+    res = app.test_client().post("/api/simplify", json={"text": TEXT, "selective": True}, headers=headers)
+    assert res.status_code == 200 and res.get_json()["result"]["rewritten"] == [1]
+    assert app.metrics.registry.get_sample_value("simplify_clauses_total", {"route": "passthrough"}) == 2
+
+    bad = app.test_client().post("/api/v1/inference", json={"text": TEXT, "selective": True,
+                                                             "complexity_threshold": "high"}, headers=headers)
+    assert bad.status_code == 400
+
+    body = json.dumps({"text": TEXT, "selective": True, "complexity_threshold": 0.0}).encode()
+    status, _, data = _call(create_asgi_app(app), "POST", "/api/simplify", body, [("X-API-Key", "k")])
+    assert status == 200 and json.loads(data)["result"]["rewritten"] == [0, 1, 2]
+
+
+def test_layout_between_clauses_is_kept():
+    text = f"Terms:\n\n1. {PLAIN}\n2. {LEGALESE}\n\n  Fees are due monthly.\n"
+    result = selective_simplify(text, lambda texts: [{"plain_language": "You pay for losses."} for _ in texts])
+    assert result["plain_language"] == f"Terms:\n\n1. {PLAIN}\n2. You pay for losses.\n\n  Fees are due monthly.\n"
+    assert selective_simplify(text, lambda texts: [], threshold=2.0)["plain_language"] == text
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from app.app import create_app
+from app.utils.extract import extract_docx, iter_docx, iter_docx_part, take_bytes
+from tests.docx_samples import W, make_docx, para, table
+
+
+def test_paragraphs_match_python_docx(tmp_path):
+    docx = pytest.importorskip("docx")
+    path = tmp_path / "plain.docx"
+    path.write_bytes(make_docx([para("First clause."), para(""), para("Fee:\t100 EUR"), para("Last & final")]))
+    expected = "\n".join(p.text for p in docx.Document(str(path)).paragraphs)
+    assert extract_docx(str(path)) == expected == "First clause.\n\nFee:\t100 EUR\nLast & final"
+
+
+def test_tables_headers_and_footnotes_in_document_order(tmp_path):
+    path = tmp_path / "contract.docx"
+    path.write_bytes(make_docx(
+        [para("1. Fees"), table([["Service", "Fee"], ["Support", "100 EUR"]]), para("2. Liability")],
+        headers=["ACME Confidential", "ACME Confidential"],
+        footers=["Page footer"],
+        footnotes=["Liability is capped at 12 months of fees."],
+    ))
+    assert extract_docx(str(path)).split("\n") == [
+        "ACME Confidential",
+        "1. Fees",
+        "Service\tFee",
+        "Support\t100 EUR",
+        "2. Liability",
+        "Liability is capped at 12 months of fees.",
+        "Page footer",
+    ]
+
+
+def test_text_box_and_fallback_copy_emitted_once():
+    mc = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+    box = "<w:txbxContent><w:p><w:r><w:t>Boxed</w:t></w:r></w:p></w:txbxContent>"
+    xml = (f'<w:document xmlns:w="{W}" xmlns:mc="{mc}"><w:body><w:p><w:r><w:t>Before </w:t></w:r>'
+           f"<w:r><mc:AlternateContent><mc:Choice>{box}</mc:Choice><mc:Fallback>{box}</mc:Fallback>"
+           "</mc:AlternateContent></w:r><w:r><w:t>after</w:t></w:r></w:p></w:body></w:document>")
+    assert list(iter_docx_part(io.BytesIO(xml.encode("utf-8")))) == ["Boxed", "Before after"]
+
+
+def test_byte_budget_and_bad_zip(tmp_path):
+    path = tmp_path / "long.docx"
+    path.write_bytes(make_docx([para(f"Clause {n}.") for n in range(1000)]))
+    assert take_bytes(iter_docx(str(path)), 20) == "Clause 0.\nClause 1.\n"
+    with pytest.raises(Exception, match="DOCX"):
+        list(iter_docx(io.BytesIO(b"not a zip")))
+
+
+def test_ingest_extracts_docx_tables(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    client = create_app().test_client()
+    data = make_docx([para("Fees"), table([["Cap", "1x annual fees"]])])
+    res = client.post("/gofr/ingest", data={"file": (io.BytesIO(data), "c.docx")},
+                      content_type="multipart/form-data")
+    assert res.status_code == 200
+    assert res.get_json()["text"] == "Fees\nCap\t1x annual fees"
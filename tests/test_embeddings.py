@@ -0,0 +1,43 @@
+import threading
+
+import numpy as np
+
+from app.models.embeddings import Embedder, MicroBatcher, length_sorted_batches, mean_pool
+
+
+def test_length_sorted_batches_cover_every_index_once():
+    batches = length_sorted_batches([5, 1, 9, 3, 7], 2)
+    assert batches == [[1, 3], [0, 4], [2]]
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    np.testing.assert_allclose(mean_pool(hidden, mask), [[1.0, 0.0]])
+
+
+def test_micro_batcher_merges_concurrent_calls():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t)] for t in texts], dtype=np.float32)
+
+    batcher = MicroBatcher(encode, max_batch=64, max_wait=0.05)
+    results = {}
+    threads = [threading.Thread(target=lambda w=w: results.__setitem__(w, batcher.encode([w, w * 2])))
+               for w in ("a", "bb", "ccc")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results["bb"].ravel().tolist() == [2, 4]
+    assert len(calls) < 3 and sum(len(c) for c in calls) == 6
+
+
+def test_onnx_backend_falls_back_when_unavailable(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setenv("EMBEDDING_ONNX_PATH", str(tmp_path / "missing"))
+    embedder = Embedder()
+    assert embedder.encoder is None
+    assert embedder.embed(["clause"]).shape == (1, 384)
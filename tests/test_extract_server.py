@@ -0,0 +1,97 @@
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from app.utils.extract import read_message, write_message
+from tests.pdf_samples import make_pdf
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "utils", "extract.py")
+
+
+def _env(tmp_path):
+    return dict(os.environ, EXTRACT_CACHE_DIR=str(tmp_path / "cache"))
+
+
+def test_frames_round_trip():
+    buf = io.BytesIO()
+    write_message(buf, {"id": 1, "text": "clause é"})
+    write_message(buf, {"id": 2})
+    buf.seek(0)
+    assert read_message(buf) == {"id": 1, "text": "clause é"}
+    assert read_message(buf) == {"id": 2}
+    assert read_message(buf) is None
+
+
+def test_serve_answers_many_requests_in_one_process(tmp_path):
+    pdf = tmp_path / "contract.pdf"
+    pdf.write_bytes(make_pdf(["Clause 1. The party may terminate", "Clause 2. Payment"]))
+    txt = tmp_path / "notes.txt"
+    txt.write_text("plain   text\nhere", encoding="utf-8")
+
+    proc = subprocess.Popen([sys.executable, SCRIPT, "--serve"], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, env=_env(tmp_path))
+    try:
+        requests = [
+            {"id": "a", "file": str(pdf), "pages": "2", "layout": "fast"},
+            {"id": "b", "file": str(txt), "collapse": True},
+            {"id": "c", "file": str(tmp_path / "missing.pdf")},
+            {"id": "d", "file": str(pdf), "max_bytes": 0},
+        ]
+        for request in requests:
+            write_message(proc.stdin, request)
+        responses = [read_message(proc.stdout) for _ in requests]
+    finally:
+        proc.stdin.close()
+        assert proc.wait(timeout=10) == 0
+
+    by_id = {r["id"]: r for r in responses}
+    assert "Payment" in by_id["a"]["text"] and "terminate" not in by_id["a"]["text"]
+    assert by_id["b"]["text"] == "plain text here"
+    assert by_id["c"] == {"id": "c", "error": "file_not_found", "code": 1}
+    assert "terminate" in by_id["d"]["text"]
+
+
+def test_serve_on_unix_socket(tmp_path):
+    txt = tmp_path / "notes.txt"
+    txt.write_text("hello", encoding="utf-8")
+    path = str(tmp_path / "extract.sock")
+    proc = subprocess.Popen([sys.executable, SCRIPT, "--serve", "--socket", path], env=_env(tmp_path))
+    try:
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(path)
+            stream = sock.makefile("rwb")
+            write_message(stream, {"id": 7, "file": str(txt)})
+            assert read_message(stream) == {"id": 7, "text": "hello"}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def test_one_shot_cli_contract_unchanged(tmp_path):
+    result = subprocess.run([sys.executable, SCRIPT, "--file", str(tmp_path / "nope.txt")],
+                            capture_output=True, text=True, env=_env(tmp_path))
+    assert result.returncode == 1
+    assert result.stdout.strip() == '{"error": "file_not_found"}'
+    result = subprocess.run([sys.executable, SCRIPT], capture_output=True, text=True)
+    assert result.returncode == 2
+
+
+def test_cached_cli_run_without_file_digest(tmp_path, monkeypatch):
+    # hashlib.file_digest is 3.11+; the gofr image runs this script on 3.10.
+    import hashlib
+    from app.utils import extract
+    monkeypatch.delattr(hashlib, "file_digest", raising=False)
+    monkeypatch.setenv("EXTRACT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(extract, "_cli_cache_instance", None)
+    pdf = tmp_path / "contract.pdf"
+    pdf.write_bytes(make_pdf(["Clause 1. Payment"]))
+    first = extract.run_request(str(pdf))
+    assert first[1] == 0 and "Payment" in first[0]["text"]
+    assert extract.run_request(str(pdf)) == first
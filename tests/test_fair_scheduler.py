@@ -0,0 +1,43 @@
+from app.utils.admission import Ticket
+from app.utils.fair_scheduler import FairQueue, estimate_tokens, parse_weights, tenant_id
+
+
+def _ticket(key, cost):
+    return Ticket(timeout=60, key=key, cost=cost)
+
+
+def test_small_request_not_starved_by_bulk_tenant():
+    q = FairQueue(quantum=100)
+    for _ in range(5):
+        q.push(_ticket("bulk", 5000))
+    q.push(_ticket("interactive", 50))
+    first_two = [q.pop().key for _ in range(2)]
+    assert "interactive" in first_two
+    assert len(q) == 4
+
+
+def test_weights_shift_share_of_service():
+    q = FairQueue(quantum=100, weights={"gold": 3})
+    for _ in range(40):
+        q.push(_ticket("gold", 100))
+        q.push(_ticket("free", 100))
+    served = [q.pop().key for _ in range(20)]
+    assert served.count("gold") >= 3 * served.count("free") - 3
+
+
+def test_remove_and_empty_pop():
+    q = FairQueue()
+    t = _ticket("a", 10)
+    q.push(t)
+    assert q.remove(t)
+    assert not q.remove(t)
+    assert q.pop() is None and len(q) == 0
+
+
+def test_helpers():
+    assert estimate_tokens("x" * 400) == 200
+    assert estimate_tokens("x" * 400, "summarize") == 125
+    weights = parse_weights("abc:2, def:0.5,bad")
+    assert weights["abc"] == 2.0 and weights["def"] == 0.5
+    assert weights[tenant_id("abc")] == 2.0
+    assert tenant_id("secret") != "secret" and len(tenant_id("secret")) == 12
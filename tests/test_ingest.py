@@ -0,0 +1,86 @@
+import io
+
+from app.app import create_app
+from app.utils.extract import take_bytes
+
+
+def _client(monkeypatch, tmp_path, **env):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    for k, v in env.items():
+        monkeypatch.setenv(k, v)
+    return create_app().test_client()
+
+
+def _upload(client, data, name="doc.txt"):
+    return client.post("/gofr/ingest", data={"file": (io.BytesIO(data), name)},
+                       content_type="multipart/form-data")
+
+
+def test_small_and_spooled_uploads_extract(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    res = _upload(client, "Clause one.\r\nClause two.".encode("utf-8"))
+    assert res.status_code == 200
+    assert res.get_json()["text"] == "Clause one.\nClause two."
+
+    big = ("é" * 1000 + "\n").encode("utf-8") * 1200  # > in-memory threshold, read back via mmap
+    res = _upload(client, big)
+    assert res.get_json()["text"] == big.decode("utf-8")
+
+
+def test_byte_cap_applies_during_extraction(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path, MAX_EXTRACT_BYTES="5")
+    res = _upload(client, "ééé".encode("utf-8"))
+    assert res.get_json()["text"] == "éé"
+
+
+def test_oversize_upload_rejected(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path, MAX_UPLOAD_BYTES="1024")
+    res = _upload(client, b"x" * 4096)
+    assert res.status_code == 413
+    assert res.get_json()["error"]["code"] == "E413_PAYLOAD_TOO_LARGE"
+
+
+def test_take_bytes_stops_the_producer():
+    produced = []
+
+    def chunks():
+        for i in range(100):
+            produced.append(i)
+            yield "abcd"
+
+    assert take_bytes(chunks(), 10) == "abcdabcdab"
+    assert len(produced) == 3
+
+
+def test_repeated_upload_served_from_extraction_cache(monkeypatch, tmp_path):
+    import app.app as app_module
+    client = _client(monkeypatch, tmp_path)
+    calls = []
+    real_iter_text = app_module.iter_text
+
+    def counting_iter_text(*args, **kwargs):
+        calls.append(1)
+        return real_iter_text(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "iter_text", counting_iter_text)
+    first = _upload(client, b"Same bytes.").get_json()["text"]
+    second = _upload(client, b"Same bytes.").get_json()["text"]
+    _upload(client, b"Other bytes.")
+    assert first == second == "Same bytes."
+    assert len(calls) == 2
+
+
+def test_extraction_cache_evicts_least_recently_used(tmp_path):
+    import os
+    from app.utils.extract_cache import ExtractionCache
+    cache = ExtractionCache(str(tmp_path), max_bytes=200)
+    blobs = {k: os.urandom(60).hex() for k in ("aa1", "bb2", "cc3")}
+    cache.set("aa1", blobs["aa1"])
+    cache.set("bb2", blobs["bb2"])
+    os.utime(cache._path("aa1"), (1, 1))
+    os.utime(cache._path("bb2"), (2, 2))
+    assert cache.get("aa1") == blobs["aa1"]  # refreshes aa1
+    cache.set("cc3", blobs["cc3"])
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") == blobs["aa1"] and cache.get("cc3") == blobs["cc3"]
@@ -0,0 +1,44 @@
+import pytest
+
+from app.models.model_manager import ModelManager
+from benchmarks.loadtest import percentile, run_full_analysis
+from benchmarks.stub_llm import StubLLM, serve
+
+
+@pytest.fixture
+def stub():
+    llm = StubLLM(latency=0.0, tokens=5, seed=1)
+    server = serve(llm)
+    yield llm, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("fmt", ["simple", "openai"])
+def test_model_manager_talks_to_stub(monkeypatch, stub, fmt):
+    llm, url = stub
+    monkeypatch.delenv("FAST_TEST", raising=False)
+    monkeypatch.setenv("EXTERNAL_LLM_API_URL", url)
+    monkeypatch.setenv("EXTERNAL_LLM_FORMAT", fmt)
+    result = ModelManager().process("The tenant shall pay rent.", "simplify")
+    assert result == {"plain_language": "the tenant may terminate this"}
+
+    llm.error_rate = 1.0
+    assert ModelManager().process("x", "simplify")["error"] is True
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50 and percentile(values, 99) == 99 and percentile([], 50) is None
+
+
+def test_full_analysis_requests_bypass_stored_results():
+    sent = []
+
+    class Session:
+        def post(self, url, json, headers, timeout):
+            sent.append(json["text"])
+            return type("Res", (), {"status_code": 503})()
+
+    run_full_analysis(Session(), "http://x", "same sample")
+    run_full_analysis(Session(), "http://x", "same sample")
+    assert sent[0].startswith("same sample") and sent[0] != sent[1]
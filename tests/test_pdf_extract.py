@@ -0,0 +1,84 @@
+import io
+import time
+
+import pytest
+
+from app.app import create_app
+from app.utils.extract import (
+    extract_pdf, iter_clauses, iter_pdf_pages, parse_page_range, split_into_clauses, take_bytes, iter_text
+)
+from tests.pdf_samples import make_pdf
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(make_pdf([f"Clause {n}. The party may terminate" for n in range(1, 6)]))
+    return str(path)
+
+
+def test_pages_are_yielded_with_numbers(pdf_path):
+    pages = list(iter_pdf_pages(pdf_path))
+    assert [n for n, _ in pages] == [1, 2, 3, 4, 5]
+    assert "Clause 3." in pages[2][1]
+    assert "".join(t for _, t in pages) == extract_pdf(pdf_path)
+
+
+def test_page_range_and_layout_modes(pdf_path):
+    assert [n for n, _ in iter_pdf_pages(pdf_path, 2, 3)] == [2, 3]
+    for layout in ("fast", "none"):
+        assert "Clause 4." in "".join(t for _, t in iter_pdf_pages(pdf_path, 4, 4, layout=layout))
+    assert parse_page_range("4-") == (4, None)
+    assert parse_page_range("2") == (2, 2)
+    with pytest.raises(ValueError):
+        parse_page_range("5-2")
+
+
+def test_byte_budget_stops_parsing(pdf_path):
+    seen = []
+
+    def pages():
+        for number, text in iter_pdf_pages(pdf_path):
+            seen.append(number)
+            yield text
+
+    assert take_bytes(pages(), 20).startswith("Clause 1.")
+    assert seen == [1]
+
+
+def test_streaming_clause_split_matches_batch():
+    text = "First clause; second. Third clause.  Trailing"
+    chunks = [text[i:i + 4] for i in range(0, len(text), 4)]
+    assert list(iter_clauses(chunks)) == split_into_clauses(text)
+
+
+def test_ingest_analyzes_pages_as_they_stream(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    client = create_app().test_client()
+    pdf = make_pdf(["Intro. The vendor shall indemnify the client", "Notes"])
+    res = client.post("/gofr/ingest", data={"file": (io.BytesIO(pdf), "c.pdf"), "analyze": "1", "pages": "1"},
+                      content_type="multipart/form-data")
+    body = res.get_json()
+    assert res.status_code == 200
+    assert "Notes" not in body["text"]
+    assert any(r["type"] == "indemnification" for r in body["risk"])
+
+
+def test_parallel_extraction_matches_serial(pdf_path, tmp_path, monkeypatch):
+    import tempfile
+    from app.utils.extract import count_pdf_pages, iter_pdf_parallel
+    assert count_pdf_pages(pdf_path) == 5
+    serial = extract_pdf(pdf_path)
+    assert "".join(iter_pdf_parallel(pdf_path, workers=2, min_pages=2)) == serial
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool))
+    with open(pdf_path, "rb") as f:
+        assert "".join(iter_pdf_parallel(io.BytesIO(f.read()), workers=2, first_page=2, min_pages=2)) == \
+            "".join(t for _, t in iter_pdf_pages(pdf_path, 2))
+    for _ in range(100):  # in-memory sources are spooled to one file, removed once the slices finish
+        if not list(spool.iterdir()):
+            break
+        time.sleep(0.01)
+    assert list(spool.iterdir()) == []
@@ -0,0 +1,60 @@
+import time
+
+from app.app import create_app
+from app.utils.profiler import ProfileStore, SamplingProfiler
+
+
+def _client(monkeypatch, tmp_path, **env):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    for k, v in env.items():
+        monkeypatch.setenv(k, v)
+    app = create_app()
+    return app, app.test_client()
+
+
+def test_server_timing_on_every_response(monkeypatch, tmp_path):
+    app, client = _client(monkeypatch, tmp_path)
+    res = client.post("/api/simplify", json={"text": "Hello"}, headers={"X-API-Key": "k"})
+    assert "queue_wait;dur=" in res.headers["Server-Timing"]
+    assert "total;dur=" in res.headers["Server-Timing"]
+    assert "X-Profile-Id" not in res.headers
+
+
+def test_profile_header_requires_api_key(monkeypatch, tmp_path):
+    app, client = _client(monkeypatch, tmp_path)
+    res = client.get("/api/v1/health", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in res.headers
+
+    res = client.get("/api/v1/health", headers={"X-Profile": "1", "X-API-Key": "k"})
+    profile_id = res.headers["X-Profile-Id"]
+    listed = client.get("/debug/profiles", headers={"X-API-Key": "k"}).get_json()["profiles"]
+    assert [p["id"] for p in listed] == [profile_id]
+    assert client.get(f"/debug/profiles/{profile_id}").status_code == 401
+    res = client.get(f"/debug/profiles/{profile_id}", headers={"X-API-Key": "k"})
+    assert res.status_code == 200 and res.mimetype == "text/plain"
+
+
+def test_sampled_requests_fill_ring_buffer(monkeypatch, tmp_path):
+    app, client = _client(monkeypatch, tmp_path, PROFILE_SAMPLE_PERCENT="100", PROFILE_BUFFER_SIZE="2")
+    for _ in range(3):
+        client.get("/api/v1/health")
+    assert len(app.profiles.list()) == 2
+
+
+def test_sampling_profiler_collapses_stacks():
+    def busy_wait():
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy_wait()
+    profiler.stop()
+    store = ProfileStore(capacity=1)
+    store.add(profiler)
+    collapsed = store.get(profiler.id)["collapsed"]
+    assert "busy_wait (test_profiler.py:" in collapsed
+    stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
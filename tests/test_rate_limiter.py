@@ -0,0 +1,73 @@
+import threading
+
+from app.utils.rate_limiter import RateLimiter, RedisRateLimiter, create_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_steady_rate():
+    clock = FakeClock()
+    rl = RateLimiter(rate_per_minute=60, burst=3, clock=clock)
+    assert [rl.allow("k") for _ in range(4)] == [True, True, True, False]
+    clock.now += 1.0
+    assert rl.allow("k")
+    assert not rl.allow("k")
+    assert rl.allow("other")
+
+
+def test_recovered_keys_expire_on_later_requests():
+    clock = FakeClock()
+    rl = RateLimiter(rate_per_minute=60, stripes=1, clock=clock)
+    for i in range(50):
+        rl.allow(f"k{i}")
+    assert len(rl) == 50
+    clock.now += 2.0
+    for _ in range(30):
+        rl.allow("fresh")
+    assert len(rl) == 1
+
+
+def test_concurrent_callers_never_exceed_burst():
+    rl = RateLimiter(rate_per_minute=100)
+    allowed = []
+
+    def hit():
+        allowed.extend(ok for ok in (rl.allow("shared") for _ in range(50)) if ok)
+
+    threads = [threading.Thread(target=hit) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 100 <= len(allowed) <= 102
+
+
+def test_redis_backend_falls_back_when_unreachable():
+    rl = RedisRateLimiter(rate_per_minute=2, redis_url="redis://127.0.0.1:1/0")
+    assert [rl.allow("k") for _ in range(3)] == [True, True, False]
+    assert isinstance(create_rate_limiter(5), RateLimiter)
+    assert isinstance(create_rate_limiter(5, backend="redis", redis_url="redis://127.0.0.1:1/0"), RedisRateLimiter)
+
+
+def test_redis_failures_open_a_circuit_to_the_local_limiter():
+    now = [0.0]
+    calls = []
+
+    class DownRedis:
+        def register_script(self, script):
+            def run(keys, args):
+                calls.append(keys)
+                raise ConnectionError("timeout")
+            return run
+
+    rl = RedisRateLimiter(rate_per_minute=600, client=DownRedis(), retry_after=5, clock=lambda: now[0])
+    assert all(rl.allow("k") for _ in range(5))
+    assert len(calls) == 1  # later requests skip Redis instead of waiting out the timeout
+    now[0] = 5.0
+    assert rl.allow("k") and len(calls) == 2
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from app.models.replica_pool import ReplicaPool
+
+
+def test_each_slot_owns_its_replica():
+    pool = ReplicaPool(lambda idx: {"idx": idx, "lock": threading.Lock()}, slots=3, threads_per_slot=1)
+    overlaps = []
+
+    def work(replica):
+        if not replica["lock"].acquire(blocking=False):
+            overlaps.append(replica["idx"])
+            return None
+        try:
+            time.sleep(0.02)
+            return replica["idx"]
+        finally:
+            replica["lock"].release()
+
+    futures = [pool.submit(work) for _ in range(9)]
+    used = {f.result(timeout=5) for f in futures}
+    pool.shutdown()
+    assert not overlaps
+    assert used == {0, 1, 2}
+
+
+def test_errors_propagate_to_caller():
+    pool = ReplicaPool(lambda idx: None, slots=1)
+    with pytest.raises(ZeroDivisionError):
+        pool.run(lambda replica: 1 / 0, timeout=5)
+    assert pool.run(lambda replica: "ok", timeout=5) == "ok"
+    pool.shutdown()
+
+
+def test_factory_failure_raises():
+    def factory(idx):
+        raise RuntimeError("no weights")
+
+    with pytest.raises(RuntimeError):
+        ReplicaPool(factory, slots=2)
+
+
+def test_model_replicas_do_not_share_tokenizers(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.models import model_manager
+
+    class Tokenizer:
+        pad_token, eos_token = None, "</s>"
+
+    pipelines = []
+
+    def pipeline(task, model, tokenizer, **kwargs):
+        pipelines.append(SimpleNamespace(model=model, tokenizer=tokenizer))
+        return pipelines[-1]
+
+    fake = SimpleNamespace(
+        AutoTokenizer=SimpleNamespace(from_pretrained=lambda name: Tokenizer()),
+        AutoModelForCausalLM=SimpleNamespace(from_pretrained=lambda name, **kw: object()),
+        pipeline=pipeline,
+    )
+    monkeypatch.setattr(model_manager, "optional_import", lambda name: fake)
+    monkeypatch.setattr(model_manager, "cuda_available", lambda: False)
+    monkeypatch.delenv("FAST_TEST", raising=False)
+    monkeypatch.delenv("EXTERNAL_LLM_API_URL", raising=False)
+    monkeypatch.setenv("MODEL_REPLICAS", "3")
+    mm = model_manager.ModelManager()
+    mm.pool.shutdown()
+    assert len(pipelines) == 3 and len({id(p.model) for p in pipelines}) == 1  # weights shared
+    assert len({id(p.tokenizer) for p in pipelines}) == 3
+    assert all(p.tokenizer.pad_token == "</s>" for p in pipelines)
@@ -0,0 +1,55 @@
+from app.app import create_app
+from app.utils.metrics import begin_request, current_timings, stage
+
+
+def _client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    app = create_app()
+    return app, app.test_client()
+
+
+def _sample(app, name, **labels):
+    return app.metrics.registry.get_sample_value(name, labels)
+
+
+def test_requests_counted_by_route_method_and_status(monkeypatch, tmp_path):
+    app, client = _client(monkeypatch, tmp_path)
+    headers = {"X-API-Key": "k"}
+    assert client.post("/api/simplify", json={"text": "Hello"}, headers=headers).status_code == 200
+    assert client.post("/api/simplify", json={}, headers=headers).status_code == 400
+    client.get("/api/v1/batch/abc", headers=headers)
+
+    assert _sample(app, "requests_total", endpoint="/api/simplify", method="POST", status="200") == 1
+    assert _sample(app, "requests_total", endpoint="/api/simplify", method="POST", status="400") == 1
+    assert _sample(app, "requests_total", endpoint="/api/v1/batch/<job_id>", method="GET", status="404") == 1
+    assert _sample(app, "request_latency_seconds_count", endpoint="/api/simplify", method="POST") == 2
+    assert _sample(app, "stage_duration_seconds_count", stage="queue_wait") == 1
+    assert _sample(app, "request_tokens_count", direction="output") == 1
+
+
+def test_stage_histograms_and_ttft(monkeypatch, tmp_path):
+    app, client = _client(monkeypatch, tmp_path)
+    headers = {"X-API-Key": "k"}
+    client.post("/api/full-analysis", json={"text": "The company may terminate this agreement."}, headers=headers)
+    assert _sample(app, "stage_duration_seconds_count", stage="clause_split") == 1
+    assert _sample(app, "stage_duration_seconds_count", stage="risk_scan") == 1
+
+    res = client.post("/api/v1/inference", json={"text": "Hello there", "stream": True}, headers=headers)
+    res.get_data()
+    res.close()
+    assert _sample(app, "time_to_first_token_seconds_count") == 1
+    assert _sample(app, "requests_total", endpoint="/api/v1/inference", method="POST", status="200") == 1
+
+    body = client.get("/metrics", headers=headers).get_data(as_text=True)
+    assert "stage_duration_seconds_bucket" in body
+
+
+def test_stage_sums_repeated_blocks():
+    timings = begin_request()
+    for _ in range(3):
+        with stage("risk_scan"):
+            pass
+    assert current_timings() is timings
+    assert list(timings.durations) == ["risk_scan"]
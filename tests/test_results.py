@@ -0,0 +1,96 @@
+import pytest
+
+from app.app import create_app
+from app.models.risk_detector import clause_analysis, full_clause_analysis, merge_risks
+from app.utils import results as results_module
+from app.utils.results import ResultStore, content_hash
+
+MSA = ("The Supplier shall indemnify the Customer against all losses. "
+       "This Agreement is subject to automatic renewal each year. Fees are due monthly.")
+NDA = "Each party keeps the other party's information confidential. The Supplier shall indemnify the Customer."
+
+
+def test_clause_analysis_merges_to_full_clause_analysis():
+    clauses, per_clause = clause_analysis(MSA)
+    assert len(clauses) == len(per_clause) == 3
+    assert merge_risks(per_clause) == full_clause_analysis(MSA)
+
+
+def save(store, owner, text, **kwargs):
+    clauses, risks = clause_analysis(text)
+    return store.save(owner, text, clauses, risks, **kwargs)
+
+
+def test_store_is_content_addressed(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    doc_id = save(store, "a", MSA, analysis="full", result={"summary": "s"})
+    assert doc_id == content_hash("  " + MSA.replace(" ", "\n ")) and store.fts
+
+    found = store.find(MSA, "full")
+    assert found["result"] == {"summary": "s"} and found["clauses"][2] == "Fees are due monthly"
+    assert store.find(MSA, "other-model")["result"] is None
+    assert store.find("Something else entirely.") is None
+
+
+def test_search_filters_and_pagination(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.save_many("a", [
+        {"text": t, "clauses": c, "risks": r, "name": n}
+        for t, n in ((MSA, "msa"), (NDA, "nda")) for c, r in [clause_analysis(t)]
+    ])
+    save(store, "b", "Unrelated tenant text.")
+
+    everything = store.search("a")
+    types = {item["risk"]["type"] for item in everything["items"]}
+    assert len(types) > 1 and not everything["has_more"]
+
+    risk_type = everything["items"][0]["risk"]["type"]
+    assert all(i["risk"]["type"] == risk_type for i in store.search("a", risk_type=risk_type)["items"])
+
+    hits = store.search("a", query="renewal")["items"]
+    assert hits and all("renewal" in i["clause"] for i in hits) and hits[0]["document_name"] == "msa"
+
+    page = store.search("a", limit=1)
+    assert len(page["items"]) == 1 and page["has_more"]
+    assert store.search("b", query="indemnify")["items"] == []
+    assert store.search("a", since=1e12)["items"] == []
+    with pytest.raises(ValueError):
+        store.search("a", query='"unbalanced')
+
+
+def test_findings_recomputed_after_version_bump(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    save(store, "a", MSA)
+    before = len(store.search("a", query="indemnify")["items"])
+    monkeypatch.setattr(results_module, "ANALYSIS_VERSION", "2")
+    assert store.find(MSA) is None
+    save(store, "a", MSA)
+    assert len(store.search("a", query="indemnify")["items"]) == before
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    app = create_app()
+    return app, app.test_client()
+
+
+def test_full_analysis_is_stored_and_looked_up(client, monkeypatch):
+    app, c = client
+    headers = {"X-API-Key": "k"}
+    first = c.post("/api/full-analysis", json={"text": MSA, "name": "msa"}, headers=headers).get_json()
+    calls = []
+    monkeypatch.setattr(app.model_manager, "process", lambda *a, **k: calls.append(a))
+    second = c.post("/api/full-analysis", json={"text": MSA}, headers=headers).get_json()
+    assert second["result"] == first["result"] and calls == []
+
+    doc = c.get(f"/api/v1/results/{first['document_id']}", headers=headers).get_json()["document"]
+    assert doc["name"] == "msa" and len(doc["clauses"]) == 3
+
+    found = c.get("/api/v1/results?q=indemnify&page_size=10", headers=headers).get_json()
+    assert found["items"] and found["items"][0]["document_id"] == first["document_id"]
+    assert c.get("/api/v1/results?since=2020-01-01T00:00:00", headers=headers).get_json()["items"]
+    assert c.get("/api/v1/results?since=yesterday", headers=headers).status_code == 400
+    assert c.get("/api/v1/results/unknown", headers=headers).status_code == 404
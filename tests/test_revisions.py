@@ -0,0 +1,106 @@
+import pytest
+
+from app.app import create_app
+from app.models.risk_detector import RISK_RULES, analyze_clause, rules_version
+from app.utils.revisions import IncrementalAnalyzer, RevisionStore, clause_id, diff_clauses, segment
+
+V1 = "The term is one year. Either party may terminate for convenience. Fees are due monthly."
+V2 = "The term is one year. Fees are due  monthly. The supplier shall indemnify the customer. New clause here."
+
+
+def test_clause_ids_are_stable_content_hashes():
+    assert clause_id("Fees are due\n monthly") == clause_id("Fees are due monthly")
+    assert [c["text"] for c in segment(V1)][1] == "Either party may terminate for convenience"
+
+
+def test_diff_statuses_and_removed():
+    diff = diff_clauses(["a", "b", "c", "d"], ["a", "x", "c", "e", "d"])
+    assert diff["status"] == ["unchanged", "changed", "unchanged", "inserted", "unchanged"]
+    assert diff["removed"] == ["b"]
+
+
+def test_only_new_clauses_are_analyzed(tmp_path):
+    detected, simplified = [], []
+
+    def detect(text):
+        detected.append(text)
+        return analyze_clause(text)
+
+    def simplify(texts):
+        simplified.extend(texts)
+        return [{"plain_language": t.upper()} for t in texts]
+
+    analyzer = IncrementalAnalyzer(RevisionStore(str(tmp_path / "rev.sqlite3")), detect)
+    first = analyzer.submit("tenant", "msa", V1, simplify=simplify)
+    assert first["version"] == 1 and first["stats"]["analyzed"] == 3
+    detected.clear()
+    simplified.clear()
+
+    second = analyzer.submit("tenant", "msa", V2, simplify=simplify)
+    assert second["version"] == 2 and second["previous_version"] == 1
+    assert [c["status"] for c in second["clauses"]] == ["unchanged", "unchanged", "inserted", "inserted"]
+    assert detected == simplified == ["The supplier shall indemnify the customer", "New clause here"]
+    assert second["stats"]["reused"] == 2 and second["stats"]["removed"] == 1
+    assert second["clauses"][1]["simplified"] == {"plain_language": "FEES ARE DUE MONTHLY"}
+    assert second["clauses"][2]["risks"][0]["type"] == "indemnification"
+
+    # Another tenant's document with the same id has its own history.
+    assert analyzer.submit("other", "msa", V2)["version"] == 1
+    assert [c["id"] for c in analyzer.get("tenant", "msa")["clauses"]] == [c["id"] for c in second["clauses"]]
+
+
+def test_failed_simplifications_are_retried(tmp_path):
+    analyzer = IncrementalAnalyzer(RevisionStore(str(tmp_path / "rev.sqlite3")), analyze_clause)
+    analyzer.submit("t", "d", "One clause.", simplify=lambda texts: [{"error": True, "message": "down"}])
+    again = analyzer.submit("t", "d", "One clause.", simplify=lambda texts: [{"plain_language": "ok"}])
+    assert again["clauses"][0]["simplified"] == {"plain_language": "ok"}
+    assert again["stats"]["analyzed"] == 1
+
+
+
+def test_rule_or_model_changes_invalidate_stored_results(tmp_path, monkeypatch):
+    store = RevisionStore(str(tmp_path / "rev.sqlite3"))
+    calls = []
+
+    def detect(text):
+        calls.append("detect")
+        return analyze_clause(text)
+
+    def simplify(texts):
+        calls.append("simplify")
+        return [{"plain_language": t} for t in texts]
+
+    IncrementalAnalyzer(store, detect, risk_version="r1", model_version="m1").submit("t", "d", V1, simplify=simplify)
+    calls.clear()
+    IncrementalAnalyzer(store, detect, risk_version="r1", model_version="m2").submit("t", "d", V1, simplify=simplify)
+    assert calls == ["simplify"]
+    calls.clear()
+    again = IncrementalAnalyzer(store, detect, risk_version="r2", model_version="m2")
+    assert again.submit("t", "d", V1, simplify=simplify)["stats"]["reused"] == 0 and calls == ["detect"] * 3
+    assert again.get("t", "d")["clauses"][0]["simplified"] == {"plain_language": "The term is one year"}
+
+    before = rules_version()
+    monkeypatch.setitem(RISK_RULES, "auto_renew", {**RISK_RULES["auto_renew"], "severity": "high"})
+    assert rules_version() != before
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    return create_app().test_client()
+
+
+def test_document_versions_endpoint(client):
+    headers = {"X-API-Key": "k"}
+    res = client.post("/api/v1/documents/msa/versions", json={"text": V1}, headers=headers)
+    assert res.status_code == 201
+    res = client.post("/api/v1/documents/msa/versions", json={"text": V2}, headers=headers)
+    doc = res.get_json()["document"]
+    assert doc["version"] == 2 and doc["stats"]["reused"] == 2
+    assert doc["clauses"][0]["simplified"]["plain_language"].startswith("[SIMPLIFY stub]")
+
+    latest = client.get("/api/v1/documents/msa", headers=headers).get_json()["document"]
+    assert latest["version"] == 2 and len(latest["clauses"]) == 4
+    assert client.get("/api/v1/documents/nope", headers=headers).status_code == 404
+    assert client.post("/api/v1/documents/msa/versions", json={"text": ""}, headers=headers).status_code == 400
@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+from app.app import create_app
+from app.utils.sse import HEARTBEAT, Stream, StreamRegistry, Subscriber, parse_event_id, sse_event
+
+
+def parse(body):
+    """[(event, id, data)] per the SSE spec (comments skipped)."""
+    events = []
+    for frame in body.split("\n\n"):
+        event, eid, data = "message", None, []
+        for line in frame.split("\n"):
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("id: "):
+                eid = line[4:]
+            elif line.startswith("data: "):
+                data.append(line[6:])
+        if data:
+            events.append((event, eid, "\n".join(data)))
+    return events
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_multiline_payloads_survive_framing():
+    text = "line one\n\nline three\r\n"
+    assert parse(sse_event(text, event="chunk", event_id="s:1")) == [("chunk", "s:1", "line one\n\nline three\n")]
+    assert parse(sse_event("", event="done")) == [("done", None, "")]
+    assert "id: a b" in sse_event("x", event_id="a\nb")
+
+
+def test_subscriber_coalesces_by_size_and_age():
+    clock = FakeClock()
+    stream = Stream("s")
+    sub = Subscriber(stream, max_bytes=10, max_delay=0.05, heartbeat=15, clock=clock)
+    stream.append("first ")
+    assert parse("".join(sub.feed(*stream.read(sub.cursor))))[0][2] == "first "  # first token goes out at once
+
+    for word in ("a ", "b "):
+        stream.append(word)
+        assert sub.feed(*stream.read(sub.cursor)) == []
+    clock.now = 0.06
+    assert parse("".join(sub.feed([], None))) == [("chunk", "s:3", "a b ")]
+
+    stream.append("0123456789")
+    assert parse("".join(sub.feed(*stream.read(sub.cursor))))[0][2] == "0123456789"
+
+    clock.now = 20
+    assert sub.feed([], None) == [HEARTBEAT]
+    stream.append("tail")
+    stream.finish()
+    events = parse("".join(sub.feed(*stream.read(sub.cursor))))
+    assert events == [("chunk", "s:5", "tail"), ("done", "s:5", "{}")] and sub.closed
+
+
+def test_replay_buffer_is_bounded():
+    stream = Stream("s", replay_bytes=8)
+    for word in ("aaaa", "bbbb", "cccc"):
+        stream.append(word)
+    assert not stream.can_resume(0) and stream.can_resume(1)
+    assert stream.read(1)[0] == [(2, "bbbb"), (3, "cccc")]
+    assert parse_event_id("s:2") == ("s", 2) and parse_event_id("garbage") is None
+
+
+def test_subscriber_that_falls_behind_the_buffer_gets_an_error():
+    stream = Stream("s", replay_bytes=8)
+    sub = Subscriber(stream, max_bytes=1, clock=FakeClock())
+    stream.append("aaaa")
+    assert parse("".join(sub.feed(*stream.read(sub.cursor)))) == [("chunk", "s:1", "aaaa")]
+    for word in ("bbbb", "cccc", "dddd"):
+        stream.append(word)
+    tokens, outcome = stream.wait(sub.cursor, timeout=None)
+    assert tokens == [] and outcome[0] == "error" and "2-2" in outcome[1]
+    assert parse("".join(sub.feed(tokens, outcome)))[0][:2] == ("error", "s:1") and sub.closed
+
+
+def test_abandoned_stream_is_cancelled():
+    registry = StreamRegistry(grace=0)
+    stream = registry.create()
+    ended = []
+
+    def chunks():
+        for i in range(1000):
+            yield f"{i} "
+
+    registry.pump(stream, chunks(), on_end=lambda out, err, cancelled: ended.append(cancelled)).join(5)
+    assert ended == [True] and stream.outcome == ("error", "cancelled")
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("STREAM_COALESCE_MS", "0")
+    return create_app()
+
+
+def test_reconnect_resumes_without_restarting_generation(app, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def stream_process(text, task, language="en"):
+        calls.append(text)
+        yield "one "
+        release.wait(5)
+        yield "two\nthree "
+
+    monkeypatch.setattr(app.model_manager, "stream_process", stream_process)
+    client = app.test_client()
+    headers = {"X-API-Key": "k"}
+    body = {"text": "hello", "stream": True}
+
+    res = client.post("/api/v1/inference", json=body, headers=headers)
+    frames = res.response
+    first = parse(next(iter(frames)).decode())
+    assert first[0][2] == "one " and res.headers["X-Accel-Buffering"] == "no"
+    last_id = first[0][1]
+    res.close()  # client drops mid-generation
+    release.set()
+
+    again = client.post("/api/v1/inference", json=body, headers={**headers, "Last-Event-ID": last_id})
+    events = parse(again.get_data(as_text=True))
+    assert [e[0] for e in events] == ["chunk", "done"] and events[0][2] == "two\nthree "
+    assert calls == ["hello"]
+    assert app.admission.active == 0
+
+    stream_id = res.headers["X-Stream-Id"]
+    replay = parse(client.get(f"/api/v1/streams/{stream_id}", headers=headers).get_data(as_text=True))
+    assert "".join(e[2] for e in replay if e[0] == "chunk") == "one two\nthree "
+    assert client.get(f"/api/v1/streams/{stream_id}", headers={"X-API-Key": "other"}).status_code == 401
+    assert client.get("/api/v1/streams/unknown", headers=headers).status_code == 404
+
+
+def test_failed_stream_setup_releases_the_slot(app, monkeypatch):
+    def broken(owner=None):
+        raise RuntimeError("registry full")
+
+    monkeypatch.setattr(app.streams, "create", broken)
+    res = app.test_client().post("/api/v1/inference", json={"text": "hello", "stream": True},
+                                 headers={"X-API-Key": "k"})
+    assert res.status_code == 500 and app.admission.active == 0
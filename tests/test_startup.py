@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.bench_startup import measure
+
+
+@pytest.mark.parametrize("mode", ["fast_test", "external"])
+def test_workers_start_without_heavy_imports(mode, tmp_path):
+    result = measure(mode, data_dir=str(tmp_path))
+    assert result["error"] is None
+    assert result["heavy"] == []  # torch, transformers, ... load on first use only
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from app.app import create_app
+from app.asgi_app import create_asgi_app
+from app.models.model_manager import ModelManager
+from app.models.translation import language_code, split_segments, translate_document
+from tests.test_asgi import _call
+
+ENGLISH = "The tenant shall pay rent monthly to the landlord. The landlord shall keep the building in good repair."
+SPANISH = "El inquilino pagará la renta cada mes al propietario. El propietario mantendrá el edificio en buen estado."
+LIST = "Terms:\n  - 1. Rent, e.g. Mr. Smith's share.\n  - 2024\n"
+TEXT = f"  {SPANISH}\n\n{ENGLISH}\n\n"
+
+
+def _echo(texts):
+    return [{"plain_language": f" <{t}> "} for t in texts]
+
+
+def test_segments_keep_every_separator():
+    segments, separators, paragraphs = split_segments(TEXT + LIST)
+    assert separators[0] + "".join(s + sep for s, sep in zip(segments, separators[1:])) == TEXT + LIST
+    assert segments[-3:] == ["Terms:", "- 1. Rent, e.g. Mr. Smith's share.", "- 2024"]
+    assert paragraphs[0] == paragraphs[1] == 0 and paragraphs[-1] == 2
+    assert split_segments("x" * 25 + " " + "y" * 10, max_chars=20)[0] == ["x" * 20, "xxxxx yyyyyyyyyy"]
+    assert language_code("English") == "en" and language_code("es-ES") == "es"
+
+
+def test_only_foreign_segments_are_translated_in_one_batch():
+    calls = []
+
+    def translate(texts):
+        calls.append(texts)
+        return _echo(texts)
+
+    result = translate_document(f"{TEXT}{SPANISH}\n\n2024-01-01", "en", translate)
+    assert calls == [split_segments(SPANISH)[0]]  # the repeated paragraph is sent once
+    out = result["plain_language"]
+    assert out.startswith("  <El inquilino")
+    assert out.endswith("> <El propietario mantendrá el edificio en buen estado.>\n\n2024-01-01")
+    assert f".>\n\n{ENGLISH}\n\n<El" in out
+    assert result["stats"] == {"segments": 7, "translated": 4, "skipped": 3, "failed": 0, "unique": 2}
+
+
+def test_failed_segments_keep_their_text():
+    def flaky(texts):
+        return [{"error": True, "message": "down"} if "inquilino" in t else {"plain_language": "ok"} for t in texts]
+
+    result = translate_document(SPANISH, "en", flaky, detect=False)
+    assert result["plain_language"].startswith("El inquilino") and "error" not in result
+    assert result["stats"]["failed"] == 1
+    assert translate_document(SPANISH, "en", lambda t: [{"error": True, "message": "down"}] * len(t))["error"]
+
+
+def test_local_batches_are_length_sorted(monkeypatch):
+    monkeypatch.setenv("FAST_TEST", "1")
+    mm = ModelManager()
+    seen = []
+
+    def generator(prompts, batch_size):
+        seen.extend(prompts)
+        return [[{"generated_text": p + "!"}] for p in prompts]
+
+    mm.generator, mm.pool = generator, None
+    assert mm._generate_batch(["ccc", "a", "bb"]) == ["!", "!", "!"]
+    assert seen == ["a", "bb", "ccc"]
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_TEST", "1")
+    monkeypatch.setenv("API_KEY", "k")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    return create_app()
+
+
+def test_translate_routes_on_flask_and_asgi(app):
+    res = app.test_client().post("/api/translate", json={"text": f"{SPANISH}\n\n{ENGLISH}", "target_lang": "English"},
+                                 headers={"X-API-Key": "k"})
+    result = res.get_json()["result"]
+    assert res.status_code == 200 and result["stats"]["skipped"] == 2
+    assert result["plain_language"].endswith(f"\n\n{ENGLISH}")
+
+    body = json.dumps({"text": SPANISH, "target_lang": "en", "segmented": False}).encode()
+    status, _, data = _call(create_asgi_app(app), "POST", "/api/translate", body, [("X-API-Key", "k")])
+    assert status == 200 and "stats" not in json.loads(data)["result"]